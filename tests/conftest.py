@@ -0,0 +1,13 @@
+"""
+测试公共配置
+把项目根目录加入导入路径，测试不写入机器人日志文件
+"""
+
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
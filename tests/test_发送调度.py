@@ -0,0 +1,118 @@
+"""
+发送调度测试：优先级、洪水限制暂停、错误处理和单个群组的发送间隔
+发送函数使用本地的假 Bot API 调用（协程函数），不访问网络
+"""
+
+import time
+import asyncio
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+from 核心模块.发送调度 import PRIORITY_QUERY, PRIORITY_SUBMISSION, SendScheduler
+
+class FakeBotApi:
+    """记录每次调用的时间；failures 为 {名称: [依次抛出的异常]}，用完后调用成功"""
+
+    def __init__(self, failures=None):
+        self.calls = []
+        self.failures = failures or {}
+
+    def call(self, name):
+        async def send():
+            self.calls.append((name, time.monotonic()))
+            pending = self.failures.get(name)
+            if pending:
+                raise pending.pop(0)
+            return name
+        return send
+
+    def names(self):
+        return [name for name, _ in self.calls]
+
+    def times(self, name):
+        return [at for called, at in self.calls if called == name]
+
+def make_scheduler(**kwargs):
+    options = {'global_rate': 0, 'chat_interval': 0, 'private_interval': 0, 'max_retries': 3, 'concurrency': 1}
+    options.update(kwargs)
+    return SendScheduler(**options)
+
+def test_submissions_sent_before_queries():
+    api = FakeBotApi()
+
+    async def scenario():
+        sender = make_scheduler()
+        futures = [sender.submit(-1 - i, api.call(f'query{i}'), PRIORITY_QUERY) for i in range(3)]
+        futures.append(sender.submit(-10, api.call('ack'), PRIORITY_SUBMISSION))
+        await asyncio.gather(*futures)
+        await sender.stop()
+
+    asyncio.run(scenario())
+    assert api.names() == ['ack', 'query0', 'query1', 'query2']
+
+def test_retry_after_pauses_queue_and_retries():
+    api = FakeBotApi({'flooded': [RetryAfter(1)]})
+
+    async def scenario():
+        sender = make_scheduler(concurrency=2)
+        flooded = sender.submit(-1, api.call('flooded'))
+        await asyncio.sleep(0.1)
+        other = sender.submit(-2, api.call('other'))
+        results = await asyncio.gather(flooded, other)
+        await sender.stop()
+        return results, sender.get_stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == ['flooded', 'other']
+    first_attempt, retry = api.times('flooded')
+    # 暂停期间其他群组的消息也不发送
+    assert api.times('other')[0] - first_attempt >= 0.9
+    assert retry - first_attempt >= 0.9
+    assert stats['flood_waits'] == 1 and stats['retries'] == 1 and stats['failed'] == 0
+
+@pytest.mark.parametrize('error', [BadRequest('Chat not found'), TimedOut()])
+def test_bad_request_and_timeout_fail_without_retry(error):
+    api = FakeBotApi({'send': [error]})
+
+    async def scenario():
+        sender = make_scheduler()
+        future = sender.submit(-1, api.call('send'))
+        with pytest.raises(type(error)):
+            await future
+        await sender.stop()
+        return sender.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert api.names() == ['send']
+    assert stats['failed'] == 1 and stats['retries'] == 0
+
+def test_connection_error_is_retried():
+    api = FakeBotApi({'send': [NetworkError('Connection reset')]})
+
+    async def scenario():
+        sender = make_scheduler()
+        result = await sender.submit(-1, api.call('send'))
+        await sender.stop()
+        return result, sender.get_stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == 'send' and api.names() == ['send', 'send']
+    assert stats['retries'] == 1
+
+def test_chat_interval_enforced_per_chat():
+    api = FakeBotApi()
+
+    async def scenario():
+        sender = make_scheduler(chat_interval=0.3, private_interval=0.1, concurrency=4)
+        futures = [sender.submit(-1, api.call('group')) for _ in range(3)]
+        futures += [sender.submit(-2, api.call('other_group'))]
+        futures += [sender.submit(42, api.call('private')) for _ in range(2)]
+        await asyncio.gather(*futures)
+        await sender.stop()
+
+    asyncio.run(scenario())
+    group = api.times('group')
+    assert all(later - earlier >= 0.29 for earlier, later in zip(group, group[1:]))
+    # 其他群组不受该群组间隔限制
+    assert api.times('other_group')[0] - group[0] < 0.2
+    private = api.times('private')
+    assert 0.09 <= private[1] - private[0] < 0.29
@@ -0,0 +1,21 @@
+"""
+号码检测器回归测试
+"""
+
+import pytest
+from 核心模块.号码检测器 import PhoneDetector
+
+@pytest.fixture(scope='module')
+def detector():
+    return PhoneDetector()
+
+def test_multiline_chatter_digits_not_detected(detector):
+    """多行消息中没有关键词的聊天行（如日期）不按纯号码检测"""
+    message = "客户：138 1234 5678\n备注 2024 12 31 ok"
+    assert detector.extract_all_numbers(message) == ['13812345678']
+    assert detector.analyze(message).numbers == ('13812345678',)
+
+def test_multiline_number_lines_detected(detector):
+    """多行消息中整行为号码（含分隔符）的行仍按纯号码检测"""
+    message = "客户：138 1234 5678\n(139) 8765-4321"
+    assert detector.extract_all_numbers(message) == ['13812345678', '13987654321']
@@ -0,0 +1,109 @@
+"""
+增量导出水位测试：只有全部分卷发送成功才推进水位，较旧的导出不会让水位倒退
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+import pytest
+from 核心模块.配置管理 import Config
+from 核心模块.导出任务 import ExportResult
+
+CHAT_ID = -100
+WATERMARK_KEY = f'export_watermark:{CHAT_ID}'
+
+class FakeSender:
+    """代替发送队列：记录上传的文件（以 lambda 提交），第 fail_at 个文件上传失败"""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.uploads = 0
+        self.edits = []
+
+    def submit(self, chat_id, send, priority=None):
+        future = asyncio.get_running_loop().create_future()
+        if getattr(send, '__name__', '') == '<lambda>':
+            self.uploads += 1
+            if self.uploads == self.fail_at:
+                future.set_exception(RuntimeError('upload failed'))
+                return future
+        future.set_result(None)
+        return future
+
+    def edit(self, message, text, **kwargs):
+        self.edits.append(text)
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'BOT_TOKEN', '123456:TEST')
+    monkeypatch.setattr(Config, 'BOT_MODE', 'polling')
+    monkeypatch.setattr(Config, 'DATABASE_PATH', str(tmp_path / 'watermark.db'))
+    from 核心模块.机器人主程序 import TelegramPhoneBot
+
+    bot = TelegramPhoneBot()
+    yield bot
+    bot._cleanup()
+
+def run_delta_export(bot, result, sender, during_job=None):
+    """以增量模式运行一次导出；export_jobs 返回给定的结果，during_job 在任务进行中执行"""
+    jobs = []
+
+    @asynccontextmanager
+    async def job(kind, export_format, compression='none', after_id=0, on_progress=None):
+        jobs.append(after_id)
+        if during_job:
+            during_job()
+        yield result
+
+    bot.export_jobs = SimpleNamespace(job=job)
+    bot.sender = sender
+    message = SimpleNamespace(chat=SimpleNamespace(id=CHAT_ID), from_user=SimpleNamespace(id=1),
+                              reply_document=None)
+    processing_msg = SimpleNamespace(chat=SimpleNamespace(id=CHAT_ID), delete=None)
+    asyncio.run(bot._export_and_send(message, processing_msg, 'csv', 'none', True, None))
+    return jobs
+
+def watermark(bot):
+    return int(bot.db_manager.get_config_value(WATERMARK_KEY, '0'))
+
+def test_partial_upload_failure_keeps_watermark(bot):
+    bot.db_manager.set_config_value(WATERMARK_KEY, '10')
+    result = ExportResult(['a.part1.csv', 'a.part2.csv', 'a.part3.csv'], rows=30, last_id=40)
+    sender = FakeSender(fail_at=2)
+
+    assert run_delta_export(bot, result, sender) == [10]
+    assert sender.uploads == 2
+    assert watermark(bot) == 10
+    assert '第 2/3 卷发送失败' in sender.edits[-1]
+
+def test_full_upload_advances_watermark(bot):
+    bot.db_manager.set_config_value(WATERMARK_KEY, '10')
+    result = ExportResult(['a.part1.csv', 'a.part2.csv', 'a.part3.csv'], rows=30, last_id=40)
+    sender = FakeSender()
+
+    run_delta_export(bot, result, sender)
+    assert sender.uploads == 3
+    assert watermark(bot) == 40
+    # 下一次增量导出从新水位开始
+    assert run_delta_export(bot, ExportResult([], rows=0, last_id=40), FakeSender()) == [40]
+
+def test_older_concurrent_export_does_not_move_watermark_back(bot):
+    result = ExportResult(['a.csv'], rows=10, last_id=10)
+
+    def newer_export_finishes():
+        # 本次导出读取水位之后、上传完成之前，另一个覆盖到 ID 20 的导出已推进水位
+        assert bot.db_manager.advance_export_watermark(WATERMARK_KEY, 0, 20)
+
+    run_delta_export(bot, result, FakeSender(), during_job=newer_export_finishes)
+    assert watermark(bot) == 20
+
+def test_advance_requires_range_to_cover_watermark(bot):
+    db = bot.db_manager
+    # 没有水位时从0开始
+    assert db.advance_export_watermark(WATERMARK_KEY, 0, 15)
+    # since <日期> 的起点晚于水位时不推进，避免漏导中间的记录
+    assert not db.advance_export_watermark(WATERMARK_KEY, 20, 30)
+    # 没有新记录时不变
+    assert not db.advance_export_watermark(WATERMARK_KEY, 15, 15)
+    assert db.advance_export_watermark(WATERMARK_KEY, 5, 30)
+    assert watermark(bot) == 30
@@ -0,0 +1,90 @@
+"""
+导出分卷测试：分卷只在记录边界切分，按序号拼接解压后的内容与不分卷的导出完全相同
+"""
+
+import os
+import gzip
+import json
+import zipfile
+from datetime import datetime
+import pytest
+from 核心模块.数据库管理 import PhoneRecord
+from 核心模块.导出管理器 import ExportManager
+
+# 压缩器攒够一块数据才输出，记录数要足够多，压缩后的文件才会达到分卷大小
+RECORD_COUNT = 6000
+PART_SIZE = 20000
+
+# 每种格式中一条记录开头的文本（序号从1开始），分卷只能从这里开始
+RECORD_STARTS = {
+    'csv': lambda number: f'{number},'.encode(),
+    'json': lambda number: b',\n    {',
+    'txt': lambda number: f'{number}. '.encode(),
+}
+
+def make_records():
+    return [
+        PhoneRecord(
+            record_id=i, phone_number=f'138{i:08d}', username=f'user{i % 7}' if i % 3 else None,
+            user_id=1000 + i % 7, first_name=f'提交人{i % 7}',
+            timestamp=f'2024-01-{1 + i % 28:02d} 08:{i % 60:02d}:00', group_id=-100,
+            original_message=f'客户 138{i:08d} 备注{"，" * (i % 5)}', is_duplicate=int(i % 4 == 0),
+        )
+        for i in range(1, RECORD_COUNT + 1)
+    ]
+
+def export(manager, fmt, records, filename, compression, part_size):
+    if fmt == 'csv':
+        return manager.export_to_csv(records, filename, compression=compression, part_size=part_size)
+    if fmt == 'json':
+        return manager.export_to_json(records, filename, compression=compression, part_size=part_size)
+    return manager.export_to_text(records, filename, compression=compression, part_size=part_size)
+
+def read_part(path, compression):
+    if compression == 'gzip':
+        with gzip.open(path, 'rb') as part:
+            return part.read()
+    if compression == 'zip':
+        with zipfile.ZipFile(path) as archive:
+            (name,) = archive.namelist()
+            return archive.read(name)
+    with open(path, 'rb') as part:
+        return part.read()
+
+@pytest.mark.parametrize('compression', ['none', 'gzip', 'zip'])
+@pytest.mark.parametrize('fmt', ['csv', 'json', 'txt'])
+def test_parts_rejoin_to_unsplit_export(tmp_path, fmt, compression):
+    manager = ExportManager(str(tmp_path))
+    # 固定导出时间，两次导出的标题行相同
+    export_time = datetime(2024, 2, 1, 12, 0, 0, tzinfo=manager.time_formatter.timezone)
+    manager.time_formatter.now = lambda: export_time
+    records = make_records()
+
+    whole = export(manager, fmt, records, f'whole.{fmt}', compression, None)
+    split = export(manager, fmt, records, f'split.{fmt}', compression, PART_SIZE)
+
+    assert len(whole.paths) == 1
+    assert len(split.paths) > 2
+    assert [path.rsplit('.part', 1)[1].split('.', 1)[0] for path in split.paths] == \
+        [str(number) for number in range(1, len(split.paths) + 1)]
+
+    expected = read_part(whole.paths[0], compression)
+    parts = [read_part(path, compression) for path in split.paths]
+    assert b''.join(parts) == expected
+    assert split.raw_bytes == whole.raw_bytes == len(expected)
+
+    # 分卷在磁盘上达到大小上限后才切换
+    assert all(os.path.getsize(path) >= PART_SIZE for path in split.paths[:-1])
+    # 每个后续分卷都从一条完整记录的开头开始（JSON 的结尾括号可能单独落在最后一卷）
+    starts = {RECORD_STARTS[fmt](number) for number in range(2, RECORD_COUNT + 1)}
+    if fmt == 'json':
+        starts.add(b'\n  ]\n}')
+    for part in parts[1:]:
+        assert any(part.startswith(start) for start in starts)
+
+    if fmt == 'json':
+        document = json.loads(b''.join(parts))
+        assert document['total_records'] == RECORD_COUNT
+        assert [item['phone_number'] for item in document['records']] == [record.phone_number for record in records]
+        # 除最后一卷外，每卷都以一条完整记录结尾
+        assert all(part.endswith(b'}') for part in parts[:-1])
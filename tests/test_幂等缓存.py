@@ -0,0 +1,108 @@
+"""
+幂等缓存测试：TTL 过期、容量上限、后台批量写入数据库和停止前写入
+"""
+
+import time
+import asyncio
+import threading
+from 核心模块.配置管理 import Config
+from 核心模块.幂等缓存 import IdempotencyCache
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class FakeDatabase:
+    """记录每批写入的条目和执行写入的线程"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self.threads = set()
+        self.purges = []
+
+    def load_processed_updates(self, now, limit):
+        return []
+
+    def purge_processed_updates(self, now):
+        self.purges.append(now)
+        return 0
+
+    def add_processed_updates(self, entries):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        self.batches.append(list(entries))
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = IdempotencyCache(ttl=60, max_size=100, clock=clock)
+
+    assert cache.add(-1, 1)
+    assert not cache.add(-1, 1)
+    assert cache.seen(-1, 1)
+
+    clock.now += 59
+    assert not cache.add(-1, 1)
+    clock.now += 1
+    assert not cache.seen(-1, 1)
+    assert cache.add(-1, 1)
+    assert cache.get_stats()['duplicates'] == 2
+
+def test_capacity_cap_drops_oldest():
+    cache = IdempotencyCache(ttl=3600, max_size=3, clock=FakeClock())
+    for message_id in range(5):
+        assert cache.add(-1, message_id)
+
+    assert len(cache) == 3
+    assert not cache.seen(-1, 0) and not cache.seen(-1, 1)
+    assert all(cache.seen(-1, message_id) for message_id in (2, 3, 4))
+
+def test_persist_batched_in_background_thread():
+    db = FakeDatabase(delay=0.05)
+    cache = IdempotencyCache(ttl=3600, max_size=1000, db_manager=db)
+
+    async def scenario():
+        cache.add(-1, 0)
+        # add() 不在事件循环中访问数据库
+        assert db.batches == []
+        await asyncio.sleep(0.01)
+        # 第一批写入期间新增的条目合并为下一批
+        for message_id in range(1, 101):
+            cache.add(-1, message_id)
+        assert cache.get_stats()['pending_writes'] == 100
+        await cache.flush()
+
+    asyncio.run(scenario())
+    assert [len(batch) for batch in db.batches] == [1, 100]
+    assert [entry[:2] for batch in db.batches for entry in batch] == [(-1, i) for i in range(101)]
+    assert threading.get_ident() not in db.threads
+    assert cache.get_stats()['pending_writes'] == 0
+
+def test_post_stop_flushes_pending_writes(tmp_path, monkeypatch):
+    """机器人的 post_stop 钩子写入尚未保存的记录，重启后的缓存能加载它们"""
+    monkeypatch.setattr(Config, 'BOT_TOKEN', '123456:TEST')
+    monkeypatch.setattr(Config, 'BOT_MODE', 'polling')
+    monkeypatch.setattr(Config, 'DATABASE_PATH', str(tmp_path / 'idempotency.db'))
+    monkeypatch.setattr(Config, 'IDEMPOTENCY_PERSIST', True)
+    from 核心模块.机器人主程序 import TelegramPhoneBot
+
+    bot = TelegramPhoneBot()
+
+    async def scenario():
+        for message_id in range(50):
+            bot.processed_updates.add(-100, message_id)
+        await bot.application.post_stop(bot.application)
+        # 钩子返回时已全部写入，不依赖事件循环关闭前后台任务恰好完成
+        return len(bot.db_manager.load_processed_updates(time.time(), 1000))
+
+    try:
+        assert asyncio.run(scenario()) == 50
+        assert bot.processed_updates.get_stats()['pending_writes'] == 0
+        restarted = IdempotencyCache(db_manager=bot.db_manager)
+    finally:
+        bot._cleanup()
+    assert len(restarted) == 50
+    assert not restarted.add(-100, 49)
@@ -0,0 +1,50 @@
+"""
+汇总模式测试：停止时发布最后一个周期的汇总
+"""
+
+import asyncio
+from 核心模块.配置管理 import Config
+from 核心模块.汇总模式 import DigestManager
+
+def test_stop_publishes_pending_window():
+    """stop() 发布尚未到期的本周期汇总"""
+    published = []
+
+    async def publish(chat_id, window):
+        published.append((chat_id, list(window.new_numbers), window.duplicates))
+
+    async def scenario():
+        manager = DigestManager(publish, groups={-100}, interval_minutes=60)
+        manager.record(-100, '13812345678', 'U', False)
+        manager.record(-100, '13812345678', 'U', True)
+        await manager.stop()
+
+    asyncio.run(scenario())
+    assert published == [(-100, ['13812345678'], 1)]
+
+def test_post_stop_flushes_digest_before_shutdown(tmp_path, monkeypatch):
+    """机器人的 post_stop 钩子（Bot 仍可用时执行）发布最后的汇总并清空发送队列"""
+    monkeypatch.setattr(Config, 'BOT_TOKEN', '123456:TEST')
+    monkeypatch.setattr(Config, 'BOT_MODE', 'polling')
+    monkeypatch.setattr(Config, 'DATABASE_PATH', str(tmp_path / 'digest.db'))
+    monkeypatch.setattr(Config, 'DIGEST_GROUPS', [-100])
+    from 核心模块.机器人主程序 import TelegramPhoneBot
+
+    bot = TelegramPhoneBot()
+    published = []
+
+    async def publish(chat_id, window):
+        published.append((chat_id, list(window.new_numbers)))
+
+    bot.digest_manager.publish = publish
+    assert bot.application.post_stop == bot._post_stop
+
+    async def scenario():
+        bot.digest_manager.record(-100, '13812345678', 'U', False)
+        await bot.application.post_stop(bot.application)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        bot._cleanup()
+    assert published == [(-100, ['13812345678'])]
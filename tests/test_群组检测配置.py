@@ -0,0 +1,59 @@
+"""
+群组检测配置测试：配置文件只在修改后重新解析，定期重新加载不在事件循环线程中读取数据库
+"""
+
+import os
+import json
+import asyncio
+import threading
+from 核心模块.配置管理 import Config
+from 核心模块.号码检测器 import PhoneDetector
+from 核心模块.群组检测配置 import PROFILE_KEY_PREFIX, DetectorRegistry
+
+class FakeConfigStore:
+    """只实现 get_config_values 的数据库替身，记录调用所在的线程"""
+
+    def __init__(self, values=None):
+        self.values = values or {}
+        self.threads = []
+
+    def get_config_values(self, prefix):
+        self.threads.append(threading.get_ident())
+        return {key: value for key, value in self.values.items() if key.startswith(prefix)}
+
+def _write_profiles(path, data, mtime):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+def test_file_parsed_only_when_mtime_changes(tmp_path, monkeypatch):
+    profiles_path = tmp_path / 'profiles.json'
+    _write_profiles(profiles_path, {'-100': {'min_length': 9}}, 1_000_000)
+
+    registry = DetectorRegistry(PhoneDetector(), profiles_file=str(profiles_path))
+    assert registry.get_profile(-100).min_length == 9
+
+    loads = []
+    original = registry._load_file_profiles
+    monkeypatch.setattr(registry, '_load_file_profiles', lambda: loads.append(1) or original())
+
+    registry.reload()
+    assert loads == []
+
+    _write_profiles(profiles_path, {'-100': {'min_length': 10}}, 1_000_100)
+    registry.reload()
+    assert loads == [1]
+    assert registry.get_profile(-100).min_length == 10
+
+def test_reload_if_changed_reads_database_off_event_loop(monkeypatch):
+    monkeypatch.setattr(Config, 'DETECTOR_PROFILES_RELOAD_INTERVAL', 0)
+    store = FakeConfigStore({f'{PROFILE_KEY_PREFIX}-200': json.dumps({'max_length': 12})})
+    registry = DetectorRegistry(PhoneDetector(), db_manager=store, profiles_file='')
+    store.threads.clear()
+
+    async def scenario():
+        await registry.reload_if_changed()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert store.threads and loop_thread not in store.threads
+    assert registry.get_profile(-200).max_length == 12
@@ -0,0 +1,74 @@
+"""
+速率限制测试：窗口边界上的滑动估算、按群组限制和空闲计数器淘汰（模拟时钟）
+"""
+
+from 核心模块.速率限制 import SlidingWindowRateLimiter, parse_group_limits
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def accepted(limiter, chat_id, user_id, count):
+    return sum(limiter.check(chat_id, user_id) for _ in range(count))
+
+def test_sliding_estimate_at_bucket_boundary():
+    clock = FakeClock()
+    limiter = SlidingWindowRateLimiter(10, 60, group_limits={}, clock=clock)
+
+    assert accepted(limiter, -1, 1, 11) == 10
+    # 刚滚动到下一窗口时上一窗口仍完整计入
+    clock.now = 60.0
+    assert not limiter.check(-1, 1)
+    # 窗口过半时上一窗口只计一半
+    clock.now = 90.0
+    assert accepted(limiter, -1, 1, 10) == 5
+    # 跳过两个以上窗口后两个桶都归零
+    clock.now = 300.0
+    assert accepted(limiter, -1, 1, 11) == 10
+    assert limiter.get_stats()['rejected'] == 1 + 1 + 5 + 1
+
+def test_group_limits_override_default():
+    clock = FakeClock()
+    limits = parse_group_limits('-100:3/10, bad, -200:20/60')
+    assert limits == {-100: (3, 10.0), -200: (20, 60.0)}
+    limiter = SlidingWindowRateLimiter(5, 60, group_limits=limits, clock=clock)
+
+    assert accepted(limiter, -100, 1, 10) == 3
+    assert accepted(limiter, -200, 1, 30) == 20
+    assert accepted(limiter, -300, 1, 10) == 5
+    # 同一用户在不同群组分别计数，窗口较短的群组先恢复
+    clock.now = 20.0
+    assert accepted(limiter, -100, 1, 10) == 3
+    assert accepted(limiter, -300, 1, 10) == 0
+
+def test_idle_counters_evicted():
+    clock = FakeClock()
+    limiter = SlidingWindowRateLimiter(5, 10, group_limits={}, clock=clock)
+    for user_id in range(100):
+        limiter.check(-1, user_id)
+    assert len(limiter) == 100
+
+    clock.now = 19.0
+    limiter.check(-1, 1000)
+    assert len(limiter) == 101
+    clock.now = 20.0
+    limiter.check(-1, 1000)
+    assert len(limiter) == 1
+    assert limiter.get_stats()['evicted'] == 100
+
+def test_long_window_group_does_not_block_eviction():
+    clock = FakeClock()
+    limiter = SlidingWindowRateLimiter(5, 10, group_limits={-100: (50, 600)}, clock=clock)
+    peak = 0
+    for second in range(3000):
+        clock.now = float(second)
+        # 长窗口群组中的老用户偶尔发言，在访问顺序中排到短窗口用户前面
+        if second % 500 == 0:
+            limiter.check(-100, 1)
+        limiter.check(-1, 10000 + second)
+        peak = max(peak, len(limiter))
+    # 短窗口用户在两个窗口（20秒）后淘汰，计数器数量不随时间增长
+    assert peak <= 22
@@ -30,16 +30,26 @@ def print_banner():
     print("🚀 GitHub Actions部署 | 💾 自动备份")
     print("=" * 50)
 
+def get_api_base_url():
+    """Bot API 地址（可指向自建的 Bot API 服务器或本地模拟服务）"""
+    return os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+
 def check_bot_running(bot_token, timeout=5):
-    """检查机器人是否已经在运行"""
+    """检查机器人是否已经在运行（webhook 模式检查 getWebhookInfo，否则用 getUpdates 探测冲突）"""
+    if os.getenv('BOT_MODE', 'polling').lower() == 'webhook':
+        return check_webhook_owner(bot_token, timeout)
+
     try:
         response = requests.get(
-            f'https://api.telegram.org/bot{bot_token}/getUpdates',
+            f'{get_api_base_url()}{bot_token}/getUpdates',
             params={'timeout': 1, 'limit': 1},
             timeout=timeout
         )
 
         if response.status_code == 409:
+            # 已设置 webhook 时 getUpdates 同样返回409
+            if 'webhook' in response.text.lower():
+                return True, "已设置Webhook，可能有webhook模式的实例正在运行"
             return True, "检测到其他实例正在运行"
         elif response.status_code == 200:
             return False, "API连接正常，可以启动"
@@ -55,6 +65,33 @@ def check_bot_running(bot_token, timeout=5):
     except Exception as e:
         return False, f"检查失败: {e}"
 
+def check_webhook_owner(bot_token, timeout=5):
+    """webhook 模式：已注册的 webhook 指向其他地址时视为其他实例正在运行"""
+    try:
+        response = requests.get(f'{get_api_base_url()}{bot_token}/getWebhookInfo', timeout=timeout)
+
+        if response.status_code == 401:
+            return False, "Bot Token无效"
+        elif response.status_code != 200:
+            return False, f"API返回状态码: {response.status_code}"
+
+        info = response.json().get('result', {})
+        current_url = info.get('url', '')
+        expected_url = os.getenv('WEBHOOK_URL', '')
+        if not current_url:
+            return False, "未设置Webhook，可以启动"
+        elif expected_url and current_url != expected_url:
+            return True, f"Webhook已指向其他地址: {current_url}"
+        else:
+            return False, f"Webhook地址: {current_url}，待处理更新 {info.get('pending_update_count', 0)} 条"
+
+    except requests.exceptions.Timeout:
+        return False, "API连接超时"
+    except requests.exceptions.ConnectionError:
+        return False, "网络连接失败"
+    except Exception as e:
+        return False, f"检查失败: {e}"
+
 def wait_for_slot(bot_token, max_wait_minutes=10):
     """等待机器人实例空闲"""
     print(f"⏳ 等待其他实例结束 (最多等待 {max_wait_minutes} 分钟)...")
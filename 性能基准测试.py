@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+号码检测性能基准测试脚本
+使用固定种子生成模拟群聊语料，测量各检测方法的吞吐量和单条延迟，
+结果以 JSON 保存，并可与已保存的基准结果对比以发现性能回退；
+--rate-limiter-users 模式模拟大量不同用户，检查速率限制器的内存是否保持平稳
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+
+# 添加核心模块路径
+project_root = Path(__file__).parent
+core_modules = project_root / "核心模块"
+config_dir = project_root / "配置文件"
+sys.path.insert(0, str(core_modules))
+
+# 设置环境变量文件路径
+env_file = config_dir / "环境配置.env"
+if env_file.exists():
+    os.environ.setdefault('ENV_FILE_PATH', str(env_file))
+
+# 基准测试不写入机器人日志文件，也不输出检测器的常规日志
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+# 被测的检测方法
+BENCHMARK_METHODS = ['detect_phone_number', 'detect_all', 'extract_all_numbers', 'get_detection_info']
+
+# 语料类别及默认占比
+CORPUS_MIX = {
+    'pure': 0.15,        # 纯号码（含各种分隔符和国家码）
+    'keyword': 0.15,     # 关键词 + 号码
+    'chatter': 0.55,     # 普通聊天（含少量数字的干扰消息）
+    'paste': 0.05,       # 长文本粘贴（多行、多个号码）
+    'fullwidth': 0.10,   # 全角数字
+}
+
+CHATTER_TEMPLATES = [
+    '今天天气不错，大家晚上一起吃饭吗？',
+    '好的收到',
+    '辛苦了👍',
+    'ok see you tomorrow at the office',
+    '这个客户明天下午{hour}点再联系',
+    '订单{order}已发货，请注意查收',
+    '会议改到 {hour}:30，在 {floor} 楼',
+    '@张三 你那边怎么样了',
+    '报价单第{floor}页有问题，金额 {amount} 元',
+    '收到，{hour}点前处理完',
+    '昨天跟进了{floor}个客户，今天继续',
+]
+
+KEYWORD_SAMPLES = ['客户', '客户号码', '手机', '电话', '联系方式', '号码', 'Phone', 'tel']
+
+SEPARATORS = ['', ' ', '-', '.']
+
+FULLWIDTH_TABLE = str.maketrans('0123456789', '０１２３４５６７８９')
+
+def _random_mobile(rng: random.Random) -> str:
+    """生成11位手机号"""
+    return rng.choice(['13', '15', '17', '18', '19']) + ''.join(rng.choices('0123456789', k=9))
+
+def _format_number(rng: random.Random, number: str) -> str:
+    """按常见写法格式化号码（分隔符、国家码）"""
+    sep = rng.choice(SEPARATORS)
+    formatted = f'{number[:3]}{sep}{number[3:7]}{sep}{number[7:]}'
+    prefix = rng.random()
+    if prefix < 0.1:
+        formatted = '+86 ' + formatted
+    elif prefix < 0.15:
+        formatted = '0086' + formatted
+    return formatted
+
+def _keyword_line(rng: random.Random) -> str:
+    """生成一行"关键词：号码" """
+    keyword = rng.choice(KEYWORD_SAMPLES)
+    colon = rng.choice(['：', ':', ' ', ''])
+    return f'{keyword}{colon}{_format_number(rng, _random_mobile(rng))}'
+
+def _chatter(rng: random.Random) -> str:
+    """生成一条普通聊天消息"""
+    return rng.choice(CHATTER_TEMPLATES).format(
+        hour=rng.randint(1, 12),
+        floor=rng.randint(1, 30),
+        order=rng.randint(100, 999999),
+        amount=rng.randint(10, 99999)
+    )
+
+def _paste(rng: random.Random) -> str:
+    """生成多行长文本粘贴（客户名单、聊天记录转发等）"""
+    lines = []
+    for _ in range(rng.randint(10, 40)):
+        kind = rng.random()
+        if kind < 0.3:
+            lines.append(_keyword_line(rng))
+        elif kind < 0.4:
+            lines.append(_format_number(rng, _random_mobile(rng)))
+        else:
+            lines.append(_chatter(rng))
+    return '\n'.join(lines)
+
+def generate_corpus(size: int, seed: int = 42, mix: dict = None) -> list:
+    """
+    生成模拟语料
+    相同的 size、seed 和 mix 总是生成完全相同的语料
+    返回: [(category, message), ...]
+    """
+    rng = random.Random(seed)
+    mix = mix or CORPUS_MIX
+    categories = list(mix)
+    weights = [mix[category] for category in categories]
+
+    corpus = []
+    for category in rng.choices(categories, weights=weights, k=size):
+        if category == 'pure':
+            message = _format_number(rng, _random_mobile(rng))
+        elif category == 'keyword':
+            message = _keyword_line(rng)
+            if rng.random() < 0.3:
+                message = f'{_chatter(rng)} {message}'
+        elif category == 'paste':
+            message = _paste(rng)
+        elif category == 'fullwidth':
+            message = _keyword_line(rng) if rng.random() < 0.5 else _random_mobile(rng)
+            message = message.translate(FULLWIDTH_TABLE)
+        else:
+            message = _chatter(rng)
+        corpus.append((category, message))
+
+    return corpus
+
+def _percentile(sorted_values: list, percent: float) -> float:
+    """取已排序列表的百分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def _summarize(latencies_ns: list) -> dict:
+    """汇总一组单条延迟"""
+    total_seconds = sum(latencies_ns) / 1e9
+    latencies_ns = sorted(latencies_ns)
+    return {
+        'messages': len(latencies_ns),
+        'msgs_per_sec': round(len(latencies_ns) / total_seconds, 1) if total_seconds else 0.0,
+        'p50_us': round(_percentile(latencies_ns, 50) / 1000, 3),
+        'p99_us': round(_percentile(latencies_ns, 99) / 1000, 3),
+    }
+
+def benchmark_method(detector, method_name: str, corpus: list, rounds: int = 1) -> dict:
+    """
+    测量单个检测方法
+    返回整体及各语料类别的 msgs_per_sec、p50_us、p99_us
+    """
+    method = getattr(detector, method_name)
+    perf_counter_ns = time.perf_counter_ns
+
+    by_category = {}
+    overall = []
+    for _ in range(rounds):
+        for category, message in corpus:
+            start = perf_counter_ns()
+            method(message)
+            elapsed = perf_counter_ns() - start
+            overall.append(elapsed)
+            by_category.setdefault(category, []).append(elapsed)
+
+    result = _summarize(overall)
+    result['categories'] = {category: _summarize(values) for category, values in sorted(by_category.items())}
+    return result
+
+def create_detector(cache_size: int, extra_keywords: int):
+    """创建被测检测器（可禁用缓存、追加合成关键词以测试关键词规模的影响）"""
+    from 核心模块.号码检测器 import PhoneDetector
+
+    detector = PhoneDetector()
+    detector.cache.max_size = cache_size
+    if extra_keywords:
+        rng = random.Random(0)
+        synthetic = [
+            ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(4, 10)))
+            for _ in range(extra_keywords)
+        ]
+        detector.reload_keywords(list(detector.keywords) + synthetic)
+    return detector
+
+def run_benchmark(args) -> dict:
+    """执行基准测试，返回可序列化的结果"""
+    corpus = generate_corpus(args.size, args.seed)
+    methods = args.methods or BENCHMARK_METHODS
+
+    results = {}
+    for method_name in methods:
+        # 每个方法使用新的检测器，避免缓存和统计互相影响
+        detector = create_detector(args.cache_size, args.extra_keywords)
+        # 预热（正则编译缓存、首次属性查找等）
+        for _, message in corpus[:min(len(corpus), 200)]:
+            getattr(detector, method_name)(message)
+
+        result = benchmark_method(detector, method_name, corpus, args.rounds)
+        results[method_name] = result
+        print(f"📊 {method_name:<22} {result['msgs_per_sec']:>12,.0f} 条/秒  "
+              f"p50 {result['p50_us']:>8.2f}µs  p99 {result['p99_us']:>8.2f}µs")
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'size': args.size,
+            'rounds': args.rounds,
+            'cache_size': args.cache_size,
+            'extra_keywords': args.extra_keywords,
+            'keyword_count': len(detector.keywords),
+        },
+        'results': results,
+    }
+
+def benchmark_rate_limiter(users: int, seed: int, messages_per_second: float = 20.0,
+                           samples: int = 10) -> dict:
+    """
+    模拟 users 个不同用户依次发言（模拟时钟，每秒 messages_per_second 条，其中一半来自活跃老用户），
+    按间隔记录速率限制器的跟踪用户数和内存占用
+    """
+    from 核心模块.速率限制 import SlidingWindowRateLimiter
+
+    rng = random.Random(seed)
+    clock = [0.0]
+    limiter = SlidingWindowRateLimiter(clock=lambda: clock[0])
+    groups = [-1000000000000 - index for index in range(20)]
+
+    tracemalloc.start()
+    baseline_bytes = tracemalloc.get_traced_memory()[0]
+    checkpoints = []
+    interval = max(1, users // samples)
+    start = time.perf_counter()
+    checks = 0
+
+    for user_id in range(1, users + 1):
+        clock[0] += 1.0 / messages_per_second
+        limiter.check(rng.choice(groups), user_id)
+        # 一半消息来自最近的活跃用户
+        limiter.check(rng.choice(groups), max(1, user_id - rng.randint(0, 200)))
+        checks += 2
+
+        if user_id % interval == 0:
+            current_bytes = tracemalloc.get_traced_memory()[0] - baseline_bytes
+            checkpoints.append({'users': user_id, 'tracked': len(limiter), 'memory_kb': round(current_bytes / 1024, 1)})
+            print(f"👤 {user_id:>10,} 用户  跟踪 {len(limiter):>7,}  内存 {current_bytes / 1024:>9,.1f} KB")
+
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    return {
+        'users': users,
+        'checks_per_sec': round(checks / elapsed, 1),
+        'simulated_seconds': round(clock[0], 1),
+        'checkpoints': checkpoints,
+        'stats': limiter.get_stats(),
+    }
+
+def compare_with_baseline(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    与基准结果对比
+    吞吐量下降或 p99 延迟上升超过 threshold（百分比）视为回退
+    返回: 回退描述列表
+    """
+    regressions = []
+    for method_name, result in current['results'].items():
+        base = baseline.get('results', {}).get(method_name)
+        if not base:
+            print(f"⚪ {method_name}: 基准中无此方法，跳过对比")
+            continue
+
+        throughput_change = (result['msgs_per_sec'] / base['msgs_per_sec'] - 1) * 100 if base['msgs_per_sec'] else 0.0
+        p99_change = (result['p99_us'] / base['p99_us'] - 1) * 100 if base['p99_us'] else 0.0
+        regressed = throughput_change < -threshold or p99_change > threshold
+
+        mark = '🔴' if regressed else '🟢'
+        print(f"{mark} {method_name:<22} 吞吐量 {throughput_change:+6.1f}%  p99 {p99_change:+6.1f}%")
+        if regressed:
+            regressions.append(f"{method_name}: 吞吐量 {throughput_change:+.1f}%, p99 {p99_change:+.1f}%")
+
+    return regressions
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='号码检测性能基准测试')
+    parser.add_argument('--size', type=int, default=20000, help='语料消息条数')
+    parser.add_argument('--seed', type=int, default=42, help='语料随机种子')
+    parser.add_argument('--rounds', type=int, default=3, help='每个方法重复测量的轮数')
+    parser.add_argument('--methods', nargs='+', choices=BENCHMARK_METHODS, help='只测试指定方法')
+    parser.add_argument('--cache-size', type=int, default=0, help='检测缓存容量（默认0，测量未缓存的检测）')
+    parser.add_argument('--extra-keywords', type=int, default=0, help='追加的合成关键词数量')
+    parser.add_argument('--output', help='结果保存路径（JSON）')
+    parser.add_argument('--baseline', help='对比的基准结果文件（JSON）')
+    parser.add_argument('--threshold', type=float, default=10.0, help='判定回退的变化百分比')
+    parser.add_argument('--dump-corpus', help='将生成的语料保存为JSON Lines后退出')
+    parser.add_argument('--rate-limiter-users', type=int, help='测试速率限制器：模拟的不同用户数（如 1000000）')
+    args = parser.parse_args()
+
+    if args.rate_limiter_users:
+        print(f"🚦 速率限制器内存测试: {args.rate_limiter_users:,} 个不同用户")
+        result = benchmark_rate_limiter(args.rate_limiter_users, args.seed)
+        print(f"⚡ {result['checks_per_sec']:,.0f} 次检查/秒")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output_file:
+                json.dump(result, output_file, ensure_ascii=False, indent=2)
+            print(f"💾 结果已保存到: {args.output}")
+        return 0
+
+    if args.dump_corpus:
+        with open(args.dump_corpus, 'w', encoding='utf-8') as corpus_file:
+            for category, message in generate_corpus(args.size, args.seed):
+                corpus_file.write(json.dumps({'category': category, 'message': message}, ensure_ascii=False) + '\n')
+        print(f"💾 语料已保存到: {args.dump_corpus}")
+        return 0
+
+    print(f"🚀 号码检测基准测试: {args.size} 条语料 × {args.rounds} 轮, 种子 {args.seed}")
+    current = run_benchmark(args)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(current, output_file, ensure_ascii=False, indent=2)
+        print(f"💾 结果已保存到: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"\n📈 与基准对比 ({args.baseline}, 阈值 {args.threshold:.0f}%):")
+        regressions = compare_with_baseline(current, baseline, args.threshold)
+        if regressions:
+            print(f"❌ 检测到 {len(regressions)} 项性能回退")
+            return 1
+        print("✅ 未检测到性能回退")
+
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
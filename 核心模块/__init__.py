@@ -5,9 +5,13 @@
 
 # 导入所有核心组件
 from .配置管理 import Config, setup_logging
-from .数据库管理 import DatabaseManager
-from .号码检测器 import PhoneDetector
+from .数据库管理 import DatabaseManager, PhoneRecord
+from .号码检测器 import PhoneDetector, DetectionResult
+from .群组检测配置 import DetectorProfile, DetectorRegistry
+from .时间格式化 import TimeFormatter
 from .通知系统 import NotificationSystem
+from .重复通知合并 import DuplicateCoalescer
+from .发送调度 import SendScheduler
 from .导出管理器 import ExportManager
 from .机器人主程序 import TelegramPhoneBot, main
 
@@ -15,8 +19,15 @@ __all__ = [
     'Config',
     'setup_logging', 
     'DatabaseManager',
+    'PhoneRecord',
     'PhoneDetector',
+    'DetectionResult',
+    'DetectorProfile',
+    'DetectorRegistry',
+    'TimeFormatter',
     'NotificationSystem',
+    'DuplicateCoalescer',
+    'SendScheduler',
     'ExportManager',
     'TelegramPhoneBot',
     'main'
@@ -0,0 +1,107 @@
+"""
+关键词匹配模块
+将号码关键词构建为前缀树自动机，一次扫描即可找出所有关键词位置
+"""
+
+import os
+import re
+import logging
+from typing import Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 永不匹配的模式（关键词为空时使用）
+_NEVER_MATCH = '(?!)'
+
+class KeywordAutomaton:
+    """关键词自动机
+
+    所有关键词先合并为一棵前缀树（共享前缀只出现一次），再把前缀树编译为单个
+    正则表达式交给 C 实现的正则引擎执行。与逐个关键词拼接的多分支正则相比，
+    每个位置只需沿前缀树走一条路径，匹配耗时基本不随关键词数量增长。
+
+    构建完成后对象不再修改；更新关键词时构建新实例并整体替换引用。
+    """
+
+    def __init__(self, keywords: Iterable[str], suffix: str = ''):
+        """
+        Args:
+            keywords: 关键词列表（忽略大小写，自动去重）
+            suffix: 追加在关键词之后的正则片段（例如号码捕获组）
+        """
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in keywords if k))
+        self.suffix = suffix
+
+        trie = self._build_trie(self.keywords)
+        keyword_regex = self._trie_to_regex(trie) or _NEVER_MATCH
+
+        # 关键词部分使用命名组，便于定位关键词本身
+        self.pattern = re.compile(f'(?P<keyword>{keyword_regex}){suffix}', re.IGNORECASE)
+
+    @staticmethod
+    def _build_trie(keywords: Iterable[str]) -> dict:
+        """构建前缀树，空字符串键表示关键词在此结束"""
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword.lower():
+                node = node.setdefault(char, {})
+            node[''] = True
+        return trie
+
+    @classmethod
+    def _trie_to_regex(cls, node: dict) -> str:
+        """将前缀树递归编译为正则表达式（较长的关键词优先匹配）"""
+        branches = [
+            re.escape(char) + cls._trie_to_regex(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+
+        if not branches:
+            return ''
+
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+        # 关键词可在此结束时，后续部分为可选（贪婪匹配保证最长关键词优先）
+        if '' in node:
+            return f'(?:{body})?'
+        return body
+
+    def finditer(self, text: str) -> Iterator[re.Match]:
+        """单次扫描返回所有匹配"""
+        return self.pattern.finditer(text)
+
+    def search(self, text: str):
+        """返回第一个匹配"""
+        return self.pattern.search(text)
+
+    def find_keywords(self, text: str) -> List[Tuple[int, int, str]]:
+        """返回所有关键词位置 [(start, end, keyword), ...]"""
+        return [
+            (match.start('keyword'), match.end('keyword'), match.group('keyword'))
+            for match in self.pattern.finditer(text)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+def load_keywords_file(path: str) -> List[str]:
+    """
+    读取关键词文件
+    每行一个关键词，忽略空行和以 # 开头的注释行
+    """
+    keywords = []
+    with open(path, 'r', encoding='utf-8') as keyword_file:
+        for line in keyword_file:
+            keyword = line.strip()
+            if keyword and not keyword.startswith('#'):
+                keywords.append(keyword)
+    return keywords
+
+def get_file_mtime(path: str) -> float:
+    """获取文件修改时间，文件不存在时返回0"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
@@ -0,0 +1,272 @@
+"""
+发送调度模块
+所有发往 Telegram 的消息经同一个队列按优先级发送，遵守全局和单个群组的发送速率，
+遇到 RetryAfter 按要求暂停后重试，避免触发洪水限制后再发出错误提示
+"""
+
+import time
+import heapq
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+from .配置管理 import Config
+
+logger = logging.getLogger(__name__)
+
+# 发送优先级（数值越小越先发送）
+PRIORITY_SUBMISSION = 0   # 号码提交确认、重复提醒
+PRIORITY_QUERY = 1        # 命令查询结果、导出文件、错误提示
+
+PRIORITY_NAMES = {PRIORITY_SUBMISSION: 'submission', PRIORITY_QUERY: 'query'}
+
+# 延迟统计保留的最近发送数
+LATENCY_SAMPLES = 1000
+
+@dataclass(order=True, slots=True)
+class SendJob:
+    """一次待发送的 Bot API 调用"""
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    send: Callable[[], Awaitable] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+class SendScheduler:
+    """出站消息调度器
+
+    - 单个后台任务按优先级取出任务；同一群组两次发送至少间隔 SEND_CHAT_INTERVAL 秒（私聊为
+      SEND_PRIVATE_INTERVAL 秒），全部群组合计每秒不超过 SEND_GLOBAL_RATE 条，受限群组的任务不阻塞其他群组
+    - 不同群组的请求最多 SEND_CONCURRENCY 个同时进行；同一群组同时只有一个请求，保持发送顺序
+    - RetryAfter：整个队列暂停 Telegram 要求的秒数后重试该任务
+    - 连接错误按指数退避重试，最多 SEND_MAX_RETRIES 次；超时（TimedOut）不重试，
+      因为请求可能已经送达，重试会重复发送同一条消息或文件
+    - submit() 返回 Future，需要发送结果（如之后要编辑的消息）时 await，否则无需等待
+    """
+
+    def __init__(self, global_rate: Optional[float] = None, chat_interval: Optional[float] = None,
+                 max_retries: Optional[int] = None, concurrency: Optional[int] = None,
+                 private_interval: Optional[float] = None):
+        global_rate = Config.SEND_GLOBAL_RATE if global_rate is None else global_rate
+        self.global_interval = 1.0 / global_rate if global_rate > 0 else 0.0
+        self.chat_interval = Config.SEND_CHAT_INTERVAL if chat_interval is None else chat_interval
+        self.private_interval = Config.SEND_PRIVATE_INTERVAL if private_interval is None else private_interval
+        self.max_retries = Config.SEND_MAX_RETRIES if max_retries is None else max_retries
+        self.concurrency = Config.SEND_CONCURRENCY if concurrency is None else concurrency
+
+        self._queue: List[SendJob] = []
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        # 正在发送的群组及其任务
+        self._in_flight: Set[int] = set()
+        self._sending: Set[asyncio.Task] = set()
+
+        self._chat_next_at: Dict[int, float] = {}
+        self._global_next_at = 0.0
+        self._paused_until = 0.0
+
+        # 统计
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.flood_waits = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def submit(self, chat_id: int, send: Callable[[], Awaitable],
+               priority: int = PRIORITY_QUERY) -> asyncio.Future:
+        """
+        提交一次发送
+        send 为无参数的协程函数（如 lambda: message.reply_text(...)），每次重试都会重新调用
+        返回: 发送结果的 Future
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+
+        future = loop.create_future()
+        # 不等待结果的调用方不会取走异常，失败已在调度器中记录
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+        self._seq += 1
+        heapq.heappush(self._queue, SendJob(priority, self._seq, chat_id, send, future, time.monotonic()))
+        self._wakeup.set()
+        return future
+
+    def reply(self, message, text: str, priority: int = PRIORITY_QUERY, **kwargs) -> asyncio.Future:
+        """回复消息（message.reply_text）"""
+        return self.submit(message.chat.id, lambda: message.reply_text(text, **kwargs), priority)
+
+    def edit(self, message, text: str, priority: int = PRIORITY_QUERY, **kwargs) -> asyncio.Future:
+        """编辑已发送的消息（message.edit_text）"""
+        return self.submit(message.chat.id, lambda: message.edit_text(text, **kwargs), priority)
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop):
+        """在当前事件循环中启动发送任务（首次提交时启动）"""
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """等待队列发送完毕（最多 timeout 秒）后停止发送任务"""
+        if self._worker is None:
+            return
+
+        deadline = time.monotonic() + timeout
+        while (self._queue or self._sending) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        self._worker.cancel()
+        for task in self._sending:
+            task.cancel()
+        await asyncio.gather(self._worker, *self._sending, return_exceptions=True)
+        self._worker = None
+
+        for job in self._queue:
+            job.future.cancel()
+        if self._queue:
+            logger.warning(f"发送队列停止时丢弃 {len(self._queue)} 条未发送消息")
+        self._queue.clear()
+
+    def _next_ready(self, now: float):
+        """
+        取出优先级最高且所在群组可以发送的任务
+        返回: (job, 0) 或 (None, 最早可发送时间)；只能等正在发送的请求完成时最早时间为 inf
+        """
+        if now < self._paused_until or now < self._global_next_at:
+            return None, max(self._paused_until, self._global_next_at)
+        if len(self._in_flight) >= self.concurrency:
+            return None, float('inf')
+
+        deferred = []
+        ready_job = None
+        earliest = float('inf')
+        while self._queue:
+            job = heapq.heappop(self._queue)
+            if job.chat_id in self._in_flight:
+                # 同一群组上一条还在发送，完成时会唤醒发送循环
+                deferred.append(job)
+                continue
+            chat_ready_at = self._chat_next_at.get(job.chat_id, 0.0)
+            if chat_ready_at <= now:
+                ready_job = job
+                break
+            earliest = min(earliest, chat_ready_at)
+            deferred.append(job)
+
+        for job in deferred:
+            heapq.heappush(self._queue, job)
+        return ready_job, earliest
+
+    async def _run(self):
+        """发送循环"""
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            job, ready_at = self._next_ready(time.monotonic())
+            if job is None:
+                # 等到最早可发送的时间，期间有新任务（可能属于空闲群组）或发送完成时提前醒来
+                self._wakeup.clear()
+                timer = None
+                if ready_at != float('inf'):
+                    timer = asyncio.get_running_loop().call_later(
+                        max(ready_at - time.monotonic(), 0.001), self._wakeup.set
+                    )
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    if timer:
+                        timer.cancel()
+                continue
+
+            self._in_flight.add(job.chat_id)
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _execute(self, job: SendJob):
+        """执行一次发送，完成后允许该群组的下一条发送"""
+        try:
+            await self._send(job)
+        finally:
+            self._in_flight.discard(job.chat_id)
+            self._wakeup.set()
+
+    async def _send(self, job: SendJob):
+        """执行一次发送，按错误类型决定重试或失败"""
+        now = time.monotonic()
+        self._global_next_at = now + self.global_interval
+        # 群组、频道的ID为负数，私聊为正数
+        self._chat_next_at[job.chat_id] = now + (self.chat_interval if job.chat_id < 0 else self.private_interval)
+        if len(self._chat_next_at) > 10000:
+            self._chat_next_at = {chat_id: ready_at for chat_id, ready_at in self._chat_next_at.items() if ready_at > now}
+
+        try:
+            result = await job.send()
+        except RetryAfter as e:
+            self.flood_waits += 1
+            self._paused_until = time.monotonic() + float(e.retry_after)
+            logger.warning(f"触发 Telegram 洪水限制，暂停发送 {e.retry_after} 秒")
+            self._retry(job, e)
+            return
+        except (BadRequest, TimedOut) as e:
+            self._fail(job, e)
+            return
+        except NetworkError as e:
+            # 指数退避：只推迟该群组，其他群组照常发送
+            backoff = min(2 ** job.attempts, 30)
+            self._chat_next_at[job.chat_id] = time.monotonic() + backoff
+            logger.warning(f"发送到 {job.chat_id} 失败，{backoff} 秒后重试: {e}")
+            self._retry(job, e)
+            return
+        except Exception as e:
+            self._fail(job, e)
+            return
+
+        self.sent += 1
+        self._latencies.append(time.monotonic() - job.enqueued_at)
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _retry(self, job: SendJob, error: Exception):
+        """重新入队，超过重试次数时失败"""
+        job.attempts += 1
+        if job.attempts > self.max_retries:
+            self._fail(job, error)
+            return
+        self.retries += 1
+        heapq.heappush(self._queue, job)
+
+    def _fail(self, job: SendJob, error: Exception):
+        """记录失败并把异常交给等待方"""
+        self.failed += 1
+        logger.error(f"发送到 {job.chat_id} 失败: {error}")
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def get_stats(self) -> dict:
+        """获取队列深度、发送延迟等统计"""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for job in self._queue:
+            name = PRIORITY_NAMES.get(job.priority, str(job.priority))
+            depth[name] = depth.get(name, 0) + 1
+
+        latencies = sorted(self._latencies)
+        return {
+            'queue_depth': len(self._queue),
+            'in_flight': len(self._in_flight),
+            'queue_by_priority': depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'flood_waits': self.flood_waits,
+            'paused_seconds': max(0.0, self._paused_until - time.monotonic()),
+            'latency_p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            'latency_p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0,
+        }
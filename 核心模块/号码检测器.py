@@ -4,44 +4,303 @@
 """
 
 import re
+import time
+import hashlib
 import logging
-from typing import Optional, List, Tuple
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from itertools import islice
+from typing import Iterable, Iterator, Optional, List, Tuple, Union
 from .配置管理 import Config
+from .关键词匹配 import KeywordAutomaton, load_keywords_file, get_file_mtime
+from .号码规范化 import CHINESE_NUMERALS, NumberCanonicalizer, build_digit_translation, normalize_digits
 
 logger = logging.getLogger(__name__)
 
+# 关键词之后的号码部分（可能包含分隔符）
+KEYWORD_NUMBER_SUFFIX = r'\s*([\d\s\-\(\)\.\+]+)'
+
+# 多行消息中没有关键词的行只有整行由数字和分隔符组成时才按纯号码检测（避免把聊天中的日期、金额当作号码）
+NUMBER_LINE_PATTERN = re.compile(r'[\d\s\-\(\)\.\+]+')
+
+# 预过滤时删除的 ASCII 数字字节
+_ASCII_DIGITS = b'0123456789'
+
+# 缓存未命中标记（None 本身是合法的检测结果）
+_MISSING = object()
+
+# 检测规则
+RULE_PURE_NUMBER = 'pure_number'
+RULE_KEYWORD = 'keyword'
+
+# 候选片段的拒绝原因
+REJECT_NO_DIGITS = 'no_digits'
+REJECT_TOO_SHORT = 'too_short'
+REJECT_TOO_LONG = 'too_long'
+REJECT_INVALID_PATTERN = 'invalid_pattern'
+REJECT_DUPLICATE = 'duplicate'
+
+@dataclass(slots=True)
+class DetectionCandidate:
+    """检测过程中考察过的一个候选片段"""
+    rule: str                       # 匹配的规则（RULE_*）
+    start: int                      # 片段在原消息中的起止位置
+    end: int
+    text: str                       # 原始片段（数字已规范化为 ASCII）
+    number: str                     # 清理、规范化后的号码
+    keyword: Optional[str] = None   # 关键词规则命中的关键词
+    rejected: Optional[str] = None  # 拒绝原因（REJECT_*），None 表示被采纳
+
+_CANDIDATE_FIELDS = tuple(f.name for f in fields(DetectionCandidate))
+
+@dataclass(slots=True)
+class DetectionResult:
+    """单次检测的结构化结果"""
+    message: str
+    numbers: Tuple[str, ...] = ()
+    candidates: List[DetectionCandidate] = field(default_factory=list)
+    prefiltered: bool = False       # 数字过少，未进入扫描
+    elapsed_us: float = 0.0
+
+    @property
+    def phone(self) -> Optional[str]:
+        """第一个检测到的号码"""
+        return self.numbers[0] if self.numbers else None
+
+    @property
+    def method(self) -> Optional[str]:
+        """第一个号码所用的检测规则"""
+        for candidate in self.candidates:
+            if candidate.rejected is None:
+                return candidate.rule
+        return None
+
+    def to_dict(self) -> dict:
+        """转换为字典（兼容原 get_detection_info 的字段）"""
+        return {
+            'original_message': self.message,
+            'detected_phone': self.phone,
+            'detection_method': self.method,
+            'all_numbers': list(self.numbers),
+            'is_valid': bool(self.numbers),
+            'prefiltered': self.prefiltered,
+            'candidates': [
+                {name: getattr(candidate, name) for name in _CANDIDATE_FIELDS}
+                for candidate in self.candidates
+            ],
+            'elapsed_us': round(self.elapsed_us, 2)
+        }
+
+class DetectionCache:
+    """检测结果LRU缓存（线程安全）
+
+    以消息文本的 blake2b 摘要为键，不保留原文；容量为0时禁用。
+    clear() 会递增代数，清空前开始的检测不会把旧结果写回缓存。
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(mode: bytes, message: str) -> bytes:
+        """生成缓存键：检测模式 + 消息摘要"""
+        return mode + hashlib.blake2b(message.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, key: bytes):
+        """查找缓存，未命中时返回 _MISSING"""
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key: bytes, value, generation: int):
+        """写入缓存；generation 已过期（期间发生过清空）时丢弃"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存（关键词或长度限制变化时调用）"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def get_stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0.0
+            }
+
+# 批量检测工作进程内的检测器（每个进程初始化一次）
+_worker_detector: Optional['PhoneDetector'] = None
+
+def _init_batch_worker(keywords: Tuple[str, ...], min_length: int, max_length: int,
+                       canonical_prefixes: str, chinese_numerals: bool):
+    """进程池初始化函数：按主进程的配置创建检测器"""
+    global _worker_detector
+    _worker_detector = PhoneDetector(keywords, min_length, max_length, canonical_prefixes, chinese_numerals)
+
+def _detect_chunk(messages: List[str], detect_all: bool) -> list:
+    """在工作进程中检测一块消息"""
+    detect = _worker_detector.detect_all if detect_all else _worker_detector.detect_phone_number
+    return [detect(message) for message in messages]
+
+def _iter_chunks(messages: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    """将消息流切分为固定大小的块"""
+    iterator = iter(messages)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
 class PhoneDetector:
     """号码检测器"""
     
-    def __init__(self):
-        self.keywords = Config.PHONE_KEYWORDS
-        self.min_length = Config.MIN_PHONE_LENGTH
-        self.max_length = Config.MAX_PHONE_LENGTH
-        
+    def __init__(self, keywords: Optional[Iterable[str]] = None,
+                 min_length: Optional[int] = None, max_length: Optional[int] = None,
+                 canonical_prefixes: Optional[str] = None,
+                 chinese_numerals: Optional[bool] = None):
+        """
+        Args:
+            keywords: 关键词列表，未指定时从关键词文件或默认配置加载（并支持热加载）
+            min_length: 号码最小长度，默认 Config.MIN_PHONE_LENGTH
+            max_length: 号码最大长度，默认 Config.MAX_PHONE_LENGTH
+            canonical_prefixes: 号码前缀规范化规则，默认 Config.CANONICAL_PREFIXES
+            chinese_numerals: 是否识别中文数字，默认 Config.NORMALIZE_CHINESE_NUMERALS
+        """
+        # 检测结果缓存（关键词或长度限制变化时自动清空）
+        self.cache = DetectionCache(Config.DETECTION_CACHE_SIZE)
+
+        # 号码规范化（去掉国家码/长途前缀，使不同写法对应同一个号码）
+        self.canonicalizer = NumberCanonicalizer.from_spec(
+            Config.CANONICAL_PREFIXES if canonical_prefixes is None else canonical_prefixes
+        )
+
+        # 数字规范化（全角等 Unicode 数字转为 ASCII，可选中文数字）
+        self.chinese_numerals = Config.NORMALIZE_CHINESE_NUMERALS if chinese_numerals is None else chinese_numerals
+        self.digit_translation = build_digit_translation(self.chinese_numerals)
+
+        self.min_length = min_length if min_length is not None else Config.MIN_PHONE_LENGTH
+        self.max_length = max_length if max_length is not None else Config.MAX_PHONE_LENGTH
+
+        # 关键词文件热加载状态（显式指定关键词时不使用文件）
+        self.keywords_file = Config.KEYWORDS_FILE if keywords is None else None
+        self._keywords_mtime = get_file_mtime(self.keywords_file) if self.keywords_file else 0.0
+        self._next_reload_check = time.monotonic() + Config.KEYWORDS_RELOAD_INTERVAL
+
+        # 检测统计（预过滤拒绝数等）
+        self.stats = {'checked': 0, 'prefiltered': 0}
+
         # 编译正则表达式以提高性能
         self._compile_patterns()
+        self.reload_keywords(self._load_keywords() if keywords is None else keywords)
+
+    @property
+    def min_length(self) -> int:
+        """号码最小长度"""
+        return self._min_length
+
+    @min_length.setter
+    def min_length(self, value: int):
+        self._min_length = value
+        self.cache.clear()
+
+    @property
+    def max_length(self) -> int:
+        """号码最大长度"""
+        return self._max_length
+
+    @max_length.setter
+    def max_length(self, value: int):
+        self._max_length = value
+        self.cache.clear()
+
+    @property
+    def keywords(self) -> Tuple[str, ...]:
+        """当前生效的关键词"""
+        return self.keyword_automaton.keywords
+
+    @property
+    def keyword_pattern(self) -> re.Pattern:
+        """当前生效的关键词号码模式"""
+        return self.keyword_automaton.pattern
+
+    def _load_keywords(self) -> List[str]:
+        """加载关键词：关键词文件存在时使用文件，否则使用默认配置"""
+        if self.keywords_file and self._keywords_mtime:
+            try:
+                keywords = load_keywords_file(self.keywords_file)
+                logger.info(f"从文件加载 {len(keywords)} 个关键词: {self.keywords_file}")
+                return keywords
+            except Exception as e:
+                logger.error(f"读取关键词文件失败，使用默认关键词: {e}")
+        return list(Config.PHONE_KEYWORDS)
+
+    def reload_keywords(self, keywords: Iterable[str]):
+        """
+        重建关键词自动机并原子替换
+        新自动机构建完成前，正在进行的检测继续使用旧实例
+        """
+        self.keyword_automaton = KeywordAutomaton(keywords, suffix=KEYWORD_NUMBER_SUFFIX)
+        self.cache.clear()
+
+    def reload_if_changed(self) -> bool:
+        """
+        检查关键词文件是否有变更（按 KEYWORDS_RELOAD_INTERVAL 节流）
+        有变更时重新加载，返回是否发生了重新加载
+        """
+        now = time.monotonic()
+        if not self.keywords_file or now < self._next_reload_check:
+            return False
+        self._next_reload_check = now + Config.KEYWORDS_RELOAD_INTERVAL
+
+        mtime = get_file_mtime(self.keywords_file)
+        if mtime == self._keywords_mtime:
+            return False
+
+        self._keywords_mtime = mtime
+        try:
+            self.reload_keywords(self._load_keywords())
+            logger.info(f"关键词已热加载，当前共 {len(self.keywords)} 个")
+            return True
+        except Exception as e:
+            logger.error(f"关键词热加载失败，继续使用旧关键词: {e}")
+            return False
     
     def _compile_patterns(self):
         """编译正则表达式模式"""
         # 纯数字模式（8-15位）
         self.pure_number_pattern = re.compile(r'^\d{8,15}$')
 
-        # 带关键词的模式 - 修复为单个捕获组
-        keyword_patterns = []
-        for keyword in self.keywords:
-            # 转义特殊字符并创建模式
-            escaped_keyword = re.escape(keyword)
-            # 匹配关键词后跟数字（可能包含分隔符）
-            pattern = f'{escaped_keyword}\\s*([\\d\\s\\-\\(\\)\\.\\+]+)'
-            keyword_patterns.append(pattern)
-
-        # 合并所有关键词模式，使用非捕获组
-        combined_pattern = '(?:' + ')|(?:'.join(keyword_patterns) + ')'
-        self.keyword_pattern = re.compile(combined_pattern, re.IGNORECASE)
-
         # 数字提取模式（提取所有数字）
         self.digit_pattern = re.compile(r'\d+')
 
+        # 单个数字模式（预过滤统计非ASCII消息中的数字个数，启用时包括中文数字）
+        chinese = ''.join(CHINESE_NUMERALS) if self.chinese_numerals else ''
+        self.single_digit_pattern = re.compile(f'[\\d{chinese}]')
+
         # 无效号码模式
         self.invalid_patterns = [
             re.compile(r'^0+$'),  # 全零
@@ -51,76 +310,214 @@ class PhoneDetector:
     def detect_phone_number(self, message: str) -> Optional[str]:
         """
         从消息中检测并提取号码
-        返回清理后的号码字符串，如果没有检测到有效号码则返回None
+        返回单次扫描找到的第一个号码，如果没有检测到有效号码则返回None
         """
-        if not message or not message.strip():
+        message = self._prefilter(message) if message else None
+        if message is None:
             return None
-        
-        message = message.strip()
-        
-        # 方法1: 检查是否为纯数字消息
-        phone = self._detect_pure_number(message)
-        if phone:
-            return phone
-        
-        # 方法2: 检查带关键词的消息
-        phone = self._detect_keyword_number(message)
+
+        numbers = self._cached_detect(b'1', message, self._scan_first)
+        return numbers[0] if numbers else None
+
+    def detect_all(self, message: str) -> List[str]:
+        """
+        从消息中检测所有号码（单次线性扫描）
+        整条消息符合纯数字规则时只返回该号码；否则逐行处理：
+        含关键词的行提取每个关键词后的号码，其余行按纯数字规则检测。
+        返回按出现顺序去重后的号码列表
+        """
+        message = self._prefilter(message) if message else None
+        if message is None:
+            return []
+
+        return list(self._cached_detect(b'a', message, self._scan))
+
+    def analyze(self, message: str) -> DetectionResult:
+        """
+        检测并记录完整过程（用于调试和 /detail 等解释场景）
+        与 detect_all 执行同一次扫描，额外记录每个候选片段、匹配的规则、
+        拒绝原因和耗时；不经过缓存，也不计入预过滤统计
+        """
+        result = DetectionResult(message=message or '')
+        if not message:
+            return result
+
+        started = time.perf_counter_ns()
+        digit_count, normalized = self._count_and_normalize(message)
+        if digit_count < self.min_length:
+            result.prefiltered = True
+        else:
+            result.numbers = self._scan(normalized, result.candidates)
+        result.elapsed_us = (time.perf_counter_ns() - started) / 1000
+        return result
+
+    def _scan_first(self, message: str) -> Tuple[str, ...]:
+        """扫描到第一个号码即停止（detect_phone_number 的热路径）"""
+        return self._scan(message, first_only=True)
+
+    def _scan(self, message: str, trace: Optional[List[DetectionCandidate]] = None,
+              first_only: bool = False) -> Tuple[str, ...]:
+        """
+        扫描所有号码（未经缓存），返回不可变元组以便缓存共享
+        trace 不为 None 时把每个候选片段追加到其中（热路径传 None，不产生额外对象）；
+        first_only 为 True 时找到第一个号码即停止
+        """
+        stripped = message.strip()
+        offset = len(message) - len(message.lstrip()) if trace is not None else 0
+
+        # 整条消息即一个号码
+        phone = self._consider(RULE_PURE_NUMBER, stripped, offset, None, trace)
         if phone:
-            return phone
-        
-        return None
-    
-    def _detect_pure_number(self, message: str) -> Optional[str]:
-        """检测纯数字消息"""
-        # 清理消息，只保留数字
-        cleaned = self._clean_number(message)
-        
-        if not cleaned:
-            return None
-        
-        # 验证长度
-        if not (self.min_length <= len(cleaned) <= self.max_length):
+            return (phone,)
+
+        # 使用字典保持出现顺序并去重
+        found = {}
+        automaton = self.keyword_automaton
+        lines = stripped.splitlines()
+        # 单行消息已按纯数字规则整体检测过，不必逐行重复
+        multiline = len(lines) > 1
+        line_start = offset
+        for line in lines:
+            if trace is not None:
+                line_start = message.find(line, line_start)
+
+            keyword_matched = False
+            for match in automaton.finditer(line):
+                keyword_matched = True
+                group = match.lastindex
+                self._consider(RULE_KEYWORD, match.group(group), line_start + match.start(group),
+                               match.group('keyword'), trace, found)
+                if first_only and found:
+                    return tuple(found)
+
+            if multiline and not keyword_matched and NUMBER_LINE_PATTERN.fullmatch(line.strip()):
+                self._consider(RULE_PURE_NUMBER, line, line_start, None, trace, found)
+                if first_only and found:
+                    return tuple(found)
+            line_start += len(line)
+
+        if len(found) > 1:
+            logger.debug(f"检测到多个号码: {list(found)}")
+        return tuple(found)
+
+    def _consider(self, rule: str, text: str, start: int, keyword: Optional[str],
+                  trace: Optional[List[DetectionCandidate]], found: Optional[dict] = None) -> Optional[str]:
+        """
+        清理并验证一个候选片段
+        合格且未出现过时加入 found 并返回号码；否则返回None
+        """
+        number = self._clean_number(text)
+        reason = self._reject_reason(number)
+        if reason is None and found is not None:
+            if number in found:
+                reason = REJECT_DUPLICATE
+            else:
+                found[number] = None
+
+        if trace is not None:
+            trace.append(DetectionCandidate(rule, start, start + len(text), text, number, keyword, reason))
+        return number if reason is None else None
+
+    def _cached_detect(self, mode: bytes, message: str, detect):
+        """经LRU缓存执行检测：重复的消息文本直接返回上次结果"""
+        cache = self.cache
+        if not cache.max_size:
+            return detect(message)
+
+        key = cache.make_key(mode, message)
+        result = cache.get(key)
+        if result is _MISSING:
+            generation = cache.generation
+            result = detect(message)
+            cache.put(key, result, generation)
+        return result
+
+    def _prefilter(self, message: str) -> Optional[str]:
+        """
+        快速预过滤 + 数字规范化
+        数字个数少于号码最小长度的消息不可能包含号码，返回None，直接跳过正则检测；
+        否则返回数字已统一为 ASCII 的消息
+        """
+        self.stats['checked'] += 1
+
+        # ASCII 消息（最常见）内联计数，省去一次方法调用
+        if message.isascii():
+            raw = message.encode('ascii')
+            digit_count = len(raw) - len(raw.translate(None, _ASCII_DIGITS))
+        else:
+            digit_count, message = self._count_and_normalize(message)
+
+        if digit_count < self.min_length:
+            self.stats['prefiltered'] += 1
             return None
-        
-        # 验证格式
-        if self._is_valid_phone(cleaned):
-            logger.debug(f"检测到纯数字号码: {cleaned}")
-            return cleaned
-        
-        return None
-    
-    def _detect_keyword_number(self, message: str) -> Optional[str]:
-        """检测带关键词的号码"""
-        # 使用search而不是findall来获取匹配对象
-        match = self.keyword_pattern.search(message)
-
-        if match:
-            # 获取所有捕获组
-            groups = match.groups()
-            # 找到第一个非空的捕获组
-            for group in groups:
-                if group and group.strip():
-                    # 清理提取的号码部分
-                    cleaned = self._clean_number(group)
-
-                    if not cleaned:
-                        continue
-
-                    # 验证长度
-                    if not (self.min_length <= len(cleaned) <= self.max_length):
-                        continue
-
-                    # 验证格式
-                    if self._is_valid_phone(cleaned):
-                        logger.debug(f"检测到关键词号码: {cleaned} (原文: {group})")
-                        return cleaned
+        return message
+
+    def _count_and_normalize(self, message: str) -> Tuple[int, str]:
+        """
+        统计消息中的数字个数，并在需要时规范化数字
+        ASCII 消息在字节层面一次 translate 删除数字后比较长度，无需规范化；
+        其他消息用单个正则找出所有数字，只有数字个数足够且其中含非 ASCII 数字
+        （全角、中文数字等）时才整体 translate，纯中文聊天不产生额外开销。
+        translate 逐字符一对一替换，候选片段的位置仍对应原消息。
+        """
+        if message.isascii():
+            raw = message.encode('ascii')
+            return len(raw) - len(raw.translate(None, _ASCII_DIGITS)), message
+
+        digits = self.single_digit_pattern.findall(message)
+        if len(digits) >= self.min_length and not ''.join(digits).isascii():
+            message = message.translate(self.digit_translation)
+        return len(digits), message
+
+    def get_stats(self) -> dict:
+        """获取检测统计信息"""
+        checked = self.stats['checked']
+        prefiltered = self.stats['prefiltered']
+        return {
+            'checked': checked,
+            'prefiltered': prefiltered,
+            'prefilter_rate': (prefiltered / checked * 100) if checked else 0.0,
+            'keyword_count': len(self.keywords),
+            'cache': self.cache.get_stats()
+        }
+
+    def detect_batch(self, messages: Iterable[str], processes: int = 1,
+                     chunk_size: int = 1000, detect_all: bool = False) -> Iterator[Union[Optional[str], List[str]]]:
+        """
+        批量检测消息（用于历史数据回填和重新扫描）
+        以流的方式按输入顺序逐条产出结果，不会一次性读入全部消息。
+
+        Args:
+            messages: 消息可迭代对象
+            processes: 工作进程数，小于等于1时在当前进程内检测
+            chunk_size: 每次分发给工作进程的消息数
+            detect_all: True 时每条消息产出 detect_all 的结果，否则产出 detect_phone_number 的结果
+        """
+        if processes <= 1:
+            detect = self.detect_all if detect_all else self.detect_phone_number
+            for message in messages:
+                yield detect(message)
+            return
+
+        initargs = (self.keywords, self.min_length, self.max_length,
+                    self.canonicalizer.signature, self.chinese_numerals)
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_batch_worker,
+                                 initargs=initargs) as executor:
+            # 限制在途块数量，保持内存有界；按提交顺序取回结果以保证顺序
+            max_pending = processes * 2
+            pending = deque()
+            for chunk in _iter_chunks(messages, chunk_size):
+                pending.append(executor.submit(_detect_chunk, chunk, detect_all))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
 
-        return None
-    
     def _clean_number(self, text: str) -> str:
         """
         清理号码字符串，只保留数字
-        移除空格、连字符、括号、点等分隔符
+        移除空格、连字符、括号、点等分隔符，并按前缀规则规范化
         """
         if not text:
             return ""
@@ -128,84 +525,62 @@ class PhoneDetector:
         # 提取所有数字并连接
         digits = self.digit_pattern.findall(text)
         cleaned = ''.join(digits)
+
+        # 去掉国家码等前缀（+86 138…、0086 138… 与 138… 统一为同一个号码）
+        if self.canonicalizer:
+            cleaned = self.canonicalizer.canonicalize(cleaned)
         
         return cleaned
+
+    def normalize_number(self, text: str) -> str:
+        """将用户输入的号码（例如查询参数）转换为存储使用的规范形式"""
+        return self._clean_number(normalize_digits(text, self.chinese_numerals))
+
+    @property
+    def normalization_signature(self) -> str:
+        """号码规范化规则签名（前缀规则 + 数字规范化方式），规则变化时需要迁移已存储的号码"""
+        digits = 'unicode+chinese' if self.chinese_numerals else 'unicode'
+        return f'{self.canonicalizer.signature};digits={digits}'
+
     
     def _is_valid_phone(self, phone: str) -> bool:
         """验证号码格式是否有效"""
-        if not phone:
-            return False
-        
-        # 检查是否为纯数字
-        if not phone.isdigit():
+        if not phone or not phone.isdigit():
             return False
-        
+        return self._reject_reason(phone) is None
+
+    def _reject_reason(self, number: str) -> Optional[str]:
+        """返回清理后的号码不合格的原因，合格时返回None"""
+        if not number:
+            return REJECT_NO_DIGITS
+
         # 检查长度
-        if not (self.min_length <= len(phone) <= self.max_length):
-            return False
-        
+        if len(number) < self.min_length:
+            return REJECT_TOO_SHORT
+        if len(number) > self.max_length:
+            return REJECT_TOO_LONG
+
         # 检查无效模式
         for pattern in self.invalid_patterns:
-            if pattern.match(phone):
-                logger.debug(f"号码匹配无效模式: {phone}")
-                return False
-        
-        return True
-    
+            if pattern.match(number):
+                logger.debug(f"号码匹配无效模式: {number}")
+                return REJECT_INVALID_PATTERN
+
+        return None
+
     def extract_all_numbers(self, message: str) -> List[str]:
         """
         从消息中提取所有可能的号码
-        用于调试和分析
+        用于调试和分析（不经过预过滤和缓存）
         """
-        numbers = []
-        
-        if not message:
-            return numbers
-        
-        # 提取纯数字
-        pure_number = self._detect_pure_number(message)
-        if pure_number:
-            numbers.append(pure_number)
-        
-        # 提取关键词号码
-        keyword_number = self._detect_keyword_number(message)
-        if keyword_number and keyword_number not in numbers:
-            numbers.append(keyword_number)
-        
-        return numbers
-    
+        return list(self.analyze(message).numbers)
+
     def is_phone_message(self, message: str) -> bool:
         """判断消息是否包含号码"""
         return self.detect_phone_number(message) is not None
-    
+
     def get_detection_info(self, message: str) -> dict:
         """
         获取检测详细信息，用于调试
         """
-        info = {
-            'original_message': message,
-            'detected_phone': None,
-            'detection_method': None,
-            'all_numbers': [],
-            'is_valid': False
-        }
-        
-        if not message:
-            return info
-        
-        # 尝试检测
-        phone = self.detect_phone_number(message)
-        if phone:
-            info['detected_phone'] = phone
-            info['is_valid'] = True
-            
-            # 确定检测方法
-            if self._detect_pure_number(message):
-                info['detection_method'] = 'pure_number'
-            elif self._detect_keyword_number(message):
-                info['detection_method'] = 'keyword'
-        
-        # 提取所有可能的数字
-        info['all_numbers'] = self.extract_all_numbers(message)
-        
-        return info
+        return self.analyze(message).to_dict()
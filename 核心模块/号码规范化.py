@@ -0,0 +1,115 @@
+"""
+号码规范化模块
+将同一号码的不同写法（全角数字、+86、0086、国内格式等）统一为一个规范键
+"""
+
+import sys
+import logging
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 号码中常见的全角分隔符及其 ASCII 形式
+FULLWIDTH_SEPARATORS = {
+    '\uff0b': '+',   # ＋
+    '\uff0d': '-',   # －
+    '\uff08': '(',   # （
+    '\uff09': ')',   # ）
+    '\uff0e': '.',   # ．
+    '\u3000': ' ',   # 全角空格
+}
+
+# 中文数字（读号码时的写法，"幺"即1）
+CHINESE_NUMERALS = {
+    '〇': '0', '零': '0', '一': '1', '幺': '1', '二': '2', '三': '3', '四': '4',
+    '五': '5', '六': '6', '七': '7', '八': '8', '九': '9',
+}
+
+@lru_cache(maxsize=None)
+def build_digit_translation(chinese_numerals: bool = False) -> Dict[int, str]:
+    """
+    构建数字规范化的 str.translate 映射表（按参数缓存，每个进程只构建一次）
+    所有 Unicode 十进制数字（全角数字、阿拉伯-印度数字等 Unicode Nd 类字符）
+    映射为 ASCII 数字，全角分隔符映射为 ASCII 分隔符；可选映射中文数字。
+    每个字符都一对一替换，规范化前后字符位置不变。
+    """
+    table = {
+        codepoint: str(unicodedata.decimal(chr(codepoint)))
+        for codepoint in range(128, sys.maxunicode + 1)
+        if chr(codepoint).isdecimal()
+    }
+    table.update({ord(char): ascii_char for char, ascii_char in FULLWIDTH_SEPARATORS.items()})
+    if chinese_numerals:
+        table.update({ord(char): digit for char, digit in CHINESE_NUMERALS.items()})
+    return table
+
+def normalize_digits(text: str, chinese_numerals: bool = False) -> str:
+    """将文本中的非 ASCII 数字和全角分隔符转换为 ASCII"""
+    if text.isascii():
+        return text
+    return text.translate(build_digit_translation(chinese_numerals))
+
+class NumberCanonicalizer:
+    """号码规范化器
+
+    由"前缀:去掉前缀后的号码长度"规则构建一棵前缀树。规范化时沿号码开头的数字
+    走前缀树（最多走到最长前缀的深度），取满足长度条件的最长前缀并去掉，
+    例如规则 0086:11 和 86:11 会把 008613812345678、8613812345678 都规范为
+    13812345678；长度不符的号码保持原样，避免误删真实号码的开头。
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, int]] = ()):
+        self.rules: List[Tuple[str, int]] = sorted(set(rules))
+        self._trie: Dict = {}
+
+        for prefix, remaining_length in self.rules:
+            node = self._trie
+            for digit in prefix:
+                node = node.setdefault(digit, {})
+            lengths: FrozenSet[int] = node.get('', frozenset())
+            node[''] = lengths | {remaining_length}
+
+    @classmethod
+    def from_spec(cls, spec: str) -> 'NumberCanonicalizer':
+        """
+        从配置字符串创建，格式: "0086:11,86:11"
+        忽略格式错误的项
+        """
+        rules = []
+        for item in (spec or '').split(','):
+            item = item.strip()
+            if not item:
+                continue
+            prefix, _, length = item.partition(':')
+            prefix = prefix.strip().lstrip('+')
+            if prefix.isdigit() and length.strip().isdigit():
+                rules.append((prefix, int(length)))
+            else:
+                logger.warning(f"忽略无效的号码前缀规则: {item}")
+        return cls(rules)
+
+    @property
+    def signature(self) -> str:
+        """规则签名，用于判断已存储的号码是否需要重新规范化"""
+        return ','.join(f'{prefix}:{length}' for prefix, length in self.rules)
+
+    def canonicalize(self, number: str) -> str:
+        """返回号码的规范形式（输入应为纯数字）"""
+        node = self._trie
+        total = len(number)
+        cut = 0
+
+        for position, digit in enumerate(number, 1):
+            node = node.get(digit)
+            if node is None:
+                break
+            lengths = node.get('')
+            if lengths and total - position in lengths:
+                cut = position
+
+        return number[cut:] if cut else number
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
@@ -0,0 +1,302 @@
+"""
+导出任务模块
+导出文件和汇总报告在独立的工作进程中生成，不阻塞事件循环；
+生成过程中报告进度，相同的导出请求共享同一个任务
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import asyncio
+import sqlite3
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from .配置管理 import Config
+from .数据库管理 import RECORD_COLUMNS, PhoneRecord, phone_record_factory
+from .导出管理器 import EXPORT_DIR_PREFIX, ExportManager
+
+logger = logging.getLogger(__name__)
+
+# 工作进程每次从数据库读取的行数（分批读取，不长时间占用数据库读锁）
+READ_BATCH_SIZE = 5000
+
+# 工作进程的进度队列（由进程池 initializer 设置）
+_progress_queue = None
+
+class ExportResult(NamedTuple):
+    """导出结果：分卷文件路径（没有记录时为空）、记录数、原始/压缩后字节数、生成用时（秒），
+    以及快照的记录 ID 上限（导出范围为 after_id < id <= last_id）"""
+    filepaths: List[str]
+    rows: int
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+    elapsed: float = 0.0
+    last_id: int = 0
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+def _iter_snapshot_records(conn: sqlite3.Connection, max_id: int, after_id: int = 0) -> Iterator[PhoneRecord]:
+    """
+    分批读取 id 不超过 max_id 的记录（导出开始后新增的记录不计入）
+    全量导出按提交时间顺序读取；增量导出（after_id > 0）按 id 顺序读取主键范围 (after_id, max_id]
+    """
+    conn.row_factory = phone_record_factory
+    if after_id:
+        while True:
+            rows = conn.execute(f'''
+                SELECT {RECORD_COLUMNS}
+                FROM phone_records
+                WHERE id > ? AND id <= ?
+                ORDER BY id
+                LIMIT ?
+            ''', (after_id, max_id, READ_BATCH_SIZE)).fetchall()
+            yield from rows
+            if len(rows) < READ_BATCH_SIZE:
+                return
+            after_id = rows[-1].record_id
+
+    last_key: Tuple[str, int] = ('', 0)
+    while True:
+        rows = conn.execute(f'''
+            SELECT {RECORD_COLUMNS}
+            FROM phone_records
+            WHERE id <= ? AND (message_timestamp, id) > (?, ?)
+            ORDER BY message_timestamp, id
+            LIMIT ?
+        ''', (max_id, *last_key, READ_BATCH_SIZE)).fetchall()
+        yield from rows
+        if len(rows) < READ_BATCH_SIZE:
+            return
+        last_key = (rows[-1].timestamp, rows[-1].record_id)
+
+def _snapshot_statistics(conn: sqlite3.Connection, max_id: int, after_id: int = 0) -> Dict:
+    """与 DatabaseManager.get_statistics 相同的统计，只统计 after_id < id <= max_id 的记录"""
+    total_submissions, unique_numbers, total_duplicates = conn.execute(
+        'SELECT COUNT(*), COUNT(DISTINCT phone_number), COALESCE(SUM(is_duplicate = 1), 0) '
+        'FROM phone_records WHERE id > ? AND id <= ?', (after_id, max_id)
+    ).fetchone()
+    duplicate_numbers = conn.execute(
+        'SELECT COUNT(DISTINCT phone_number) FROM phone_records '
+        'WHERE is_duplicate = 1 AND id > ? AND id <= ?', (after_id, max_id)
+    ).fetchone()[0]
+    return {
+        'total_submissions': total_submissions,
+        'unique_numbers': unique_numbers,
+        'duplicate_numbers': duplicate_numbers,
+        'total_duplicates': total_duplicates
+    }
+
+def run_export_job(job_id: int, db_path: str, kind: str, export_format: str,
+                   compression: str = 'none', after_id: int = 0,
+                   part_size: Optional[int] = None) -> ExportResult:
+    """
+    在工作进程中生成导出文件（kind 为 export 或 report）
+    以只读方式打开数据库，记录 id 上限作为快照，按 (job_id, 已写入行数, 总行数) 报告进度；
+    after_id 大于0时只导出 id 大于它的记录（增量导出）；
+    导出文件按 compression 流式压缩，超过 part_size 字节时分卷；
+    文件写入本任务专用的临时目录，并发任务的文件互不覆盖
+    """
+    started = time.monotonic()
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + '?mode=ro', uri=True, timeout=30.0)
+    try:
+        max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM phone_records').fetchone()[0]
+        stats = _snapshot_statistics(conn, max_id, after_id)
+        total = stats['total_submissions']
+        if not total:
+            return ExportResult([], 0, last_id=max_id)
+
+        def progress(written: int):
+            if _progress_queue is not None:
+                _progress_queue.put((job_id, written, total))
+
+        progress(0)
+        records = _iter_snapshot_records(conn, max_id, after_id)
+        output_dir = tempfile.mkdtemp(prefix=f'{EXPORT_DIR_PREFIX}{job_id}_')
+        export_manager = ExportManager(output_dir)
+        try:
+            if kind == 'report':
+                filepath = export_manager.create_summary_report(records, stats, progress)
+                size = os.path.getsize(filepath)
+                return ExportResult([filepath], total, size, size, time.monotonic() - started, max_id)
+
+            options = {'progress': progress, 'compression': compression, 'part_size': part_size}
+            if export_format == 'json':
+                output = export_manager.export_to_json(records, total=total, **options)
+            elif export_format == 'txt':
+                output = export_manager.export_to_text(records, total=total, summary=stats, **options)
+            else:
+                output = export_manager.export_to_csv(records, **options)
+            return ExportResult(output.paths, total, output.raw_bytes, output.stored_bytes,
+                                time.monotonic() - started, max_id)
+        except BaseException:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            raise
+    finally:
+        conn.close()
+
+@dataclass(slots=True)
+class ExportJob:
+    """一个正在生成（或已生成、等待发送）的导出任务"""
+    job_id: int
+    key: Tuple[str, str, str, int]
+    task: Optional[asyncio.Task] = None
+    written: int = 0
+    total: int = 0
+    users: int = 0
+    listeners: List[Callable[[int, int], None]] = field(default_factory=list)
+
+class ExportJobManager:
+    """导出任务管理器
+
+    - 任务在最多 EXPORT_MAX_JOBS 个工作进程中执行，超出的请求排队，不占用处理消息的 CPU
+    - 同一种导出（类型+格式+压缩方式+增量起点）在生成或发送期间再次请求时共享同一个任务和文件
+    - 导出文件超过 EXPORT_PART_SIZE_MB 时自动分卷，不超过 Telegram 的上传大小限制
+    - 每 EXPORT_PROGRESS_INTERVAL 秒把进度（已写入行数/总行数）交给各请求的回调
+    - 最后一个使用者用完后删除导出文件
+    """
+
+    def __init__(self, db_path: str, max_jobs: Optional[int] = None,
+                 progress_interval: Optional[float] = None, part_size: Optional[int] = None):
+        self.db_path = db_path
+        self.part_size = int(Config.EXPORT_PART_SIZE_MB * 1024 * 1024) if part_size is None else part_size
+        self.max_jobs = Config.EXPORT_MAX_JOBS if max_jobs is None else max_jobs
+        self.progress_interval = Config.EXPORT_PROGRESS_INTERVAL if progress_interval is None else progress_interval
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+        self._jobs: Dict[Tuple[str, str, str, int], ExportJob] = {}
+        self._jobs_by_id: Dict[int, ExportJob] = {}
+        self._next_job_id = 0
+
+        # 统计
+        self.started = 0
+        self.shared = 0
+        self.failed = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """首次导出时创建进程池（spawn 方式，不复制主进程的线程和数据库连接）"""
+        if self._pool is None:
+            context = multiprocessing.get_context('spawn')
+            self._progress_queue = context.Queue()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_jobs, mp_context=context,
+                initializer=_init_worker, initargs=(self._progress_queue,)
+            )
+        return self._pool
+
+    @asynccontextmanager
+    async def job(self, kind: str, export_format: str, compression: str = 'none', after_id: int = 0,
+                  on_progress: Optional[Callable[[int, int], None]] = None):
+        """
+        获取导出结果（相同的进行中任务直接共享），在 async with 块内使用文件
+        after_id 大于0时只导出 id 大于它的记录；on_progress(已写入行数, 总行数) 在进度变化时调用
+        """
+        key = (kind, export_format, compression, after_id)
+        job = self._jobs.get(key)
+        if job is None:
+            self._next_job_id += 1
+            job = ExportJob(self._next_job_id, key)
+            job.task = asyncio.get_running_loop().create_task(self._run(job))
+            self._jobs[key] = job
+            self._jobs_by_id[job.job_id] = job
+            self.started += 1
+        else:
+            self.shared += 1
+
+        job.users += 1
+        if on_progress:
+            job.listeners.append(on_progress)
+        try:
+            yield await asyncio.shield(job.task)
+        finally:
+            if on_progress in job.listeners:
+                job.listeners.remove(on_progress)
+            job.users -= 1
+            if not job.users:
+                self._finish(job)
+
+    async def _run(self, job: ExportJob) -> ExportResult:
+        """在进程池中执行任务，期间定期报告进度"""
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(
+                self._get_pool(), run_export_job, job.job_id, self.db_path, *job.key, self.part_size
+            )
+            reported = -1
+            while not future.done():
+                await asyncio.wait({future}, timeout=self.progress_interval)
+                self._drain_progress()
+                if job.total and job.written != reported and not future.done():
+                    reported = job.written
+                    for listener in list(job.listeners):
+                        listener(job.written, job.total)
+            return future.result()
+        except BrokenProcessPool:
+            # 工作进程异常退出，下次导出时重建进程池
+            self._pool = None
+            self.failed += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._jobs_by_id.pop(job.job_id, None)
+
+    def _drain_progress(self):
+        """读取工作进程报告的进度"""
+        while self._progress_queue is not None:
+            try:
+                job_id, written, total = self._progress_queue.get_nowait()
+            except Exception:
+                return
+            job = self._jobs_by_id.get(job_id)
+            if job is not None:
+                job.written, job.total = written, total
+
+    def _finish(self, job: ExportJob):
+        """最后一个使用者用完后移除任务，任务完成后删除导出文件及其目录"""
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+        job.task.add_done_callback(self._remove_file)
+
+    @staticmethod
+    def _remove_file(task: asyncio.Task):
+        if task.cancelled() or task.exception():
+            return
+        filepaths = task.result().filepaths
+        for filepath in filepaths:
+            try:
+                os.remove(filepath)
+            except OSError as e:
+                logger.warning(f"删除导出文件失败 {filepath}: {e}")
+        if filepaths:
+            # 删除任务的临时目录
+            try:
+                os.rmdir(os.path.dirname(filepaths[0]))
+            except OSError as e:
+                logger.warning(f"删除导出目录失败 {os.path.dirname(filepaths[0])}: {e}")
+
+    def shutdown(self):
+        """关闭进程池（不等待未完成的任务）"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self) -> dict:
+        """获取导出任务统计"""
+        return {
+            'running': len(self._jobs_by_id),
+            'max_jobs': self.max_jobs,
+            'started': self.started,
+            'shared': self.shared,
+            'failed': self.failed,
+        }
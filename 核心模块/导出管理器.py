@@ -4,25 +4,149 @@
 """
 
 import csv
+import gzip
+import codecs
+import zipfile
+import itertools
 import json
 import logging
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, Dict, Iterable, List, Optional
 import tempfile
+import shutil
 import os
 from pathlib import Path
-import pytz
-from .配置管理 import Config
+from .数据库管理 import PhoneRecord
+from .时间格式化 import TimeFormatter
 
 logger = logging.getLogger(__name__)
 
+# 每写入多少行报告一次进度
+PROGRESS_ROWS = 1000
+
+# 导出任务专用临时目录的名称前缀（每个任务一个目录，同一秒开始的任务文件名不会冲突）
+EXPORT_DIR_PREFIX = 'phone_export_'
+
+# 压缩方式 -> 文件后缀
+COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zip': '.zip'}
+
+@dataclass(slots=True)
+class ExportOutput:
+    """导出结果：分卷文件路径（按序号）、原始字节数、写入磁盘的字节数（写入器关闭时填入）"""
+    paths: List[str] = field(default_factory=list)
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+
+class ExportWriter:
+    """导出文件写入器（文本接口）
+
+    写入的内容边编码边压缩（gzip/zip 流式压缩，不再二次处理），每写完一条记录调用 end_record()；
+    当前分卷在磁盘上达到 part_size 字节时，下一次写入前切换到新的分卷
+    （文件名为 名称.partN.后缀）。分卷在记录边界切分，按序号拼接解压后的内容即为完整文件；
+    只有一卷时使用原文件名。
+    """
+
+    def __init__(self, filepath: str, encoding: str = 'utf-8', compression: str = 'none',
+                 part_size: Optional[int] = None):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        self.filepath = Path(filepath)
+        self.compression = compression
+        self.part_size = part_size
+        self.output = ExportOutput()
+
+        # 增量编码：utf-8-sig 的 BOM 只在整个文件开头写入一次
+        self._encoder = codecs.getincrementalencoder(encoding)()
+        self._raw = None
+        self._zip = None
+        self._stream = None
+        self._rotate_pending = False
+        self._open_part()
+
+    def _part_path(self, number: int) -> Path:
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        return self.filepath.with_name(f"{self.filepath.stem}.part{number}{self.filepath.suffix}{suffix}")
+
+    def _open_part(self):
+        path = self._part_path(len(self.output.paths) + 1)
+        self.output.paths.append(str(path))
+        self._raw = open(path, 'wb')
+        if self.compression == 'gzip':
+            self._stream = gzip.GzipFile(filename=self.filepath.name, mode='wb', compresslevel=6, fileobj=self._raw)
+        elif self.compression == 'zip':
+            # 每个分卷中的条目同名，都是同一个文件的一段
+            self._zip = zipfile.ZipFile(self._raw, 'w', zipfile.ZIP_DEFLATED)
+            self._stream = self._zip.open(self.filepath.name, 'w', force_zip64=True)
+        else:
+            self._stream = self._raw
+
+    def _close_part(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        self.output.stored_bytes += self._raw.tell()
+        self._raw.close()
+
+    def write(self, text: str):
+        if self._rotate_pending:
+            self._rotate_pending = False
+            self._close_part()
+            self._open_part()
+        data = self._encoder.encode(text)
+        self._stream.write(data)
+        self.output.raw_bytes += len(data)
+
+    def end_record(self):
+        """一条记录写完；当前分卷已达到大小上限时，之后的内容写入新分卷"""
+        if self.part_size and self._raw.tell() >= self.part_size:
+            self._rotate_pending = True
+
+    def close(self):
+        self._stream.write(self._encoder.encode('', final=True))
+        self._close_part()
+        if len(self.output.paths) == 1:
+            final_path = str(self.filepath) + COMPRESSION_SUFFIXES[self.compression]
+            os.replace(self.output.paths[0], final_path)
+            self.output.paths[0] = final_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is not None:
+            # 导出失败时删除已写入的分卷
+            for path in self.output.paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
 class ExportManager:
-    """数据导出管理器"""
+    """数据导出管理器
+
+    records 可以是列表，也可以是逐行读取数据库的迭代器（此时需要传入 total 和 summary），
+    写入过程不需要把全部记录保存在内存中；progress 每写入 PROGRESS_ROWS 行以已写入行数调用一次。
+    导出文件可以用 gzip/zip 流式压缩，并按 part_size 字节自动分卷（见 ExportWriter）。
+    文件写入 output_dir（默认为系统临时目录）。
+    """
     
-    def __init__(self):
-        self.timezone = pytz.timezone(Config.TIMEZONE)
+    def __init__(self, output_dir: Optional[str] = None):
+        self.time_formatter = TimeFormatter()
+        self.output_dir = output_dir or tempfile.gettempdir()
+
+    @staticmethod
+    def _report_progress(progress: Optional[Callable[[int], None]], written: int, done: bool = False):
+        """按 PROGRESS_ROWS 行的间隔（以及写完时）报告进度"""
+        if progress and (done or written % PROGRESS_ROWS == 0):
+            progress(written)
     
-    def export_to_csv(self, records: List[Dict], filename: str = None) -> str:
+    def export_to_csv(self, records: Iterable[PhoneRecord], filename: str = None,
+                      progress: Optional[Callable[[int], None]] = None,
+                      compression: str = 'none', part_size: Optional[int] = None) -> ExportOutput:
         """导出为CSV格式"""
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -30,13 +154,14 @@ class ExportManager:
         
         try:
             # 创建临时文件
-            temp_dir = tempfile.gettempdir()
-            filepath = os.path.join(temp_dir, filename)
+            filepath = os.path.join(self.output_dir, filename)
             
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                if not records:
+            with ExportWriter(filepath, 'utf-8-sig', compression, part_size) as csvfile:
+                records = iter(records)
+                first_record = next(records, None)
+                if first_record is None:
                     csvfile.write("暂无数据\n")
-                    return filepath
+                    return csvfile.output
                 
                 # 定义CSV字段
                 fieldnames = [
@@ -47,138 +172,192 @@ class ExportManager:
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
                 
-                for i, record in enumerate(records, 1):
+                i = 0
+                for i, record in enumerate(itertools.chain((first_record,), records), 1):
                     # 格式化时间
-                    timestamp = self._format_timestamp_for_export(record['timestamp'])
+                    timestamp = self.time_formatter.format_full(record.timestamp)
                     
                     writer.writerow({
                         '序号': i,
-                        '号码': record['phone_number'],
-                        '提交人': record['first_name'],
-                        '用户名': record.get('username', ''),
-                        '用户ID': record['user_id'],
+                        '号码': record.phone_number,
+                        '提交人': record.first_name,
+                        '用户名': record.username or '',
+                        '用户ID': record.user_id,
                         '提交时间': timestamp,
-                        '群组ID': record.get('group_id', ''),
-                        '原始消息': record['original_message'],
-                        '是否重复': '是' if record.get('is_duplicate', False) else '否'
+                        '群组ID': record.group_id or '',
+                        '原始消息': record.original_message,
+                        '是否重复': '是' if record.is_duplicate else '否'
                     })
+                    csvfile.end_record()
+                    self._report_progress(progress, i)
+                self._report_progress(progress, i, done=True)
             
-            logger.info(f"CSV导出成功: {filepath}")
-            return filepath
+            logger.info(f"CSV导出成功: {filepath}（{len(csvfile.output.paths)} 个文件）")
+            return csvfile.output
             
         except Exception as e:
             logger.error(f"CSV导出失败: {e}")
             raise
     
-    def export_to_json(self, records: List[Dict], filename: str = None) -> str:
-        """导出为JSON格式"""
+    def export_to_json(self, records: Iterable[PhoneRecord], filename: str = None,
+                       total: Optional[int] = None,
+                       progress: Optional[Callable[[int], None]] = None,
+                       compression: str = 'none', part_size: Optional[int] = None) -> ExportOutput:
+        """导出为JSON格式（逐条写入，格式与 json.dump(indent=2) 相同）"""
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"phone_records_{timestamp}.json"
         
         try:
             # 创建临时文件
-            temp_dir = tempfile.gettempdir()
-            filepath = os.path.join(temp_dir, filename)
+            filepath = os.path.join(self.output_dir, filename)
             
-            # 准备导出数据
-            export_data = {
-                'export_time': datetime.now(self.timezone).isoformat(),
-                'total_records': len(records),
-                'records': []
-            }
-            
-            for record in records:
-                export_record = {
-                    'phone_number': record['phone_number'],
-                    'submitter': {
-                        'first_name': record['first_name'],
-                        'username': record.get('username', ''),
-                        'user_id': record['user_id']
-                    },
-                    'submission_time': self._format_timestamp_for_export(record['timestamp']),
-                    'group_id': record.get('group_id', ''),
-                    'original_message': record['original_message'],
-                    'is_duplicate': record.get('is_duplicate', False)
-                }
-                export_data['records'].append(export_record)
+            if total is None:
+                total = len(records)
+
+            with ExportWriter(filepath, 'utf-8', compression, part_size) as jsonfile:
+                jsonfile.write('{\n')
+                jsonfile.write(f'  "export_time": {json.dumps(self.time_formatter.now().isoformat())},\n')
+                jsonfile.write(f'  "total_records": {total},\n')
+                jsonfile.write('  "records": [')
+
+                written = 0
+                for record in records:
+                    export_record = {
+                        'phone_number': record.phone_number,
+                        'submitter': {
+                            'first_name': record.first_name,
+                            'username': record.username or '',
+                            'user_id': record.user_id
+                        },
+                        'submission_time': self.time_formatter.format_full(record.timestamp),
+                        'group_id': record.group_id or '',
+                        'original_message': record.original_message,
+                        'is_duplicate': record.is_duplicate
+                    }
+                    # 每条记录缩进两级（4个空格），与整体 json.dump(indent=2) 的输出一致
+                    item = json.dumps(export_record, ensure_ascii=False, indent=2).replace('\n', '\n    ')
+                    jsonfile.write(('\n    ' if not written else ',\n    ') + item)
+                    jsonfile.end_record()
+                    written += 1
+                    self._report_progress(progress, written)
+
+                jsonfile.write('\n  ]\n}' if written else ']\n}')
+                self._report_progress(progress, written, done=True)
             
-            with open(filepath, 'w', encoding='utf-8') as jsonfile:
-                json.dump(export_data, jsonfile, ensure_ascii=False, indent=2)
-            
-            logger.info(f"JSON导出成功: {filepath}")
-            return filepath
+            logger.info(f"JSON导出成功: {filepath}（{len(jsonfile.output.paths)} 个文件）")
+            return jsonfile.output
             
         except Exception as e:
             logger.error(f"JSON导出失败: {e}")
             raise
     
-    def export_to_text(self, records: List[Dict], filename: str = None) -> str:
-        """导出为文本格式"""
+    def export_to_text(self, records: Iterable[PhoneRecord], filename: str = None,
+                       total: Optional[int] = None, summary: Optional[Dict] = None,
+                       progress: Optional[Callable[[int], None]] = None,
+                       compression: str = 'none', part_size: Optional[int] = None) -> ExportOutput:
+        """导出为文本格式
+
+        summary 为 {'unique_numbers': 唯一号码数, 'total_duplicates': 重复提交数}，
+        records 为迭代器时需要预先统计传入；为列表时可省略
+        """
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"phone_records_{timestamp}.txt"
         
         try:
             # 创建临时文件
-            temp_dir = tempfile.gettempdir()
-            filepath = os.path.join(temp_dir, filename)
+            filepath = os.path.join(self.output_dir, filename)
             
-            with open(filepath, 'w', encoding='utf-8') as txtfile:
+            with ExportWriter(filepath, 'utf-8', compression, part_size) as txtfile:
                 # 写入标题
                 txtfile.write("客户号码统计报告\n")
                 txtfile.write("=" * 50 + "\n")
-                txtfile.write(f"导出时间: {datetime.now(self.timezone).strftime('%Y-%m-%d %H:%M:%S')}\n")
-                txtfile.write(f"记录总数: {len(records)}\n\n")
+                txtfile.write(f"导出时间: {self.time_formatter.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                if total is None:
+                    total = len(records)
+                txtfile.write(f"记录总数: {total}\n\n")
                 
-                if not records:
+                if not total:
                     txtfile.write("暂无数据\n")
-                    return filepath
+                    return txtfile.output
                 
                 # 统计信息
-                unique_phones = set(record['phone_number'] for record in records)
-                duplicate_count = sum(1 for record in records if record.get('is_duplicate', False))
+                if summary is None:
+                    summary = {
+                        'unique_numbers': len(set(record.phone_number for record in records)),
+                        'total_duplicates': sum(1 for record in records if record.is_duplicate)
+                    }
+                duplicate_count = summary['total_duplicates']
                 
                 txtfile.write("统计摘要:\n")
-                txtfile.write(f"- 唯一号码数: {len(unique_phones)}\n")
+                txtfile.write(f"- 唯一号码数: {summary['unique_numbers']}\n")
                 txtfile.write(f"- 重复提交数: {duplicate_count}\n")
-                txtfile.write(f"- 重复率: {(duplicate_count/len(records)*100):.1f}%\n\n")
+                txtfile.write(f"- 重复率: {(duplicate_count/total*100):.1f}%\n\n")
                 
                 # 详细记录
                 txtfile.write("详细记录:\n")
                 txtfile.write("-" * 50 + "\n")
                 
+                i = 0
                 for i, record in enumerate(records, 1):
-                    timestamp = self._format_timestamp_for_export(record['timestamp'])
-                    duplicate_mark = " [重复]" if record.get('is_duplicate', False) else ""
+                    timestamp = self.time_formatter.format_full(record.timestamp)
+                    duplicate_mark = " [重复]" if record.is_duplicate else ""
                     
-                    txtfile.write(f"{i}. {record['phone_number']}{duplicate_mark}\n")
-                    txtfile.write(f"   提交人: {record['first_name']}")
-                    if record.get('username'):
-                        txtfile.write(f" (@{record['username']})")
+                    txtfile.write(f"{i}. {record.phone_number}{duplicate_mark}\n")
+                    txtfile.write(f"   提交人: {record.first_name}")
+                    if record.username:
+                        txtfile.write(f" (@{record.username})")
                     txtfile.write(f"\n   时间: {timestamp}\n")
-                    txtfile.write(f"   原始消息: {record['original_message']}\n\n")
+                    txtfile.write(f"   原始消息: {record.original_message}\n\n")
+                    txtfile.end_record()
+                    self._report_progress(progress, i)
+                self._report_progress(progress, i, done=True)
             
-            logger.info(f"文本导出成功: {filepath}")
-            return filepath
+            logger.info(f"文本导出成功: {filepath}（{len(txtfile.output.paths)} 个文件）")
+            return txtfile.output
             
         except Exception as e:
             logger.error(f"文本导出失败: {e}")
             raise
     
-    def create_summary_report(self, records: List[Dict], stats: Dict) -> str:
-        """创建汇总报告"""
+    def create_summary_report(self, records: Iterable[PhoneRecord], stats: Dict,
+                              progress: Optional[Callable[[int], None]] = None) -> str:
+        """创建汇总报告（一次遍历记录完成提交者和时间统计）"""
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"summary_report_{timestamp}.txt"
-            temp_dir = tempfile.gettempdir()
-            filepath = os.path.join(temp_dir, filename)
+            filepath = os.path.join(self.output_dir, filename)
+
+            # 提交者统计、首次/最新记录、按日期统计
+            submitters = {}
+            daily_stats = {}
+            first_record = last_record = None
+            record_count = 0
+            for record in records:
+                record_count += 1
+                name = record.first_name
+                if name not in submitters:
+                    submitters[name] = {'count': 0, 'duplicates': 0}
+                submitters[name]['count'] += 1
+                if record.is_duplicate:
+                    submitters[name]['duplicates'] += 1
+
+                if first_record is None or record.timestamp < first_record.timestamp:
+                    first_record = record
+                if last_record is None or record.timestamp > last_record.timestamp:
+                    last_record = record
+
+                date_str = self.time_formatter.format_date(record.timestamp)
+                daily_stats[date_str] = daily_stats.get(date_str, 0) + 1
+                self._report_progress(progress, record_count)
+            self._report_progress(progress, record_count, done=True)
             
             with open(filepath, 'w', encoding='utf-8') as txtfile:
                 # 报告标题
                 txtfile.write("客户号码统计汇总报告\n")
                 txtfile.write("=" * 60 + "\n")
-                txtfile.write(f"生成时间: {datetime.now(self.timezone).strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+                txtfile.write(f"生成时间: {self.time_formatter.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
                 
                 # 基础统计
                 txtfile.write("📊 基础统计\n")
@@ -195,16 +374,7 @@ class ExportManager:
                 txtfile.write("\n")
                 
                 # 提交者统计
-                if records:
-                    submitters = {}
-                    for record in records:
-                        name = record['first_name']
-                        if name not in submitters:
-                            submitters[name] = {'count': 0, 'duplicates': 0}
-                        submitters[name]['count'] += 1
-                        if record.get('is_duplicate', False):
-                            submitters[name]['duplicates'] += 1
-                    
+                if record_count:
                     txtfile.write("👥 提交者统计 (前10名)\n")
                     txtfile.write("-" * 30 + "\n")
                     
@@ -218,30 +388,19 @@ class ExportManager:
                     txtfile.write("\n")
                 
                 # 时间分析
-                if records:
+                if record_count:
                     txtfile.write("⏰ 时间分析\n")
                     txtfile.write("-" * 30 + "\n")
                     
-                    first_record = min(records, key=lambda x: x['timestamp'])
-                    last_record = max(records, key=lambda x: x['timestamp'])
-                    
-                    first_time = self._format_timestamp_for_export(first_record['timestamp'])
-                    last_time = self._format_timestamp_for_export(last_record['timestamp'])
+                    first_time = self.time_formatter.format_full(first_record.timestamp)
+                    last_time = self.time_formatter.format_full(last_record.timestamp)
                     
                     txtfile.write(f"首次记录: {first_time}\n")
                     txtfile.write(f"最新记录: {last_time}\n")
                     
-                    # 按日期统计
-                    daily_stats = {}
-                    for record in records:
-                        date_str = self._format_timestamp_for_export(record['timestamp'])[:10]
-                        if date_str not in daily_stats:
-                            daily_stats[date_str] = 0
-                        daily_stats[date_str] += 1
-                    
                     if len(daily_stats) > 1:
                         txtfile.write(f"活跃天数: {len(daily_stats)}天\n")
-                        avg_daily = len(records) / len(daily_stats)
+                        avg_daily = record_count / len(daily_stats)
                         txtfile.write(f"日均提交: {avg_daily:.1f}次\n")
             
             logger.info(f"汇总报告生成成功: {filepath}")
@@ -251,22 +410,6 @@ class ExportManager:
             logger.error(f"汇总报告生成失败: {e}")
             raise
     
-    def _format_timestamp_for_export(self, timestamp) -> str:
-        """格式化时间戳用于导出"""
-        if isinstance(timestamp, str):
-            try:
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            except ValueError:
-                return timestamp
-        
-        # 确保时间戳是本地时区
-        if timestamp.tzinfo is None:
-            timestamp = self.timezone.localize(timestamp)
-        elif timestamp.tzinfo != self.timezone:
-            timestamp = timestamp.astimezone(self.timezone)
-        
-        return timestamp.strftime('%Y-%m-%d %H:%M:%S')
-    
     def cleanup_temp_files(self, max_age_hours: int = 24):
         """清理临时文件"""
         try:
@@ -274,12 +417,15 @@ class ExportManager:
             now = datetime.now()
             
             for filename in os.listdir(temp_dir):
-                if filename.startswith(('phone_records_', 'summary_report_')):
+                if filename.startswith(('phone_records_', 'summary_report_', EXPORT_DIR_PREFIX)):
                     filepath = os.path.join(temp_dir, filename)
                     try:
                         file_time = datetime.fromtimestamp(os.path.getctime(filepath))
                         if (now - file_time).total_seconds() > max_age_hours * 3600:
-                            os.remove(filepath)
+                            if os.path.isdir(filepath):
+                                shutil.rmtree(filepath)
+                            else:
+                                os.remove(filepath)
                             logger.debug(f"清理临时文件: {filepath}")
                     except Exception as e:
                         logger.warning(f"清理文件失败 {filepath}: {e}")
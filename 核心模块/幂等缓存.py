@@ -0,0 +1,139 @@
+"""
+幂等缓存模块
+记录已处理的消息 (chat_id, message_id)，避免同一条消息被重复处理
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from .配置管理 import Config
+
+logger = logging.getLogger(__name__)
+
+class IdempotencyCache:
+    """已处理消息缓存
+
+    按插入顺序保存 (chat_id, message_id) -> 过期时间。所有条目的 TTL 相同，
+    插入顺序即过期顺序，因此过期和超出容量时都只需从最旧的一端弹出：
+    插入、查找、过期均为 O(1)（均摊）。
+    传入 db_manager 时同时写入 processed_updates 表，重启后仍能跳过重复投递的消息：
+    内存中的判定立即生效，数据库写入攒批后由后台任务在线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None,
+                 db_manager=None, clock: Callable[[], float] = time.time):
+        self.ttl = Config.IDEMPOTENCY_TTL if ttl is None else ttl
+        self.max_size = Config.IDEMPOTENCY_CACHE_SIZE if max_size is None else max_size
+        self.db_manager = db_manager
+        self.clock = clock
+
+        self._entries: 'OrderedDict[Tuple[int, int], float]' = OrderedDict()
+        self._next_purge = 0.0
+        # 等待写入数据库的条目及执行写入的后台任务
+        self._pending: List[Tuple[int, int, float]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.duplicates = 0
+
+        if db_manager:
+            self._load()
+
+    def _load(self):
+        """从数据库加载未过期的条目（同时清理已过期的条目）"""
+        now = self.clock()
+        self._purge(now)
+        for chat_id, message_id, expires_at in self.db_manager.load_processed_updates(now, self.max_size):
+            self._entries[(chat_id, message_id)] = expires_at
+        if self._entries:
+            logger.info(f"已加载 {len(self._entries)} 条已处理消息记录")
+
+    def _expire(self, now: float):
+        """弹出已过期和超出容量的最旧条目"""
+        entries = self._entries
+        while entries and (len(entries) > self.max_size or next(iter(entries.values())) <= now):
+            entries.popitem(last=False)
+
+    def _purge(self, now: float):
+        """删除数据库中已过期的记录（每个 TTL 周期一次）"""
+        self.db_manager.purge_processed_updates(now)
+        self._next_purge = now + self.ttl
+
+    def seen(self, chat_id: int, message_id: int) -> bool:
+        """消息是否已处理过（未过期）"""
+        expires_at = self._entries.get((chat_id, message_id))
+        return expires_at is not None and expires_at > self.clock()
+
+    def add(self, chat_id: int, message_id: int) -> bool:
+        """
+        标记消息为已处理
+        返回: True 表示首次处理；False 表示已处理过，应跳过
+        """
+        now = self.clock()
+        self._expire(now)
+
+        key = (chat_id, message_id)
+        if key in self._entries:
+            self.duplicates += 1
+            return False
+
+        expires_at = now + self.ttl
+        self._entries[key] = expires_at
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        if self.db_manager:
+            self._pending.append((chat_id, message_id, expires_at))
+            self._schedule_flush()
+        return True
+
+    def _schedule_flush(self):
+        """启动后台写入任务（已在运行时由它顺带写入新条目）；没有事件循环时直接写入"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(*self._take_pending())
+            return
+        self._flush_task = loop.create_task(self._flush_pending())
+
+    def _take_pending(self) -> Tuple[List[Tuple[int, int, float]], Optional[float]]:
+        """取出待写入的条目，以及本次是否需要清理过期记录（需要时为清理时间点）"""
+        entries, self._pending = self._pending, []
+        now = self.clock()
+        purge_at = None
+        if now >= self._next_purge:
+            purge_at = now
+            self._next_purge = now + self.ttl
+        return entries, purge_at
+
+    async def _flush_pending(self):
+        """在线程中写入所有待写入的条目（写入期间新增的条目在下一轮写入）"""
+        while self._pending:
+            await asyncio.to_thread(self._write, *self._take_pending())
+
+    def _write(self, entries: List[Tuple[int, int, float]], purge_at: Optional[float]):
+        if purge_at is not None:
+            self.db_manager.purge_processed_updates(purge_at)
+        if entries:
+            self.db_manager.add_processed_updates(entries)
+
+    async def flush(self):
+        """等待所有待写入的条目写入数据库（停止前调用）"""
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        if self._pending:
+            await asyncio.to_thread(self._write, *self._take_pending())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> dict:
+        """获取缓存统计"""
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'duplicates': self.duplicates,
+            'persistent': self.db_manager is not None,
+            'pending_writes': len(self._pending),
+        }
@@ -6,22 +6,62 @@
 import sqlite3
 import logging
 import threading
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, List, Dict, Optional, Tuple
 from contextlib import contextmanager
-import pytz
+from zoneinfo import ZoneInfo
 from .配置管理 import Config
+from .近似号码 import deletion_variants, is_near_duplicate
 
 logger = logging.getLogger(__name__)
 
+# 号码记录查询统一使用的列顺序，与 PhoneRecord 的字段顺序一一对应
+RECORD_COLUMNS = '''
+    id, phone_number, telegram_username, telegram_user_id, first_name,
+    message_timestamp, group_id, original_message, is_duplicate
+'''
+
+@dataclass(slots=True)
+class PhoneRecord:
+    """号码记录
+
+    带 __slots__ 的紧凑行对象，由行工厂按 RECORD_COLUMNS 的列顺序直接构造，
+    不再为每一行分配字典
+    """
+    record_id: Optional[int] = None
+    phone_number: Optional[str] = None
+    username: Optional[str] = None
+    user_id: Optional[int] = None
+    first_name: Optional[str] = None
+    timestamp: Optional[str] = None
+    group_id: Optional[int] = None
+    original_message: Optional[str] = None
+    is_duplicate: int = 0
+
+def phone_record_factory(cursor: sqlite3.Cursor, row: tuple) -> PhoneRecord:
+    """行工厂：将按 RECORD_COLUMNS 查询的结果行构造为 PhoneRecord"""
+    return PhoneRecord(*row)
+
 class DatabaseManager:
     """数据库管理器"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, near_duplicate_check: Optional[bool] = None,
+                 duplicate_scope: Optional[str] = None, duplicate_window_days: Optional[int] = None):
         self.db_path = db_path or Config.DATABASE_PATH
-        self.timezone = pytz.timezone(Config.TIMEZONE)
+        self.timezone = ZoneInfo(Config.TIMEZONE)
+        self.near_duplicate_check = (Config.NEAR_DUPLICATE_CHECK if near_duplicate_check is None
+                                     else near_duplicate_check)
+
+        # 重复判定范围：global（所有群组）或 group（同一群组）；窗口天数为0表示不限时间
+        self.duplicate_scope = Config.DUPLICATE_SCOPE if duplicate_scope is None else duplicate_scope
+        self.duplicate_window_days = (Config.DUPLICATE_WINDOW_DAYS if duplicate_window_days is None
+                                      else duplicate_window_days)
+
         self._local = threading.local()
         self.init_database()
+        self._apply_duplicate_scope()
+        self._prepare_variant_index()
     
     def get_connection(self) -> sqlite3.Connection:
         """获取数据库连接（线程安全）"""
@@ -72,10 +112,26 @@ class DatabaseManager:
                 ''')
                 
                 # 创建索引以提高查询性能
+                # 重复判定的每种范围都对应一个复合索引，一次索引查找即可判定：
+                # 全局（可限时间窗口）用 (号码, 时间)，按群组用 (号码, 群组, 时间)
                 cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_phone_number 
-                    ON phone_records(phone_number)
+                    CREATE INDEX IF NOT EXISTS idx_phone_time
+                    ON phone_records(phone_number, message_timestamp)
                 ''')
+
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_phone_group_time
+                    ON phone_records(phone_number, group_id, message_timestamp)
+                ''')
+
+                # 只包含重复记录的部分索引，重复统计无需扫描全表
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_duplicate_phone
+                    ON phone_records(phone_number) WHERE is_duplicate = 1
+                ''')
+
+                # (号码, 时间) 索引已覆盖单独的号码索引
+                cursor.execute('DROP INDEX IF EXISTS idx_phone_number')
                 
                 cursor.execute('''
                     CREATE INDEX IF NOT EXISTS idx_user_id 
@@ -92,6 +148,15 @@ class DatabaseManager:
                     ON phone_records(message_timestamp)
                 ''')
                 
+                # 创建近似号码索引表（号码删除一位后的变体 -> 号码）
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS phone_variants (
+                        variant TEXT NOT NULL,
+                        phone_number TEXT NOT NULL,
+                        PRIMARY KEY (variant, phone_number)
+                    ) WITHOUT ROWID
+                ''')
+
                 # 创建机器人配置表
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS bot_config (
@@ -100,6 +165,20 @@ class DatabaseManager:
                         updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
                     )
                 ''')
+
+                # 创建已处理消息表（幂等缓存持久化，重启后跳过重复投递的消息）
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS processed_updates (
+                        chat_id INTEGER NOT NULL,
+                        message_id INTEGER NOT NULL,
+                        expires_at REAL NOT NULL,
+                        PRIMARY KEY (chat_id, message_id)
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_processed_expires
+                    ON processed_updates(expires_at)
+                ''')
                 
                 logger.info("数据库初始化完成")
                 
@@ -118,10 +197,15 @@ class DatabaseManager:
             # 获取当前时间（UTC+8）
             current_time = datetime.now(self.timezone)
             
-            # 检查是否为重复号码
-            is_duplicate = self.is_duplicate_phone(phone_number)
-            
             with self.get_cursor() as cursor:
+                # 检查是否为重复号码（与插入在同一事务中）
+                scope_clause, scope_params = self._duplicate_scope_clause(group_id)
+                cursor.execute(
+                    f'SELECT EXISTS (SELECT 1 FROM phone_records WHERE phone_number = ?{scope_clause})',
+                    (phone_number, *scope_params)
+                )
+                is_duplicate = bool(cursor.fetchone()[0])
+
                 cursor.execute('''
                     INSERT INTO phone_records 
                     (phone_number, telegram_username, telegram_user_id, 
@@ -131,53 +215,348 @@ class DatabaseManager:
                       first_name, current_time, group_id, is_duplicate, original_message))
                 
                 record_id = cursor.lastrowid
+
+                # 新号码加入近似号码索引
+                if not is_duplicate and self.near_duplicate_check:
+                    self._index_variants(cursor, [phone_number])
+
                 logger.info(f"添加号码记录: {phone_number}, 用户: {first_name}, 重复: {is_duplicate}")
                 return record_id, is_duplicate
                 
         except Exception as e:
             logger.error(f"添加号码记录失败: {e}")
             raise
-    
-    def is_duplicate_phone(self, phone_number: str) -> bool:
-        """检查号码是否已存在"""
+
+    def add_phone_records(self, phone_numbers: List[str], telegram_username: str,
+                          telegram_user_id: int, first_name: str,
+                          group_id: int, original_message: str) -> List[Tuple[str, bool]]:
+        """
+        批量添加同一条消息中的多个号码（单个事务、一次批量插入）
+        返回: [(phone_number, is_duplicate), ...]，顺序与输入一致
+        """
+        if not phone_numbers:
+            return []
+
         try:
+            current_time = datetime.now(self.timezone)
+
             with self.get_cursor() as cursor:
+                # 一次查询找出判定范围内已存在的号码
+                placeholders = ','.join('?' * len(phone_numbers))
+                scope_clause, scope_params = self._duplicate_scope_clause(group_id)
                 cursor.execute(
-                    'SELECT COUNT(*) FROM phone_records WHERE phone_number = ?',
-                    (phone_number,)
+                    f'SELECT DISTINCT phone_number FROM phone_records '
+                    f'WHERE phone_number IN ({placeholders}){scope_clause}',
+                    (*phone_numbers, *scope_params)
                 )
-                count = cursor.fetchone()[0]
-                return count > 0
+                existing = {row[0] for row in cursor.fetchall()}
+
+                results = []
+                rows = []
+                for phone_number in phone_numbers:
+                    # 同一批次中再次出现的号码也视为重复
+                    is_duplicate = phone_number in existing
+                    existing.add(phone_number)
+                    results.append((phone_number, is_duplicate))
+                    rows.append((phone_number, telegram_username, telegram_user_id,
+                                 first_name, current_time, group_id, is_duplicate, original_message))
+
+                cursor.executemany('''
+                    INSERT INTO phone_records
+                    (phone_number, telegram_username, telegram_user_id,
+                     first_name, message_timestamp, group_id, is_duplicate, original_message)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+
+                if self.near_duplicate_check:
+                    self._index_variants(cursor, [phone for phone, is_duplicate in results if not is_duplicate])
+
+                logger.info(f"批量添加号码记录: {len(rows)} 条, 用户: {first_name}")
+                return results
+
+        except Exception as e:
+            logger.error(f"批量添加号码记录失败: {e}")
+            raise
+
+    def get_submission_counts(self, phone_numbers: List[str],
+                              group_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        批量获取多个号码的提交次数
+        指定 group_id 时按重复判定范围统计
+        """
+        if not phone_numbers:
+            return {}
+
+        try:
+            with self.get_cursor() as cursor:
+                placeholders = ','.join('?' * len(phone_numbers))
+                scope_clause, scope_params = self._duplicate_scope_clause(group_id)
+                cursor.execute(f'''
+                    SELECT phone_number, COUNT(*) FROM phone_records
+                    WHERE phone_number IN ({placeholders}){scope_clause}
+                    GROUP BY phone_number
+                ''', (*phone_numbers, *scope_params))
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"批量获取提交次数失败: {e}")
+            return {}
+
+    def _prepare_variant_index(self):
+        """
+        准备近似号码索引
+        启用时若索引尚未建立（首次启用或曾被停用）则一次性回填；
+        停用时清除就绪标记，之后重新启用会重建索引（停用期间的新号码未被索引）
+        """
+        try:
+            if not self.near_duplicate_check:
+                self.delete_config_value('phone_variants_ready')
+            elif self.get_config_value('phone_variants_ready') != '1':
+                self.rebuild_variant_index()
+        except Exception as e:
+            logger.error(f"准备近似号码索引失败: {e}")
+
+    def _index_variants(self, cursor: sqlite3.Cursor, phone_numbers: List[str]):
+        """将号码的删除变体写入近似号码索引（在调用方的事务中执行）"""
+        cursor.executemany(
+            'INSERT OR IGNORE INTO phone_variants (variant, phone_number) VALUES (?, ?)',
+            ((variant, phone_number)
+             for phone_number in dict.fromkeys(phone_numbers)
+             for variant in deletion_variants(phone_number))
+        )
+
+    def rebuild_variant_index(self) -> int:
+        """
+        按现有号码重建近似号码索引
+        返回: 索引的号码数量
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('DELETE FROM phone_variants')
+                cursor.execute('SELECT DISTINCT phone_number FROM phone_records')
+                phone_numbers = [row[0] for row in cursor.fetchall()]
+                self._index_variants(cursor, phone_numbers)
+                cursor.execute('''
+                    INSERT INTO bot_config (key, value, updated_at)
+                    VALUES ('phone_variants_ready', '1', CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                                                   updated_at = excluded.updated_at
+                ''')
+
+            logger.info(f"近似号码索引已重建: {len(phone_numbers)} 个号码")
+            return len(phone_numbers)
+
+        except Exception as e:
+            logger.error(f"重建近似号码索引失败: {e}")
+            raise
+
+    def find_near_duplicates(self, phone_number: str) -> List[str]:
+        """
+        查找与号码只差一位或相邻两位颠倒的已记录号码
+        只按删除变体探测索引（每个变体一次主键查找），不扫描号码表
+        """
+        if not self.near_duplicate_check or not phone_number:
+            return []
+
+        try:
+            variants = list(deletion_variants(phone_number))
+            with self.get_cursor() as cursor:
+                placeholders = ','.join('?' * len(variants))
+                cursor.execute(f'''
+                    SELECT DISTINCT phone_number FROM phone_variants
+                    WHERE variant IN ({placeholders}) AND phone_number != ?
+                ''', (*variants, phone_number))
+                candidates = sorted(row[0] for row in cursor.fetchall())
+
+            return [candidate for candidate in candidates if is_near_duplicate(phone_number, candidate)]
+
+        except Exception as e:
+            logger.error(f"查找近似号码失败: {e}")
+            return []
+
+    def _duplicate_scope_clause(self, group_id: Optional[int]) -> Tuple[str, tuple]:
+        """
+        重复判定范围对应的附加查询条件（接在 phone_number = ? 之后）
+        group_id 为 None 时不限范围（查询全部历史）
+        返回: (SQL 条件, 参数)
+        """
+        if group_id is None:
+            return '', ()
+
+        clause = ''
+        params = ()
+        if self.duplicate_scope == 'group':
+            clause += ' AND group_id = ?'
+            params += (group_id,)
+        if self.duplicate_window_days:
+            clause += ' AND message_timestamp >= ?'
+            params += (datetime.now(self.timezone) - timedelta(days=self.duplicate_window_days),)
+        return clause, params
+
+    def _apply_duplicate_scope(self):
+        """
+        重复判定范围变化时按新范围重新计算所有记录的重复标记
+        范围签名保存在 bot_config 中；首次记录签名时若仍是默认范围（全局、不限时间）则无需重算
+        """
+        signature = f'{self.duplicate_scope}:{self.duplicate_window_days}'
+        try:
+            stored = self.get_config_value('duplicate_scope')
+            if stored == signature:
+                return
+
+            with self.get_cursor() as cursor:
+                if stored is not None or signature != 'global:0':
+                    changed = self._recompute_duplicate_flags(cursor)
+                    logger.info(f"重复判定范围变更为 {signature}，已重算 {changed} 条记录的重复标记")
+                cursor.execute('''
+                    INSERT INTO bot_config (key, value, updated_at)
+                    VALUES ('duplicate_scope', ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                                                   updated_at = excluded.updated_at
+                ''', (signature,))
+        except Exception as e:
+            logger.error(f"应用重复判定范围失败: {e}")
+
+    def _recompute_duplicate_flags(self, cursor: sqlite3.Cursor, table: Optional[str] = None) -> int:
+        """
+        按当前重复判定范围重算重复标记（在调用方的事务中执行）
+        按号码、插入顺序遍历：同一范围内（同号码，按群组时还需同群组）存在时间窗口内的
+        更早记录即为重复。table 为临时表名时只重算其中列出的号码。
+        返回: 标记发生变化的记录数
+        """
+        condition = f'WHERE phone_number IN (SELECT phone_number FROM {table})' if table else ''
+        cursor.execute(f'''
+            SELECT id, phone_number, group_id, message_timestamp, is_duplicate
+            FROM phone_records {condition}
+            ORDER BY phone_number, id
+        ''')
+
+        window = timedelta(days=self.duplicate_window_days) if self.duplicate_window_days else None
+        by_group = self.duplicate_scope == 'group'
+
+        updates = []
+        current_phone = None
+        last_seen = {}
+        for record_id, phone_number, group_id, timestamp, is_duplicate in cursor.fetchall():
+            if phone_number != current_phone:
+                current_phone = phone_number
+                last_seen = {}
+
+            scope_key = group_id if by_group else None
+            previous = last_seen.get(scope_key)
+            if window is None:
+                duplicate = previous is not None
+            else:
+                timestamp = datetime.fromisoformat(str(timestamp))
+                duplicate = previous is not None and timestamp - previous <= window
+            last_seen[scope_key] = timestamp
+
+            if bool(is_duplicate) != duplicate:
+                updates.append((int(duplicate), record_id))
+
+        cursor.executemany('UPDATE phone_records SET is_duplicate = ? WHERE id = ?', updates)
+        return len(updates)
+
+    def is_duplicate_phone(self, phone_number: str, group_id: Optional[int] = None) -> bool:
+        """
+        检查号码是否已存在
+        指定 group_id 时按重复判定范围检查（复合索引上的一次查找）
+        """
+        try:
+            scope_clause, scope_params = self._duplicate_scope_clause(group_id)
+            with self.get_cursor() as cursor:
+                cursor.execute(
+                    f'SELECT EXISTS (SELECT 1 FROM phone_records WHERE phone_number = ?{scope_clause})',
+                    (phone_number, *scope_params)
+                )
+                return bool(cursor.fetchone()[0])
         except Exception as e:
             logger.error(f"检查重复号码失败: {e}")
             return False
 
-    def get_phone_history(self, phone_number: str) -> List[Dict]:
+    def get_phone_history(self, phone_number: str) -> List[PhoneRecord]:
         """获取特定号码的所有提交历史"""
         try:
             with self.get_cursor() as cursor:
-                cursor.execute('''
-                    SELECT telegram_username, telegram_user_id, first_name,
-                           message_timestamp, original_message
+                cursor.row_factory = phone_record_factory
+                cursor.execute(f'''
+                    SELECT {RECORD_COLUMNS}
                     FROM phone_records
                     WHERE phone_number = ?
                     ORDER BY message_timestamp ASC
                 ''', (phone_number,))
 
-                records = []
-                for row in cursor.fetchall():
-                    records.append({
-                        'username': row['telegram_username'],
-                        'user_id': row['telegram_user_id'],
-                        'first_name': row['first_name'],
-                        'timestamp': row['message_timestamp'],
-                        'original_message': row['original_message']
-                    })
-                return records
+                return cursor.fetchall()
         except Exception as e:
             logger.error(f"获取号码历史失败: {e}")
             return []
 
+    def get_phone_summary(self, phone_number: str) -> Optional[Dict]:
+        """
+        获取号码详情的汇总信息（在SQL中聚合，不读取提交历史）
+        返回: {'count', 'submitter_count', 'first_timestamp', 'last_timestamp', 'first_submitter'}，
+        号码不存在时返回None
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('''
+                    SELECT COUNT(*), COUNT(DISTINCT first_name),
+                           MIN(message_timestamp), MAX(message_timestamp),
+                           (SELECT first_name FROM phone_records
+                            WHERE phone_number = ?
+                            ORDER BY message_timestamp ASC, id ASC LIMIT 1)
+                    FROM phone_records
+                    WHERE phone_number = ?
+                ''', (phone_number, phone_number))
+                count, submitter_count, first_timestamp, last_timestamp, first_submitter = cursor.fetchone()
+
+                if not count:
+                    return None
+                return {
+                    'count': count,
+                    'submitter_count': submitter_count,
+                    'first_timestamp': first_timestamp,
+                    'last_timestamp': last_timestamp,
+                    'first_submitter': first_submitter
+                }
+        except Exception as e:
+            logger.error(f"获取号码汇总失败: {e}")
+            return None
+
+    def get_phone_history_page(self, phone_number: str, limit: int,
+                               offset: int = 0) -> List[Tuple[PhoneRecord, bool]]:
+        """
+        分页获取号码的提交历史（按时间升序）
+        重复提交者标记（该提交者此前已提交过此号码）由窗口函数一次计算，
+        只扫描到本页末尾为止的记录，跨页也保持正确；不读取原始消息内容
+        返回: [(record, is_repeat_submitter), ...]
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('''
+                    SELECT id, phone_number, telegram_username, telegram_user_id, first_name,
+                           message_timestamp, group_id, NULL, is_duplicate,
+                           COUNT(*) OVER (
+                               PARTITION BY first_name
+                               ORDER BY message_timestamp, id
+                               ROWS UNBOUNDED PRECEDING
+                           ) > 1
+                    FROM (
+                        SELECT id, phone_number, telegram_username, telegram_user_id, first_name,
+                               message_timestamp, group_id, is_duplicate
+                        FROM phone_records
+                        WHERE phone_number = ?
+                        ORDER BY message_timestamp ASC, id ASC
+                        LIMIT ?
+                    )
+                    ORDER BY message_timestamp ASC, id ASC
+                    LIMIT ? OFFSET ?
+                ''', (phone_number, offset + limit, limit, offset))
+
+                return [(PhoneRecord(*row[:-1]), bool(row[-1])) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"分页获取号码历史失败: {e}")
+            return []
+
     def get_statistics(self) -> Dict:
         """获取统计信息"""
         try:
@@ -190,15 +569,10 @@ class DatabaseManager:
                 cursor.execute('SELECT COUNT(DISTINCT phone_number) FROM phone_records')
                 unique_numbers = cursor.fetchone()[0]
 
-                # 重复号码数（有多次提交的号码）
-                cursor.execute('''
-                    SELECT COUNT(*) FROM (
-                        SELECT phone_number
-                        FROM phone_records
-                        GROUP BY phone_number
-                        HAVING COUNT(*) > 1
-                    )
-                ''')
+                # 重复号码数（在重复判定范围内被重复提交过的号码，只扫描重复记录的部分索引）
+                cursor.execute(
+                    'SELECT COUNT(DISTINCT phone_number) FROM phone_records WHERE is_duplicate = 1'
+                )
                 duplicate_numbers = cursor.fetchone()[0]
 
                 # 重复提交总数（除首次外的所有提交）
@@ -220,77 +594,77 @@ class DatabaseManager:
                 'total_duplicates': 0
             }
 
-    def get_first_submission(self, phone_number: str) -> Optional[Dict]:
-        """获取号码的首次提交记录"""
+    def get_first_submission(self, phone_number: str,
+                             group_id: Optional[int] = None) -> Optional[PhoneRecord]:
+        """
+        获取号码的首次提交记录
+        指定 group_id 时返回重复判定范围内的首次提交
+        """
         try:
+            scope_clause, scope_params = self._duplicate_scope_clause(group_id)
             with self.get_cursor() as cursor:
-                cursor.execute('''
-                    SELECT telegram_username, telegram_user_id, first_name, message_timestamp
+                cursor.row_factory = phone_record_factory
+                cursor.execute(f'''
+                    SELECT {RECORD_COLUMNS}
                     FROM phone_records
-                    WHERE phone_number = ?
+                    WHERE phone_number = ?{scope_clause}
                     ORDER BY message_timestamp ASC
                     LIMIT 1
-                ''', (phone_number,))
+                ''', (phone_number, *scope_params))
 
-                row = cursor.fetchone()
-                if row:
-                    return {
-                        'username': row['telegram_username'],
-                        'user_id': row['telegram_user_id'],
-                        'first_name': row['first_name'],
-                        'timestamp': row['message_timestamp']
-                    }
-                return None
+                return cursor.fetchone()
         except Exception as e:
             logger.error(f"获取首次提交记录失败: {e}")
             return None
 
-    def get_last_submission(self, phone_number: str) -> Optional[Dict]:
-        """获取号码的最后一次提交记录（除当前外）"""
+    def get_last_submission(self, phone_number: str,
+                            group_id: Optional[int] = None) -> Optional[PhoneRecord]:
+        """
+        获取号码的最后一次提交记录（除当前外）
+        指定 group_id 时只在重复判定范围内查找
+        """
         try:
+            scope_clause, scope_params = self._duplicate_scope_clause(group_id)
             with self.get_cursor() as cursor:
-                cursor.execute('''
-                    SELECT telegram_username, telegram_user_id, first_name, message_timestamp
+                cursor.row_factory = phone_record_factory
+                cursor.execute(f'''
+                    SELECT {RECORD_COLUMNS}
                     FROM phone_records
-                    WHERE phone_number = ?
+                    WHERE phone_number = ?{scope_clause}
                     ORDER BY message_timestamp DESC
                     LIMIT 1 OFFSET 1
-                ''', (phone_number,))
+                ''', (phone_number, *scope_params))
 
-                row = cursor.fetchone()
-                if row:
-                    return {
-                        'username': row['telegram_username'],
-                        'user_id': row['telegram_user_id'],
-                        'first_name': row['first_name'],
-                        'timestamp': row['message_timestamp']
-                    }
-                return None
+                return cursor.fetchone()
         except Exception as e:
             logger.error(f"获取最后提交记录失败: {e}")
             return None
 
-    def get_submission_count(self, phone_number: str) -> int:
-        """获取号码的提交次数"""
+    def get_submission_count(self, phone_number: str, group_id: Optional[int] = None) -> int:
+        """
+        获取号码的提交次数
+        指定 group_id 时按重复判定范围统计
+        """
         try:
+            scope_clause, scope_params = self._duplicate_scope_clause(group_id)
             with self.get_cursor() as cursor:
                 cursor.execute(
-                    'SELECT COUNT(*) FROM phone_records WHERE phone_number = ?',
-                    (phone_number,)
+                    f'SELECT COUNT(*) FROM phone_records WHERE phone_number = ?{scope_clause}',
+                    (phone_number, *scope_params)
                 )
                 return cursor.fetchone()[0]
         except Exception as e:
             logger.error(f"获取提交次数失败: {e}")
             return 0
 
-    def search_records(self, keyword: str, limit: int = 50) -> List[Dict]:
+    def search_records(self, keyword: str, limit: int = 50) -> List[PhoneRecord]:
         """搜索记录（按用户名、姓名或号码）"""
         try:
             with self.get_cursor() as cursor:
                 # 搜索用户名、姓名或号码包含关键词的记录
-                cursor.execute('''
-                    SELECT phone_number, telegram_username, telegram_user_id,
-                           first_name, message_timestamp, original_message, is_duplicate
+                cursor.row_factory = phone_record_factory
+                cursor.execute(f'''
+                    SELECT {RECORD_COLUMNS}
                     FROM phone_records
                     WHERE phone_number LIKE ?
                        OR first_name LIKE ?
@@ -300,109 +674,245 @@ class DatabaseManager:
                     LIMIT ?
                 ''', (f'%{keyword}%', f'%{keyword}%', f'%{keyword}%', f'%{keyword}%', limit))
 
-                records = []
-                for row in cursor.fetchall():
-                    records.append({
-                        'phone_number': row['phone_number'],
-                        'username': row['telegram_username'],
-                        'user_id': row['telegram_user_id'],
-                        'first_name': row['first_name'],
-                        'timestamp': row['message_timestamp'],
-                        'original_message': row['original_message'],
-                        'is_duplicate': row['is_duplicate']
-                    })
-                return records
+                return cursor.fetchall()
         except Exception as e:
             logger.error(f"搜索记录失败: {e}")
             return []
 
-    def get_user_records(self, user_identifier: str, limit: int = 50) -> List[Dict]:
+    def get_user_records(self, user_identifier: str, limit: int = 50) -> List[PhoneRecord]:
         """获取特定用户的所有记录"""
         try:
             with self.get_cursor() as cursor:
                 # 按用户名或姓名搜索
-                cursor.execute('''
-                    SELECT phone_number, telegram_username, telegram_user_id,
-                           first_name, message_timestamp, original_message, is_duplicate
+                cursor.row_factory = phone_record_factory
+                cursor.execute(f'''
+                    SELECT {RECORD_COLUMNS}
                     FROM phone_records
                     WHERE first_name = ? OR telegram_username = ?
                     ORDER BY message_timestamp DESC
                     LIMIT ?
                 ''', (user_identifier, user_identifier, limit))
 
-                records = []
-                for row in cursor.fetchall():
-                    records.append({
-                        'phone_number': row['phone_number'],
-                        'username': row['telegram_username'],
-                        'user_id': row['telegram_user_id'],
-                        'first_name': row['first_name'],
-                        'timestamp': row['message_timestamp'],
-                        'original_message': row['original_message'],
-                        'is_duplicate': row['is_duplicate']
-                    })
-                return records
+                return cursor.fetchall()
         except Exception as e:
             logger.error(f"获取用户记录失败: {e}")
             return []
 
-    def get_recent_records(self, limit: int = 20) -> List[Dict]:
+    def get_recent_records(self, limit: int = 20) -> List[PhoneRecord]:
         """获取最近的记录"""
         try:
             with self.get_cursor() as cursor:
-                cursor.execute('''
-                    SELECT phone_number, telegram_username, telegram_user_id,
-                           first_name, message_timestamp, original_message, is_duplicate
+                cursor.row_factory = phone_record_factory
+                cursor.execute(f'''
+                    SELECT {RECORD_COLUMNS}
                     FROM phone_records
                     ORDER BY message_timestamp DESC
                     LIMIT ?
                 ''', (limit,))
 
-                records = []
-                for row in cursor.fetchall():
-                    records.append({
-                        'phone_number': row['phone_number'],
-                        'username': row['telegram_username'],
-                        'user_id': row['telegram_user_id'],
-                        'first_name': row['first_name'],
-                        'timestamp': row['message_timestamp'],
-                        'original_message': row['original_message'],
-                        'is_duplicate': row['is_duplicate']
-                    })
-                return records
+                return cursor.fetchall()
         except Exception as e:
             logger.error(f"获取最近记录失败: {e}")
             return []
 
-    def export_all_records(self) -> List[Dict]:
-        """导出所有记录"""
+    def get_first_record_id_since(self, since: datetime) -> Optional[int]:
+        """时间不早于 since 的第一条记录的 ID（按时间索引查找），没有记录时返回None"""
         try:
             with self.get_cursor() as cursor:
                 cursor.execute('''
-                    SELECT phone_number, telegram_username, telegram_user_id,
-                           first_name, message_timestamp, group_id,
-                           original_message, is_duplicate
+                    SELECT id FROM phone_records
+                    WHERE message_timestamp >= ?
+                    ORDER BY message_timestamp ASC, id ASC
+                    LIMIT 1
+                ''', (since,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logger.error(f"查询记录ID失败: {e}")
+            raise
+
+    def export_all_records(self) -> List[PhoneRecord]:
+        """导出所有记录"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.row_factory = phone_record_factory
+                cursor.execute(f'''
+                    SELECT {RECORD_COLUMNS}
                     FROM phone_records
                     ORDER BY message_timestamp ASC
                 ''')
 
-                records = []
-                for row in cursor.fetchall():
-                    records.append({
-                        'phone_number': row['phone_number'],
-                        'username': row['telegram_username'],
-                        'user_id': row['telegram_user_id'],
-                        'first_name': row['first_name'],
-                        'timestamp': row['message_timestamp'],
-                        'group_id': row['group_id'],
-                        'original_message': row['original_message'],
-                        'is_duplicate': row['is_duplicate']
-                    })
-                return records
+                return cursor.fetchall()
         except Exception as e:
             logger.error(f"导出记录失败: {e}")
             return []
 
+    def get_config_value(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """读取 bot_config 表中的配置值"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('SELECT value FROM bot_config WHERE key = ?', (key,))
+                row = cursor.fetchone()
+                return row[0] if row else default
+        except Exception as e:
+            logger.error(f"读取配置失败: {e}")
+            return default
+
+    def set_config_value(self, key: str, value: str):
+        """写入 bot_config 表中的配置值"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('''
+                    INSERT INTO bot_config (key, value, updated_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                                                   updated_at = excluded.updated_at
+                ''', (key, value))
+        except Exception as e:
+            logger.error(f"写入配置失败: {e}")
+            raise
+
+    def advance_export_watermark(self, key: str, after_id: int, last_id: int) -> bool:
+        """
+        推进增量导出水位（记录ID）：仅当导出范围 (after_id, last_id] 覆盖了当前水位之后的记录，
+        即 after_id <= 当前水位 < last_id 时写入 last_id。比较和写入在同一条语句中完成，
+        同时完成的较旧导出不会把水位改回更小的值
+        返回: 是否推进了水位
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('''
+                    INSERT INTO bot_config (key, value, updated_at)
+                    SELECT ?, ?, CURRENT_TIMESTAMP
+                    FROM (SELECT COALESCE(
+                        (SELECT CAST(value AS INTEGER) FROM bot_config WHERE key = ?), 0
+                    ) AS watermark)
+                    WHERE ? <= watermark AND watermark < ?
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                                                   updated_at = excluded.updated_at
+                ''', (key, str(last_id), key, after_id, last_id))
+                return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"更新导出水位失败: {e}")
+            raise
+
+    def get_config_values(self, prefix: str) -> Dict[str, str]:
+        """读取 bot_config 表中所有以 prefix 开头的配置"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute(
+                    'SELECT key, value FROM bot_config WHERE substr(key, 1, ?) = ?',
+                    (len(prefix), prefix)
+                )
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"读取配置失败: {e}")
+            return {}
+
+    def delete_config_value(self, key: str):
+        """删除 bot_config 表中的配置值"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('DELETE FROM bot_config WHERE key = ?', (key,))
+        except Exception as e:
+            logger.error(f"删除配置失败: {e}")
+            raise
+
+    def add_processed_updates(self, entries: List[Tuple[int, int, float]]):
+        """批量记录已处理的消息 (chat_id, message_id, 过期时间)，过期时间为 Unix 时间戳"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.executemany(
+                    'INSERT OR REPLACE INTO processed_updates (chat_id, message_id, expires_at) VALUES (?, ?, ?)',
+                    entries
+                )
+        except Exception as e:
+            logger.error(f"记录已处理消息失败: {e}")
+
+    def load_processed_updates(self, now: float, limit: int) -> List[Tuple[int, int, float]]:
+        """读取未过期的已处理消息（最多 limit 条最新的），按过期时间升序"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('''
+                    SELECT chat_id, message_id, expires_at FROM (
+                        SELECT chat_id, message_id, expires_at FROM processed_updates
+                        WHERE expires_at > ?
+                        ORDER BY expires_at DESC
+                        LIMIT ?
+                    ) ORDER BY expires_at
+                ''', (now, limit))
+                return [tuple(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"读取已处理消息失败: {e}")
+            return []
+
+    def purge_processed_updates(self, now: float) -> int:
+        """删除已过期的已处理消息记录"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('DELETE FROM processed_updates WHERE expires_at <= ?', (now,))
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"清理已处理消息失败: {e}")
+            return 0
+
+    def recanonicalize_phone_numbers(self, canonicalize: Callable[[str], str],
+                                     signature: str) -> int:
+        """
+        按新的规范化规则批量重写已存储的号码
+        规则签名保存在 bot_config 中，签名未变化时直接返回。
+        合并后的号码按当前重复判定范围重新计算重复标记。
+        返回: 被改写的不同号码数量
+        """
+        if self.get_config_value('number_normalization') == signature:
+            return 0
+
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute('SELECT DISTINCT phone_number FROM phone_records')
+                updates = []
+                for (phone_number,) in cursor.fetchall():
+                    canonical = canonicalize(phone_number)
+                    if canonical and canonical != phone_number:
+                        updates.append((canonical, phone_number))
+
+                if updates:
+                    logger.warning(
+                        f"号码规范化规则变更为 {signature or '无'}，将改写 {len(updates)} 个已存储的号码"
+                        f"（数据库: {self.db_path}，如需回退请使用改写前的备份）"
+                    )
+                    cursor.executemany(
+                        'UPDATE phone_records SET phone_number = ? WHERE phone_number = ?',
+                        updates
+                    )
+
+                    # 只对受影响的号码重新计算重复标记
+                    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS canonical_changed (phone_number TEXT PRIMARY KEY)')
+                    cursor.execute('DELETE FROM canonical_changed')
+                    cursor.executemany(
+                        'INSERT OR IGNORE INTO canonical_changed (phone_number) VALUES (?)',
+                        ((canonical,) for canonical, _ in updates)
+                    )
+                    self._recompute_duplicate_flags(cursor, 'canonical_changed')
+                    cursor.execute('DROP TABLE canonical_changed')
+
+                cursor.execute('''
+                    INSERT INTO bot_config (key, value, updated_at)
+                    VALUES ('number_normalization', ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                                                   updated_at = excluded.updated_at
+                ''', (signature,))
+
+            if updates and self.near_duplicate_check:
+                self.rebuild_variant_index()
+
+            logger.info(f"号码规范化迁移完成: 改写 {len(updates)} 个号码, 规则: {signature or '无'}")
+            return len(updates)
+
+        except Exception as e:
+            logger.error(f"号码规范化迁移失败: {e}")
+            raise
+
     def close_connection(self):
         """关闭数据库连接"""
         if hasattr(self._local, 'connection'):
@@ -0,0 +1,137 @@
+"""
+时间格式化模块
+通知消息和数据导出共用的时间戳格式化，使用 zoneinfo 转换到配置的时区
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+from .配置管理 import Config
+
+WEEKDAYS = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+
+# 分钟转换缓存的容量上限（超过后整体清空）
+MINUTE_CACHE_SIZE = 65536
+
+class DayBoundaries(NamedTuple):
+    """当天的日期边界（本地时区），用于简短格式中的"今天/昨天/周几" """
+    today: datetime
+    yesterday: datetime
+    week: datetime          # 六天前的零点，之后的时间显示为周几
+    tomorrow: datetime
+    expires_at: float       # 明天零点的 Unix 时间，过期后重新计算
+
+class TimeFormatter:
+    """时间戳格式化器
+
+    数据库中的时间戳是带时区偏移的字符串（如 "2025-06-18 08:27:42.010557+08:00"）。
+    时区转换只影响到分钟为止的部分，因此按"分钟前缀 + 偏移"缓存转换结果，
+    同一分钟内的记录不再重复解析和转换；日期边界每天只计算一次。
+    """
+
+    def __init__(self, timezone: Optional[str] = None):
+        self.timezone = ZoneInfo(timezone or Config.TIMEZONE)
+        self._minute_cache = {}
+        self._boundaries: Optional[DayBoundaries] = None
+
+    def now(self) -> datetime:
+        """当前本地时间"""
+        return datetime.now(self.timezone)
+
+    def to_local(self, timestamp) -> Optional[datetime]:
+        """转换为本地时区的 datetime（无时区信息的视为本地时间），无法解析的字符串返回None"""
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+
+        if timestamp.tzinfo is None:
+            return timestamp.replace(tzinfo=self.timezone)
+        if timestamp.tzinfo is not self.timezone:
+            return timestamp.astimezone(self.timezone)
+        return timestamp
+
+    def _local_minute(self, timestamp: str) -> Optional[Tuple[datetime, str]]:
+        """
+        将时间戳字符串的分钟部分转换为本地时间
+        返回: (本地时间（精确到分钟）, "YYYY-MM-DD HH:MM")，格式不符时返回None
+        """
+        if len(timestamp) < 19 or timestamp[16] != ':':
+            return None
+
+        # 跳过秒和小数部分，剩下的是时区偏移（可能为空或 "Z"）
+        offset_start = 19
+        if timestamp[19:20] == '.':
+            offset_start = 20
+            while offset_start < len(timestamp) and timestamp[offset_start].isdigit():
+                offset_start += 1
+        key = timestamp[:16] + timestamp[offset_start:]
+
+        cached = self._minute_cache.get(key)
+        if cached is None:
+            local = self.to_local(key[:16] + ':00' + key[16:])
+            if local is None:
+                return None
+            cached = (local, local.strftime('%Y-%m-%d %H:%M'))
+            if len(self._minute_cache) >= MINUTE_CACHE_SIZE:
+                self._minute_cache.clear()
+            self._minute_cache[key] = cached
+        return cached
+
+    def day_boundaries(self) -> DayBoundaries:
+        """获取当天的日期边界（缓存到本地时间的下一个零点）"""
+        boundaries = self._boundaries
+        if boundaries is None or time.time() >= boundaries.expires_at:
+            today = self.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            # 跨夏令时的日期按墙上时间计算，再重新附加时区
+            tomorrow = (today + timedelta(days=1)).replace(tzinfo=self.timezone)
+            boundaries = DayBoundaries(
+                today=today,
+                yesterday=(today - timedelta(days=1)).replace(tzinfo=self.timezone),
+                week=(today - timedelta(days=6)).replace(tzinfo=self.timezone),
+                tomorrow=tomorrow,
+                expires_at=tomorrow.timestamp()
+            )
+            self._boundaries = boundaries
+        return boundaries
+
+    def format(self, timestamp, fmt: str = '%Y-%m-%d %H:%M:%S') -> str:
+        """按指定格式输出本地时间，无法解析的字符串原样返回"""
+        local = self.to_local(timestamp)
+        return local.strftime(fmt) if local else timestamp
+
+    def format_full(self, timestamp) -> str:
+        """完整格式：YYYY-MM-DD HH:MM:SS"""
+        if isinstance(timestamp, str):
+            minute = self._local_minute(timestamp)
+            if minute:
+                return minute[1] + timestamp[16:19]
+        return self.format(timestamp)
+
+    def format_date(self, timestamp) -> str:
+        """日期格式：YYYY-MM-DD"""
+        return self.format_full(timestamp)[:10]
+
+    def format_short(self, timestamp) -> str:
+        """简短格式：今天/昨天/周几 HH:MM，一周以前显示 MM-DD HH:MM"""
+        minute = self._local_minute(timestamp) if isinstance(timestamp, str) else None
+        if minute:
+            local, text = minute
+        else:
+            local = self.to_local(timestamp)
+            if local is None:
+                return timestamp
+            text = local.strftime('%Y-%m-%d %H:%M')
+
+        boundaries = self.day_boundaries()
+        if local >= boundaries.tomorrow:
+            return text[5:]
+        if local >= boundaries.today:
+            return f"今天 {text[11:]}"
+        if local >= boundaries.yesterday:
+            return f"昨天 {text[11:]}"
+        if local >= boundaries.week:
+            return f"{WEEKDAYS[local.weekday()]} {text[11:]}"
+        return text[5:]
@@ -0,0 +1,117 @@
+"""
+更新调度模块
+并发处理 Telegram 更新：不同群组的更新并行处理，同一群组的更新按到达顺序依次处理
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Hashable, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from .配置管理 import Config
+
+logger = logging.getLogger(__name__)
+
+# 已接收但尚未处理完的更新上限（包括等待同一群组前序更新的），超出时新更新排队
+MAX_PENDING_UPDATES = 1024
+
+@dataclass(slots=True)
+class _KeyedLock:
+    """一个键的锁及持有/等待者数量（归零时从表中删除）"""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
+
+class KeyedLocks:
+    """按键加锁（如群组ID、号码），只为正在使用的键保存锁
+
+    asyncio.Lock 按等待顺序唤醒，同一个键的持有者按调用 hold() 的顺序依次执行。
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, _KeyedLock] = {}
+
+    @asynccontextmanager
+    async def hold(self, *keys: Hashable):
+        """同时持有多个键的锁（按排序后的顺序加锁，避免互相等待造成死锁）"""
+        entries = []
+        for key in sorted(set(keys)):
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = _KeyedLock()
+            entry.users += 1
+            entries.append((key, entry))
+
+        acquired = []
+        try:
+            for _, entry in entries:
+                await entry.lock.acquire()
+                acquired.append(entry)
+            yield
+        finally:
+            for entry in acquired:
+                entry.lock.release()
+            for key, entry in entries:
+                entry.users -= 1
+                if not entry.users:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """按群组保序的并发更新处理器
+
+    - 同一群组的更新持有该群组的锁依次处理，保持消息顺序
+    - 排在群组锁后面等待的更新不占用处理名额，一个繁忙群组不会挡住其他群组
+    - 同时处理的更新数不超过 UPDATE_CONCURRENCY
+    没有所属群组的更新（如内联消息的按钮回调）不保序，只受并发数限制。
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, max_pending: int = MAX_PENDING_UPDATES):
+        super().__init__(max_pending)
+        self.concurrency = Config.UPDATE_CONCURRENCY if concurrency is None else concurrency
+        self._running = asyncio.Semaphore(self.concurrency)
+        self._chat_locks = KeyedLocks()
+
+        # 统计
+        self.active = 0
+        self.processed = 0
+        self.peak_active = 0
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """等待同一群组的前序更新处理完，再在并发名额内处理本更新"""
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await self._run(coroutine)
+            return
+
+        async with self._chat_locks.hold(chat.id):
+            await self._run(coroutine)
+
+    async def _run(self, coroutine: Awaitable[Any]):
+        async with self._running:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            try:
+                await coroutine
+            finally:
+                self.active -= 1
+                self.processed += 1
+
+    async def initialize(self) -> None:
+        """无需初始化"""
+
+    async def shutdown(self) -> None:
+        """无需清理（Application 停止时会等待所有处理中的更新）"""
+
+    def get_stats(self) -> dict:
+        """获取并发处理统计"""
+        return {
+            'concurrency': self.concurrency,
+            'active': self.active,
+            'peak_active': self.peak_active,
+            'active_chats': len(self._chat_locks),
+            'processed': self.processed,
+        }
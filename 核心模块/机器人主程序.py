@@ -3,30 +3,47 @@ Telegram机器人主程序
 处理消息、命令和用户交互
 """
 
+import asyncio
 import logging
 import os
 import time
-import threading
-from datetime import datetime, timedelta
-from collections import defaultdict
-from typing import Optional
-import pytz
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from zoneinfo import ZoneInfo
 
-from telegram import Update, Message
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, Message
+from telegram.error import BadRequest
 from telegram.ext import (
-    Application, CommandHandler, MessageHandler,
+    Application, CallbackQueryHandler, CommandHandler, MessageHandler,
     filters, ContextTypes, CallbackContext
 )
 
 from .配置管理 import Config, setup_logging
 from .数据库管理 import DatabaseManager
 from .号码检测器 import PhoneDetector
+from .群组检测配置 import DetectorRegistry
 from .通知系统 import NotificationSystem
-from .导出管理器 import ExportManager
+from .重复通知合并 import DuplicateCoalescer
+from .发送调度 import PRIORITY_QUERY, PRIORITY_SUBMISSION, SendScheduler
+from .汇总模式 import DigestManager, DigestWindow
+from .速率限制 import SlidingWindowRateLimiter
+from .幂等缓存 import IdempotencyCache
+from .更新调度 import ChatOrderedUpdateProcessor, KeyedLocks
+from .导出任务 import ExportJobManager
 
 # 设置日志
 logger = setup_logging()
 
+# bot_config 表中各群组汇总消息ID的键前缀
+DIGEST_MESSAGE_KEY_PREFIX = 'digest_message:'
+
+# bot_config 表中各群组增量导出水位（已导出的最大记录ID）的键前缀
+EXPORT_WATERMARK_KEY_PREFIX = 'export_watermark:'
+
+# 机器人接收的更新类型（长轮询和 webhook 模式相同）
+ALLOWED_UPDATES = ["message", "callback_query"]
+
 class TelegramPhoneBot:
     """Telegram号码统计机器人
 
@@ -48,23 +65,62 @@ class TelegramPhoneBot:
             self.db_manager = DatabaseManager()
             self.phone_detector = PhoneDetector()
             self.notification_system = NotificationSystem(self.db_manager)
-            self.export_manager = ExportManager()
-            self.timezone = pytz.timezone(Config.TIMEZONE)
+            self.export_jobs = ExportJobManager(self.db_manager.db_path)
+            self.timezone = ZoneInfo(Config.TIMEZONE)
+
+            # 按群组的检测配置（没有单独配置的群组使用默认检测器）
+            self.detector_registry = DetectorRegistry(self.phone_detector, self.db_manager)
+
+            # 规范化规则变化时批量改写已存储的号码
+            self.db_manager.recanonicalize_phone_numbers(
+                self.phone_detector.normalize_number,
+                self.phone_detector.normalization_signature
+            )
+
+            # 出站消息调度（优先级队列，遵守全局和群组发送速率）
+            self.sender = SendScheduler()
+
+            # 重复通知合并（窗口内的重复提交编辑同一条提醒）
+            self.duplicate_coalescer = DuplicateCoalescer(sender=self.sender)
+
+            # 汇总模式（高频群组定期发布一条置顶汇总，代替逐条回复）
+            self.digest_manager = DigestManager(self._publish_digest)
+            if self.digest_manager.groups:
+                logger.info(f"汇总模式群组: {self.digest_manager.groups}")
 
             # 初始化控制组件
-            self.rate_limiter = defaultdict(list)
+            self.rate_limiter = SlidingWindowRateLimiter()
             self.authorized_groups: Optional[set] = None
             if Config.AUTHORIZED_GROUPS and Config.AUTHORIZED_GROUPS[0]:
                 self.authorized_groups = set(map(int, Config.AUTHORIZED_GROUPS))
                 logger.info(f"已配置授权群组: {self.authorized_groups}")
 
-            # 初始化防重复处理机制
-            self._processed_messages = set()
-            self._processing_lock = threading.Lock()
-            self._last_cleanup = time.time()
+            # 同一号码的提交依次写入，避免同时提交时都被判定为新号码
+            self.phone_locks = KeyedLocks()
+
+            # 同一群组的导出依次执行（导出在后台任务中进行，不占用群组的更新处理顺序）
+            self.export_locks = KeyedLocks()
+
+            # 并发处理更新（同一群组保持顺序）
+            self.update_processor = ChatOrderedUpdateProcessor()
+
+            # 防重复处理：记录已处理的 (群组, 消息ID)
+            self.processed_updates = IdempotencyCache(
+                db_manager=self.db_manager if Config.IDEMPOTENCY_PERSIST else None
+            )
+            self._started_at = time.time()
 
             # 创建Telegram应用
-            self.application = Application.builder().token(Config.BOT_TOKEN).build()
+            self.application = (
+                Application.builder()
+                .token(Config.BOT_TOKEN)
+                .base_url(Config.TELEGRAM_API_BASE_URL)
+                .base_file_url(Config.TELEGRAM_API_FILE_URL)
+                .concurrent_updates(self.update_processor)
+                .post_stop(self._post_stop)
+                .post_shutdown(self._post_shutdown)
+                .build()
+            )
             self._setup_handlers()
 
             logger.info("机器人初始化完成")
@@ -83,6 +139,7 @@ class TelegramPhoneBot:
             # 查询命令处理器
             self.application.add_handler(CommandHandler(["stats", "statistics"], self.statistics_command))
             self.application.add_handler(CommandHandler("detail", self.detail_command))
+            self.application.add_handler(CallbackQueryHandler(self.detail_page_callback, pattern=r'^detail:'))
             self.application.add_handler(CommandHandler("search", self.search_command))
             self.application.add_handler(CommandHandler("user", self.user_command))
             self.application.add_handler(CommandHandler("recent", self.recent_command))
@@ -124,31 +181,22 @@ class TelegramPhoneBot:
             return True  # 如果没有设置授权群组，允许所有群组
         return chat_id in self.authorized_groups
 
-    def _check_rate_limit(self, user_id: int) -> bool:
-        """检查用户是否超过速率限制
+    def _check_rate_limit(self, chat_id: int, user_id: int) -> bool:
+        """检查用户在群组内是否超过速率限制
 
         Args:
+            chat_id: 群组ID
             user_id: 用户ID
 
         Returns:
             bool: 是否通过速率检查
         """
         try:
-            now = datetime.now()
-            user_messages = self.rate_limiter[user_id]
-
-            # 清理过期的消息记录
-            cutoff_time = now - timedelta(seconds=Config.RATE_LIMIT_WINDOW)
-            user_messages[:] = [msg_time for msg_time in user_messages if msg_time > cutoff_time]
-
-            # 检查是否超过限制
-            if len(user_messages) >= Config.RATE_LIMIT_MESSAGES:
-                logger.warning(f"用户 {user_id} 触发速率限制")
-                return False
+            if self.rate_limiter.check(chat_id, user_id):
+                return True
 
-            # 记录当前消息
-            user_messages.append(now)
-            return True
+            logger.warning(f"用户 {user_id} 在群组 {chat_id} 触发速率限制")
+            return False
 
         except Exception as e:
             logger.error(f"检查速率限制失败: {e}")
@@ -175,7 +223,7 @@ class TelegramPhoneBot:
 
 💡 发送 `/help` 查看完整命令列表"""
 
-            await update.message.reply_text(welcome_message, parse_mode='Markdown')
+            self.sender.reply(update.message, welcome_message, parse_mode='Markdown')
             logger.info(f"用户 {update.message.from_user.id} 执行了 /start 命令")
 
         except Exception as e:
@@ -191,6 +239,7 @@ class TelegramPhoneBot:
 • 8-15位纯数字
 • 支持关键词：号码、客户、电话、手机等
 • 自动清理格式（空格、连字符等）
+• 一条消息可包含多个号码（每行一个或多个关键词）
 
 📊 **命令列表：**
 • `/stats` `/statistics` - 查看统计信息
@@ -198,8 +247,10 @@ class TelegramPhoneBot:
 • `/search [关键词]` - 搜索号码或用户
 • `/user [用户名]` - 查看用户提交记录
 • `/recent [数量]` - 查看最近提交记录
-• `/export [格式]` - 导出数据 (csv/json/txt)
+• `/export [格式] [压缩]` - 导出数据 (csv/json/txt，gzip/zip)
+• `/export since [日期]` - 只导出上次导出（或指定日期）之后的新记录
 • `/report` - 生成汇总报告
+• `/status` - 查看运行状态
 • `/help` - 显示此帮助信息
 
 ✅ **成功示例：**
@@ -214,7 +265,7 @@ class TelegramPhoneBot:
 
 💡 **提示：** 机器人会自动记录所有有效号码并检测重复提交。"""
 
-            await update.message.reply_text(help_message, parse_mode='Markdown')
+            self.sender.reply(update.message, help_message, parse_mode='Markdown')
             logger.info(f"用户 {update.message.from_user.id} 执行了 /help 命令")
 
         except Exception as e:
@@ -237,16 +288,24 @@ class TelegramPhoneBot:
                 return
 
             # 检查速率限制
-            if not self._check_rate_limit(user.id):
-                await message.reply_text("⚠️ 发送消息过于频繁，请稍后再试。")
+            if not self._check_rate_limit(chat.id, user.id):
+                self.sender.reply(message, "⚠️ 发送消息过于频繁，请稍后再试。", PRIORITY_SUBMISSION)
                 return
 
-            # 检测号码
-            phone_number = self.phone_detector.detect_phone_number(message.text)
+            # 群组配置和关键词文件有变更时热加载（内部按间隔节流）
+            await self.detector_registry.reload_if_changed()
+            phone_detector = self.detector_registry.get(chat.id)
+            phone_detector.reload_if_changed()
 
-            if phone_number:
+            # 检测号码（一条消息中可能包含多个号码）
+            phone_numbers = phone_detector.detect_all(message.text)
+
+            if len(phone_numbers) == 1:
                 # 处理号码提交
-                await self._process_phone_submission(message, phone_number)
+                await self._process_phone_submission(message, phone_numbers[0])
+            elif phone_numbers:
+                # 多个号码合并为一次批量提交
+                await self._process_batch_submission(message, phone_numbers)
             else:
                 # 记录非号码消息（调试用）
                 logger.debug(f"未检测到号码的消息: {message.text[:50]}...")
@@ -266,40 +325,48 @@ class TelegramPhoneBot:
             user = message.from_user
             chat = message.chat
 
-            # 防重复处理：使用线程锁确保原子性
-            message_key = f"{message.message_id}_{chat.id}_{phone_number}"
-
-            with self._processing_lock:
-                # 检查消息是否已被处理
-                if message_key in self._processed_messages:
-                    logger.debug(f"消息已处理，跳过: {message_key}")
-                    return
-
-                # 标记消息为已处理
-                self._processed_messages.add(message_key)
-
-                # 定期清理过期记录（每5分钟清理一次）
-                current_time = time.time()
-                if current_time - self._last_cleanup > 300:  # 5分钟
-                    if len(self._processed_messages) > 1000:
-                        # 保留最新的500条记录
-                        recent_messages = list(self._processed_messages)[-500:]
-                        self._processed_messages = set(recent_messages)
-                        logger.debug(f"清理处理记录，保留 {len(self._processed_messages)} 条")
-                    self._last_cleanup = current_time
+            # 防重复处理：同一条消息只处理一次
+            if not self.processed_updates.add(chat.id, message.message_id):
+                logger.debug(f"消息已处理，跳过: {chat.id}/{message.message_id}")
+                return
 
             # 获取用户信息
             username = user.username
             first_name = user.first_name or "未知用户"
             user_id = user.id
 
-            # 处理提交并获取通知消息
-            notification_message, is_duplicate = self.notification_system.process_phone_submission(
-                phone_number, username, user_id, first_name, chat.id, message.text
-            )
+            # 同一号码短时间内的重复提交合并到第一条重复提醒
+            burst = self.duplicate_coalescer.acquire(chat.id, phone_number)
+            coalescing = self.duplicate_coalescer.is_active(burst)
 
-            # 发送通知
-            await message.reply_text(notification_message, parse_mode='Markdown')
+            # 处理提交并获取通知消息（数据库操作在线程中执行，不阻塞其他群组）
+            async with self.phone_locks.hold(phone_number):
+                notification_message, is_duplicate = await asyncio.to_thread(
+                    self.notification_system.process_phone_submission,
+                    phone_number, username, user_id, first_name, chat.id, message.text, burst
+                )
+
+            # 汇总模式群组只记录，提交次数达到阈值的重复号码才立即提醒
+            silent = False
+            if self.digest_manager.enabled_for(chat.id):
+                self.digest_manager.record(chat.id, phone_number, first_name, is_duplicate)
+                submission_count = burst.notice.submission_count if burst.notice else 0
+                silent = not self.digest_manager.needs_alert(is_duplicate, submission_count)
+
+            # 发送通知（合并窗口内的重复只编辑已发出的提醒）
+            if silent:
+                self.duplicate_coalescer.release(burst)
+            elif coalescing and is_duplicate:
+                self.duplicate_coalescer.schedule_edit(burst, notification_message)
+            else:
+                sent_message = self.sender.reply(
+                    message, notification_message, PRIORITY_SUBMISSION, parse_mode='Markdown'
+                )
+                if is_duplicate and burst.notice is not None:
+                    # 合并窗口需要已发出的提醒消息，等待发送完成
+                    self.duplicate_coalescer.attach(burst, await sent_message)
+                else:
+                    self.duplicate_coalescer.release(burst)
 
             # 记录详细日志
             status = "重复" if is_duplicate else "新增"
@@ -314,6 +381,55 @@ class TelegramPhoneBot:
             logger.error(f"处理号码提交失败: {e}")
             await self._send_error_message(message)
 
+    async def _process_batch_submission(self, message: Message, phone_numbers: List[str]):
+        """处理一条消息中的多个号码：一次批量写入并发送一条合并通知
+
+        Args:
+            message: Telegram消息对象
+            phone_numbers: 检测到的号码列表
+        """
+        try:
+            user = message.from_user
+            chat = message.chat
+
+            # 防重复处理：整条消息作为一个处理单元
+            if not self.processed_updates.add(chat.id, message.message_id):
+                logger.debug(f"消息已处理，跳过: {chat.id}/{message.message_id}")
+                return
+
+            first_name = user.first_name or "未知用户"
+
+            async with self.phone_locks.hold(*phone_numbers):
+                notification_message, results = await asyncio.to_thread(
+                    self.notification_system.process_phone_submissions,
+                    phone_numbers, user.username, user.id, first_name, chat.id, message.text
+                )
+
+            # 汇总模式群组只记录，有号码的提交次数达到阈值时才发送合并通知
+            silent = False
+            if self.digest_manager.enabled_for(chat.id):
+                for phone, is_duplicate in results:
+                    self.digest_manager.record(chat.id, phone, first_name, is_duplicate)
+                duplicates = [phone for phone, is_duplicate in results if is_duplicate]
+                counts = await asyncio.to_thread(self.db_manager.get_submission_counts, duplicates, chat.id)
+                max_count = max(counts.values(), default=0)
+                silent = not self.digest_manager.needs_alert(bool(duplicates), max_count)
+
+            if not silent:
+                self.sender.reply(message, notification_message, PRIORITY_SUBMISSION, parse_mode='Markdown')
+
+            duplicate_count = sum(1 for _, is_duplicate in results if is_duplicate)
+            group_name = chat.title or f"群组{chat.id}"
+            logger.info(
+                f"批量提交: {len(results)} 个号码 (重复 {duplicate_count}), "
+                f"用户: {first_name}({user.id}), "
+                f"群组: {group_name}({chat.id})"
+            )
+
+        except Exception as e:
+            logger.error(f"处理批量号码提交失败: {e}")
+            await self._send_error_message(message)
+
     async def statistics_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """处理统计命令"""
         try:
@@ -323,14 +439,14 @@ class TelegramPhoneBot:
                 return
 
             # 发送处理中消息
-            processing_msg = await update.message.reply_text("📊 正在生成统计信息...")
+            processing_msg = await self.sender.reply(update.message, "📊 正在生成统计信息...")
 
             # 获取统计信息
-            stats = self.db_manager.get_statistics()
+            stats = await asyncio.to_thread(self.db_manager.get_statistics)
 
             # 格式化并发送消息
             message = self.notification_system.format_statistics_message(stats)
-            await processing_msg.edit_text(message, parse_mode='Markdown')
+            self.sender.edit(processing_msg, message, parse_mode='Markdown')
 
             logger.info(f"用户 {update.message.from_user.id} 查看了统计信息")
 
@@ -347,7 +463,8 @@ class TelegramPhoneBot:
 
             # 获取号码参数
             if not context.args:
-                await update.message.reply_text(
+                self.sender.reply(
+                    update.message,
                     "❌ 请提供要查询的号码\n💡 使用方法: `/详情 13812345678`",
                     parse_mode='Markdown'
                 )
@@ -355,18 +472,15 @@ class TelegramPhoneBot:
 
             phone_number = context.args[0].strip()
 
-            # 清理号码格式
-            cleaned_phone = self.phone_detector._clean_number(phone_number)
+            # 清理并规范化号码格式
+            cleaned_phone = self.phone_detector.normalize_number(phone_number)
             if not cleaned_phone:
-                await update.message.reply_text("❌ 无效的号码格式")
+                self.sender.reply(update.message, "❌ 无效的号码格式")
                 return
 
-            # 获取号码历史
-            history = self.db_manager.get_phone_history(cleaned_phone)
-
-            # 格式化并发送消息
-            message = self.notification_system.format_phone_detail_message(cleaned_phone, history)
-            await update.message.reply_text(message, parse_mode='Markdown')
+            # 汇总在SQL中完成，只取第一页记录
+            message, keyboard = await asyncio.to_thread(self._render_detail_page, cleaned_phone, 0)
+            self.sender.reply(update.message, message, parse_mode='Markdown', reply_markup=keyboard)
 
             logger.info(f"用户 {update.message.from_user.id} 查询了号码 {cleaned_phone} 的详情")
 
@@ -374,6 +488,51 @@ class TelegramPhoneBot:
             logger.error(f"处理详情命令失败: {e}")
             await self._send_error_message(update.message)
 
+    def _render_detail_page(self, phone_number: str, page: int):
+        """生成号码详情的一页消息及翻页按钮"""
+        summary = self.db_manager.get_phone_summary(phone_number)
+        if not summary:
+            return self.notification_system.format_phone_detail_message(phone_number, None, []), None
+
+        page_size = self.notification_system.DETAIL_PAGE_SIZE
+        total_pages = self.notification_system.detail_page_count(summary['count'])
+        page = min(max(page, 0), total_pages - 1)
+
+        records = self.db_manager.get_phone_history_page(phone_number, page_size, page * page_size)
+        message = self.notification_system.format_phone_detail_message(phone_number, summary, records, page)
+
+        buttons = []
+        if page > 0:
+            buttons.append(InlineKeyboardButton("⬅️ 上一页", callback_data=f"detail:{phone_number}:{page - 1}"))
+        if page < total_pages - 1:
+            buttons.append(InlineKeyboardButton("下一页 ➡️", callback_data=f"detail:{phone_number}:{page + 1}"))
+        keyboard = InlineKeyboardMarkup([buttons]) if buttons else None
+
+        return message, keyboard
+
+    async def detail_page_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """处理号码详情的翻页按钮"""
+        query = update.callback_query
+        try:
+            if not query.message or not self._is_authorized_group(query.message.chat.id):
+                await query.answer()
+                return
+
+            _, phone_number, page = query.data.split(':')
+            message, keyboard = await asyncio.to_thread(self._render_detail_page, phone_number, int(page))
+            self.sender.submit(
+                query.message.chat.id,
+                lambda: query.edit_message_text(message, parse_mode='Markdown', reply_markup=keyboard)
+            )
+            await query.answer()
+
+        except Exception as e:
+            logger.error(f"处理详情翻页失败: {e}")
+            try:
+                await query.answer("❌ 翻页失败，请重新查询")
+            except Exception as answer_error:
+                logger.error(f"回应翻页按钮失败: {answer_error}")
+
     async def search_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """处理搜索命令"""
         try:
@@ -383,7 +542,8 @@ class TelegramPhoneBot:
 
             # 获取搜索参数
             if not context.args:
-                await update.message.reply_text(
+                self.sender.reply(
+                    update.message,
                     "❌ 请提供搜索关键词\n💡 使用方法: `/搜索 138` 或 `/搜索 张三`",
                     parse_mode='Markdown'
                 )
@@ -392,10 +552,11 @@ class TelegramPhoneBot:
             search_term = ' '.join(context.args).strip()
 
             # 搜索号码和用户
-            results = self.db_manager.search_records(search_term)
+            results = await asyncio.to_thread(self.db_manager.search_records, search_term)
 
             if not results:
-                await update.message.reply_text(
+                self.sender.reply(
+                    update.message,
                     f"� 未找到包含 `{search_term}` 的记录",
                     parse_mode='Markdown'
                 )
@@ -403,7 +564,7 @@ class TelegramPhoneBot:
 
             # 格式化搜索结果
             message = self.notification_system.format_search_results(search_term, results)
-            await update.message.reply_text(message, parse_mode='Markdown')
+            self.sender.reply(update.message, message, parse_mode='Markdown')
 
             logger.info(f"用户 {update.message.from_user.id} 搜索了: {search_term}")
 
@@ -420,7 +581,8 @@ class TelegramPhoneBot:
 
             # 获取用户参数
             if not context.args:
-                await update.message.reply_text(
+                self.sender.reply(
+                    update.message,
                     "❌ 请提供用户名或用户ID\n💡 使用方法: `/用户 张三` 或 `/用户 123456789`",
                     parse_mode='Markdown'
                 )
@@ -429,10 +591,11 @@ class TelegramPhoneBot:
             user_identifier = ' '.join(context.args).strip()
 
             # 查询用户记录
-            user_records = self.db_manager.get_user_records(user_identifier)
+            user_records = await asyncio.to_thread(self.db_manager.get_user_records, user_identifier)
 
             if not user_records:
-                await update.message.reply_text(
+                self.sender.reply(
+                    update.message,
                     f"� 未找到用户 `{user_identifier}` 的记录",
                     parse_mode='Markdown'
                 )
@@ -440,7 +603,7 @@ class TelegramPhoneBot:
 
             # 格式化用户记录
             message = self.notification_system.format_user_records(user_identifier, user_records)
-            await update.message.reply_text(message, parse_mode='Markdown')
+            self.sender.reply(update.message, message, parse_mode='Markdown')
 
             logger.info(f"用户 {update.message.from_user.id} 查询了用户: {user_identifier}")
 
@@ -466,15 +629,15 @@ class TelegramPhoneBot:
                     limit = 10
 
             # 获取最近记录
-            recent_records = self.db_manager.get_recent_records(limit)
+            recent_records = await asyncio.to_thread(self.db_manager.get_recent_records, limit)
 
             if not recent_records:
-                await update.message.reply_text("📝 暂无记录")
+                self.sender.reply(update.message, "📝 暂无记录")
                 return
 
             # 格式化最近记录
             message = self.notification_system.format_recent_records(recent_records)
-            await update.message.reply_text(message, parse_mode='Markdown')
+            self.sender.reply(update.message, message, parse_mode='Markdown')
 
             logger.info(f"用户 {update.message.from_user.id} 查看了最近 {limit} 条记录")
 
@@ -483,111 +646,286 @@ class TelegramPhoneBot:
             await self._send_error_message(update.message)
 
     async def export_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """处理导出命令"""
+        """处理导出命令（解析参数后在后台任务中生成和发送，不阻塞本群组后续消息的处理）"""
         try:
             # 检查是否为授权群组
             if not self._is_authorized_group(update.message.chat.id):
                 return
 
-            # 发送处理中消息
-            processing_msg = await update.message.reply_text("📊 正在生成导出文件，请稍候...")
-
-            # 获取导出格式参数
+            # 获取导出格式、压缩方式和增量参数（顺序不限，since 之后的其他参数为起始日期）
             export_format = 'csv'  # 默认CSV格式
-            if context.args and context.args[0].lower() in ['csv', 'json', 'txt']:
-                export_format = context.args[0].lower()
-
-            # 获取所有记录
-            all_records = self.db_manager.export_all_records()
-
-            if not all_records:
-                await processing_msg.edit_text("📝 暂无数据可导出")
-                return
-
-            # 根据格式导出
-            try:
-                if export_format == 'csv':
-                    filepath = self.export_manager.export_to_csv(all_records)
-                elif export_format == 'json':
-                    filepath = self.export_manager.export_to_json(all_records)
-                else:  # txt
-                    filepath = self.export_manager.export_to_text(all_records)
-
-                # 发送文件
-                with open(filepath, 'rb') as file:
-                    await update.message.reply_document(
-                        document=file,
-                        filename=os.path.basename(filepath),
-                        caption=f"📊 数据导出完成\n📁 格式: {export_format.upper()}\n📝 记录数: {len(all_records)}"
+            compression = Config.EXPORT_COMPRESSION
+            delta = False
+            since_parts = []
+            for arg in context.args or []:
+                lower = arg.lower()
+                if lower in ['csv', 'json', 'txt']:
+                    export_format = lower
+                elif lower in ['gzip', 'gz', 'zip', 'none']:
+                    compression = 'gzip' if lower == 'gz' else lower
+                elif lower == 'since':
+                    delta = True
+                elif delta:
+                    since_parts.append(arg)
+
+            since = None
+            if since_parts:
+                since = self._parse_export_since(' '.join(since_parts))
+                if since is None:
+                    self.sender.reply(
+                        update.message,
+                        "❌ 日期格式无效，示例：`/export since 2025-06-18` 或 `/export since 2025-06-18 08:00`",
+                        parse_mode='Markdown'
                     )
+                    return
 
-                # 删除处理中消息
-                await processing_msg.delete()
+            context.application.create_task(
+                self._run_export(update.message, export_format, compression, delta, since), update=update
+            )
 
-                # 清理临时文件
-                try:
-                    os.remove(filepath)
-                except:
-                    pass
+        except Exception as e:
+            logger.error(f"处理导出命令失败: {e}")
+            await self._send_error_message(update.message)
 
-                logger.info(f"用户 {update.message.from_user.id} 导出了 {export_format} 格式数据")
+    async def _run_export(self, message: Message, export_format: str, compression: str,
+                          delta: bool, since: Optional[datetime]):
+        """后台生成并发送导出文件；同一群组的导出依次执行"""
+        chat_id = message.chat.id
+        try:
+            # 发送处理中消息
+            processing_msg = await self.sender.reply(message, "📊 正在生成导出文件，请稍候...")
 
+            try:
+                async with self.export_locks.hold(chat_id):
+                    await self._export_and_send(message, processing_msg, export_format, compression, delta, since)
             except Exception as e:
-                await processing_msg.edit_text(f"❌ 导出失败: {str(e)}")
+                self.sender.edit(processing_msg, f"❌ 导出失败: {str(e)}")
                 raise
 
         except Exception as e:
             logger.error(f"处理导出命令失败: {e}")
-            await self._send_error_message(update.message)
+            await self._send_error_message(message)
+
+    async def _export_and_send(self, message: Message, processing_msg: Message, export_format: str,
+                               compression: str, delta: bool, since: Optional[datetime]):
+        """
+        生成导出文件并逐卷发送
+        只有全部分卷都发送成功后才推进本群组的增量导出水位；任一卷发送失败时水位不变，
+        下次 /export since 会重新导出同一范围
+        """
+        chat_id = message.chat.id
+
+        # 增量导出：since 从本群组上次导出的水位（记录ID）开始，since <日期> 从该时间的第一条记录开始
+        watermark_key = f'{EXPORT_WATERMARK_KEY_PREFIX}{chat_id}'
+        watermark = int(await asyncio.to_thread(self.db_manager.get_config_value, watermark_key, '0'))
+        after_id = 0
+        delta_label = None
+        if since is not None:
+            first_id = await asyncio.to_thread(self.db_manager.get_first_record_id_since, since)
+            if first_id is None:
+                self.sender.edit(processing_msg, f"📝 {since:%Y-%m-%d %H:%M} 以来暂无数据可导出")
+                return
+            after_id = first_id - 1
+            delta_label = f"{since:%Y-%m-%d %H:%M} 起"
+        elif delta:
+            after_id = watermark
+            delta_label = "上次导出后新增" if watermark else "首次导出"
+
+        # 在工作进程中生成文件，定期把进度更新到处理中消息；相同的导出请求共享同一个任务
+        async with self.export_jobs.job(
+            'export', export_format, compression, after_id,
+            on_progress=self._export_progress_callback(processing_msg, "📊 正在生成导出文件，请稍候...")
+        ) as result:
+            if not result.rows:
+                if delta_label:
+                    self.sender.edit(processing_msg, f"📝 暂无新数据可导出（ID > {after_id}）")
+                else:
+                    self.sender.edit(processing_msg, "📝 暂无数据可导出")
+                return
+
+            # 逐卷发送文件（按路径上传，发送失败重试时重新读取文件）
+            parts = len(result.filepaths)
+            uploaded = 0
+            for index, filepath in enumerate(result.filepaths, 1):
+                caption = self._export_caption(result, export_format, compression, index, after_id, delta_label)
+                try:
+                    await self.sender.submit(
+                        chat_id,
+                        lambda filepath=filepath, caption=caption: message.reply_document(
+                            document=Path(filepath),
+                            filename=os.path.basename(filepath),
+                            caption=caption
+                        )
+                    )
+                except Exception as e:
+                    logger.error(f"发送导出文件第 {index}/{parts} 卷失败，增量导出水位未更新: {e}")
+                    self.sender.edit(
+                        processing_msg,
+                        f"❌ 第 {index}/{parts} 卷发送失败，增量导出水位未更新，可重新导出: {str(e)}"
+                    )
+                    return
+                uploaded += 1
+
+        # 全部分卷发送成功、且导出覆盖了水位之后的全部记录时才推进水位
+        # （since <日期> 晚于水位时不推进，避免漏导；写入时按当前水位重新比较，较旧的导出不会让水位倒退）
+        if uploaded == parts:
+            await asyncio.to_thread(self.db_manager.advance_export_watermark, watermark_key, after_id, result.last_id)
+
+        # 删除处理中消息
+        self.sender.submit(processing_msg.chat.id, processing_msg.delete)
+
+        logger.info(
+            f"用户 {message.from_user.id} 导出了 {export_format} 格式数据"
+            f"（ID {after_id + 1}-{result.last_id}，压缩: {compression}，{parts} 个文件）"
+        )
+
+    def _parse_export_since(self, text: str) -> Optional[datetime]:
+        """解析增量导出的起始时间（YYYY-MM-DD [HH:MM]，按配置的时区），无效时返回None"""
+        try:
+            return self.notification_system.time_formatter.to_local(datetime.fromisoformat(text))
+        except ValueError:
+            return None
 
     async def report_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """处理报告命令"""
+        """处理报告命令（在后台任务中生成和发送，不阻塞本群组后续消息的处理）"""
         try:
             # 检查是否为授权群组
             if not self._is_authorized_group(update.message.chat.id):
                 return
 
-            # 发送处理中消息
-            processing_msg = await update.message.reply_text("📊 正在生成汇总报告，请稍候...")
+            context.application.create_task(self._run_report(update.message), update=update)
 
-            # 获取所有记录
-            all_records = self.db_manager.export_all_records()
+        except Exception as e:
+            logger.error(f"处理报告命令失败: {e}")
+            await self._send_error_message(update.message)
 
-            if not all_records:
-                await processing_msg.edit_text("📝 暂无数据可生成报告")
-                return
+    async def _run_report(self, message: Message):
+        """后台生成并发送汇总报告"""
+        try:
+            # 发送处理中消息
+            processing_msg = await self.sender.reply(message, "📊 正在生成汇总报告，请稍候...")
 
             try:
-                # 生成汇总报告
-                filepath = self.export_manager.generate_summary_report(all_records)
-
-                # 发送文件
-                with open(filepath, 'rb') as file:
-                    await update.message.reply_document(
-                        document=file,
-                        filename=os.path.basename(filepath),
-                        caption=f"📊 汇总报告生成完成\n📝 记录数: {len(all_records)}"
+                # 在工作进程中生成汇总报告
+                async with self.export_jobs.job(
+                    'report', 'txt',
+                    on_progress=self._export_progress_callback(processing_msg, "📊 正在生成汇总报告，请稍候...")
+                ) as result:
+                    if not result.rows:
+                        self.sender.edit(processing_msg, "📝 暂无数据可生成报告")
+                        return
+
+                    # 发送文件（按路径上传，发送失败重试时重新读取文件）
+                    await self.sender.submit(
+                        message.chat.id,
+                        lambda: message.reply_document(
+                            document=Path(result.filepaths[0]),
+                            filename=os.path.basename(result.filepaths[0]),
+                            caption=f"📊 汇总报告生成完成\n📝 记录数: {result.rows}"
+                        )
                     )
 
                 # 删除处理中消息
-                await processing_msg.delete()
-
-                # 清理临时文件
-                try:
-                    os.remove(filepath)
-                except:
-                    pass
+                self.sender.submit(processing_msg.chat.id, processing_msg.delete)
 
-                logger.info(f"用户 {update.message.from_user.id} 生成了汇总报告")
+                logger.info(f"用户 {message.from_user.id} 生成了汇总报告")
 
             except Exception as e:
-                await processing_msg.edit_text(f"❌ 报告生成失败: {str(e)}")
+                self.sender.edit(processing_msg, f"❌ 报告生成失败: {str(e)}")
                 raise
 
         except Exception as e:
             logger.error(f"处理报告命令失败: {e}")
+            await self._send_error_message(message)
+
+    @staticmethod
+    def _export_caption(result, export_format: str, compression: str, index: int,
+                        after_id: int = 0, delta_label: Optional[str] = None) -> str:
+        """导出文件的说明：格式、分卷序号、记录ID范围、记录数、压缩比和用时"""
+        lines = ["📊 数据导出完成", f"📁 格式: {export_format.upper()}"]
+        if len(result.filepaths) > 1:
+            lines.append(f"📦 第 {index}/{len(result.filepaths)} 卷")
+        if delta_label:
+            lines.append(f"🔖 增量范围: ID {after_id + 1}-{result.last_id}（{delta_label}）")
+        else:
+            lines.append(f"🔖 ID 范围: 1-{result.last_id}")
+        lines.append(f"📝 记录数: {result.rows}")
+        if compression != 'none' and result.raw_bytes:
+            ratio = result.stored_bytes / result.raw_bytes * 100
+            lines.append(
+                f"🗜 压缩: {result.raw_bytes / 1048576:.1f} MB → {result.stored_bytes / 1048576:.1f} MB（{ratio:.0f}%）"
+            )
+        lines.append(f"⏱ 用时: {result.elapsed:.1f} 秒")
+        return "\n".join(lines)
+
+    def _export_progress_callback(self, processing_msg: Message, title: str):
+        """生成把导出进度编辑到处理中消息的回调"""
+        def show_progress(written: int, total: int):
+            percent = written / total * 100 if total else 0.0
+            self.sender.edit(processing_msg, f"{title}\n⏳ 已写入 {written}/{total} 行（{percent:.0f}%）")
+        return show_progress
+
+    async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """处理 /status 命令：显示运行状态和性能计数"""
+        try:
+            # 检查是否为授权群组
+            if not self._is_authorized_group(update.message.chat.id):
+                return
+
+            message = self.notification_system.format_status_message(self._collect_status())
+            self.sender.reply(update.message, message, parse_mode='Markdown')
+
+            logger.info(f"用户 {update.message.from_user.id} 查看了运行状态")
+
+        except Exception as e:
+            logger.error(f"处理状态命令失败: {e}")
             await self._send_error_message(update.message)
 
+    def _collect_status(self) -> dict:
+        """收集各组件的运行状态"""
+        return {
+            'uptime_seconds': time.time() - self._started_at,
+            'detector': self.phone_detector.get_stats(),
+            'detector_profiles': self.detector_registry.get_stats(),
+            'duplicate_coalescer': self.duplicate_coalescer.get_stats() if self.duplicate_coalescer.enabled else None,
+            'digest': self.digest_manager.get_stats() if self.digest_manager.groups else None,
+            'rate_limiter': self.rate_limiter.get_stats(),
+            'processed_updates': self.processed_updates.get_stats(),
+            'update_processor': self.update_processor.get_stats(),
+            'export_jobs': self.export_jobs.get_stats(),
+            'sender': self.sender.get_stats()
+        }
+
+    async def _publish_digest(self, chat_id: int, window: DigestWindow):
+        """发布群组汇总：编辑已置顶的汇总消息，不存在或无法编辑时发送新消息并置顶"""
+        text = self.notification_system.format_digest_message(window, self.digest_manager.interval_minutes)
+        key = f'{DIGEST_MESSAGE_KEY_PREFIX}{chat_id}'
+        message_id = await asyncio.to_thread(self.db_manager.get_config_value, key)
+        bot = self.application.bot
+
+        if message_id:
+            try:
+                await self.sender.submit(chat_id, lambda: bot.edit_message_text(
+                    text, chat_id=chat_id, message_id=int(message_id), parse_mode='Markdown'
+                ), PRIORITY_QUERY)
+                return
+            except BadRequest as e:
+                if 'not modified' in str(e).lower():
+                    return
+                logger.warning(f"汇总消息无法编辑，重新发布: {e}")
+
+        sent_message = await self.sender.submit(
+            chat_id, lambda: bot.send_message(chat_id, text, parse_mode='Markdown'), PRIORITY_QUERY
+        )
+        await asyncio.to_thread(self.db_manager.set_config_value, key, str(sent_message.message_id))
+
+        try:
+            await self.sender.submit(chat_id, lambda: bot.pin_chat_message(
+                chat_id, sent_message.message_id, disable_notification=True
+            ), PRIORITY_QUERY)
+        except Exception as e:
+            logger.warning(f"置顶汇总消息失败（机器人需要置顶权限）: {e}")
+
     async def _send_error_message(self, message: Message):
         """发送错误消息
 
@@ -595,7 +933,8 @@ class TelegramPhoneBot:
             message: 要回复的消息对象
         """
         try:
-            await message.reply_text(
+            self.sender.reply(
+                message,
                 "❌ 处理请求时发生错误，请稍后重试。\n"
                 "如果问题持续存在，请联系管理员。"
             )
@@ -615,24 +954,28 @@ class TelegramPhoneBot:
         # 如果是更新对象且有消息，尝试发送错误提示
         if isinstance(update, Update) and update.message:
             try:
-                await update.message.reply_text(
+                self.sender.reply(
+                    update.message,
                     "❌ 系统发生错误，请稍后重试。"
                 )
             except Exception as e:
                 logger.error(f"发送错误提示失败: {e}")
 
     def run(self):
-        """启动机器人"""
+        """启动机器人（BOT_MODE 为 webhook 时接收推送，否则长轮询；两种模式共用同一套处理器）"""
         try:
             logger.info("正在启动Telegram机器人...")
             logger.info(f"授权群组: {self.authorized_groups or '所有群组'}")
 
-            self.application.run_polling(
-                allowed_updates=["message", "callback_query"],
-                drop_pending_updates=True,
-                poll_interval=1.0,
-                timeout=10
-            )
+            if Config.BOT_MODE == 'webhook':
+                self._run_webhook()
+            else:
+                self.application.run_polling(
+                    allowed_updates=ALLOWED_UPDATES,
+                    drop_pending_updates=True,
+                    poll_interval=1.0,
+                    timeout=10
+                )
         except KeyboardInterrupt:
             logger.info("收到停止信号，正在关闭机器人...")
         except Exception as e:
@@ -641,6 +984,37 @@ class TelegramPhoneBot:
         finally:
             self._cleanup()
 
+    def _run_webhook(self):
+        """以 webhook 模式运行：内置 HTTP 服务器接收更新，并向 Telegram 注册 webhook 地址
+
+        请求头中的 X-Telegram-Bot-Api-Secret-Token 与 WEBHOOK_SECRET_TOKEN 不一致时返回 403；
+        本地测试时可以把记录的更新 JSON 直接 POST 到监听地址。
+        """
+        logger.info(
+            f"Webhook模式: 监听 {Config.WEBHOOK_LISTEN}:{Config.WEBHOOK_PORT}/{Config.WEBHOOK_PATH}，"
+            f"公网地址 {Config.WEBHOOK_URL or '未设置（由监听地址生成）'}"
+        )
+        self.application.run_webhook(
+            listen=Config.WEBHOOK_LISTEN,
+            port=Config.WEBHOOK_PORT,
+            url_path=Config.WEBHOOK_PATH,
+            webhook_url=Config.WEBHOOK_URL or None,
+            secret_token=Config.WEBHOOK_SECRET_TOKEN,
+            allowed_updates=ALLOWED_UPDATES,
+            drop_pending_updates=True
+        )
+
+    async def _post_stop(self, application: Application):
+        """停止接收更新后发布未发布的汇总，并发送完队列中的消息（此时 Bot 的 HTTP 客户端仍可用）；
+        写入尚未保存的已处理消息记录"""
+        await self.digest_manager.stop()
+        await self.sender.stop()
+        await self.processed_updates.flush()
+
+    async def _post_shutdown(self, application: Application):
+        """关闭导出进程池"""
+        self.export_jobs.shutdown()
+
     def _cleanup(self):
         """清理资源"""
         try:
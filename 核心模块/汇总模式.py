@@ -0,0 +1,128 @@
+"""
+汇总模式模块
+高频群组不再逐条回复提交确认，而是定期发布（编辑）一条置顶的汇总消息
+"""
+
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from .配置管理 import Config
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class DigestWindow:
+    """一个群组在一个汇总周期内的提交情况"""
+    started_at: float
+    new_numbers: List[str] = field(default_factory=list)
+    duplicates: int = 0
+    # 提交人 -> [新号码数, 重复数]
+    submitters: Dict[str, List[int]] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return len(self.new_numbers) + self.duplicates
+
+    def add(self, phone_number: str, submitter: str, is_duplicate: bool):
+        counts = self.submitters.setdefault(submitter, [0, 0])
+        if is_duplicate:
+            self.duplicates += 1
+            counts[1] += 1
+        else:
+            self.new_numbers.append(phone_number)
+            counts[0] += 1
+
+class DigestManager:
+    """汇总模式管理器
+
+    DIGEST_GROUPS 中的群组只静默记录提交，每 DIGEST_INTERVAL 分钟把本周期的新号码、
+    重复提交和各提交人的数量交给 publish 回调发布一次；提交次数达到
+    DIGEST_ALERT_THRESHOLD 的重复号码仍然立即提醒。
+    周期内没有提交时不发布；上一周期有内容的群组发布一次空汇总，避免置顶消息显示过期数据。
+    """
+
+    def __init__(self, publish: Callable[[int, DigestWindow], Awaitable],
+                 groups: Optional[Set[int]] = None, interval_minutes: Optional[int] = None,
+                 alert_threshold: Optional[int] = None):
+        self.publish = publish
+        self.groups = set(Config.DIGEST_GROUPS) if groups is None else set(groups)
+        self.interval_minutes = Config.DIGEST_INTERVAL if interval_minutes is None else interval_minutes
+        self.alert_threshold = Config.DIGEST_ALERT_THRESHOLD if alert_threshold is None else alert_threshold
+
+        self._windows: Dict[int, DigestWindow] = {}
+        self._published: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计：静默记录的提交数、发布的汇总数、立即提醒数
+        self.recorded = 0
+        self.published = 0
+        self.alerts = 0
+
+    def enabled_for(self, chat_id: int) -> bool:
+        """群组是否使用汇总模式"""
+        return chat_id in self.groups
+
+    def needs_alert(self, is_duplicate: bool, submission_count: int) -> bool:
+        """重复提交次数达到阈值时仍立即提醒"""
+        alert = is_duplicate and submission_count >= self.alert_threshold
+        if alert:
+            self.alerts += 1
+        return alert
+
+    def record(self, chat_id: int, phone_number: str, submitter: str, is_duplicate: bool):
+        """记录一次提交到本周期的汇总"""
+        self._ensure_task()
+        window = self._windows.get(chat_id)
+        if window is None:
+            window = self._windows[chat_id] = DigestWindow(time.time())
+        window.add(phone_number, submitter, is_duplicate)
+        self.recorded += 1
+
+    def _ensure_task(self):
+        """首次记录时启动定时发布任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        """定时发布循环"""
+        while True:
+            await asyncio.sleep(self.interval_minutes * 60)
+            await self.flush()
+
+    async def flush(self):
+        """发布所有群组本周期的汇总并开始新周期"""
+        windows, self._windows = self._windows, {}
+        now = time.time()
+
+        for chat_id in set(windows) | self._published:
+            window = windows.get(chat_id) or DigestWindow(now)
+            try:
+                await self.publish(chat_id, window)
+                self.published += 1
+            except Exception as e:
+                logger.error(f"发布群组 {chat_id} 的汇总失败: {e}")
+
+        # 只有本周期有内容的群组，下一周期才需要发布空汇总
+        self._published = {chat_id for chat_id, window in windows.items() if window.total}
+
+    async def stop(self):
+        """停止定时任务，并发布尚未发布的汇总"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._windows:
+            await self.flush()
+
+    def get_stats(self) -> dict:
+        """获取汇总模式统计（saved_calls 为少发送的 Telegram API 请求数）"""
+        return {
+            'groups': len(self.groups),
+            'pending': sum(window.total for window in self._windows.values()),
+            'recorded': self.recorded,
+            'published': self.published,
+            'alerts': self.alerts,
+            'saved_calls': self.recorded - self.alerts - self.published,
+        }
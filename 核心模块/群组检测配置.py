@@ -0,0 +1,209 @@
+"""
+群组检测配置模块
+按群组使用不同的号码长度范围和关键词，每个配置编译为独立的检测器实例并缓存
+"""
+
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+from .配置管理 import Config
+from .关键词匹配 import get_file_mtime
+from .号码检测器 import PhoneDetector
+
+logger = logging.getLogger(__name__)
+
+# bot_config 表中群组配置的键前缀，完整键为 "detector_profile:<chat_id>"
+PROFILE_KEY_PREFIX = 'detector_profile:'
+
+@dataclass(frozen=True)
+class DetectorProfile:
+    """群组检测配置
+
+    未设置的字段沿用全局配置（关键词为 None 时使用关键词文件并支持热加载）。
+    不可变且可比较，重新加载时只重建内容发生变化的群组。
+    """
+    keywords: Optional[Tuple[str, ...]] = None
+    min_length: Optional[int] = None
+    max_length: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DetectorProfile':
+        """从字典创建，字段非法时抛出 ValueError"""
+        keywords = data.get('keywords')
+        if keywords is not None:
+            if isinstance(keywords, str) or not isinstance(keywords, Iterable):
+                raise ValueError("keywords 必须是关键词列表")
+            keywords = tuple(str(keyword) for keyword in keywords if keyword)
+
+        min_length = data.get('min_length')
+        max_length = data.get('max_length')
+        min_length = int(min_length) if min_length is not None else None
+        max_length = int(max_length) if max_length is not None else None
+
+        effective_min = min_length if min_length is not None else Config.MIN_PHONE_LENGTH
+        effective_max = max_length if max_length is not None else Config.MAX_PHONE_LENGTH
+        if effective_min >= effective_max:
+            raise ValueError("min_length 必须小于 max_length")
+
+        return cls(keywords, min_length, max_length)
+
+    def to_dict(self) -> dict:
+        """转换为字典（省略未设置的字段）"""
+        data = {}
+        if self.keywords is not None:
+            data['keywords'] = list(self.keywords)
+        if self.min_length is not None:
+            data['min_length'] = self.min_length
+        if self.max_length is not None:
+            data['max_length'] = self.max_length
+        return data
+
+    def create_detector(self) -> PhoneDetector:
+        """按配置编译检测器"""
+        return PhoneDetector(self.keywords, self.min_length, self.max_length)
+
+class DetectorRegistry:
+    """群组检测器注册表
+
+    配置来源（后者覆盖前者）：
+    1. DETECTOR_PROFILES_FILE 指定的 JSON 文件，格式为 {"群组ID": {配置}, ...}
+    2. bot_config 表中键为 "detector_profile:<群组ID>"、值为配置 JSON 的行
+
+    get() 只做一次字典查找，没有配置的群组使用默认检测器。
+    更新时复制字典、只重建变化的群组，再整体替换引用，读取方无需加锁
+    （因此重新加载可以在线程中进行）。配置文件只在修改时间变化时重新解析。
+    """
+
+    def __init__(self, default_detector: PhoneDetector, db_manager=None,
+                 profiles_file: Optional[str] = None):
+        self.default_detector = default_detector
+        self.db_manager = db_manager
+        self.profiles_file = Config.DETECTOR_PROFILES_FILE if profiles_file is None else profiles_file
+
+        self._profiles: Dict[int, DetectorProfile] = {}
+        self._detectors: Dict[int, PhoneDetector] = {}
+        self._file_mtime = 0.0
+        self._file_profiles: Dict[int, DetectorProfile] = {}
+        self._next_reload_check = 0.0
+
+        self.reload()
+
+    def get(self, chat_id: int) -> PhoneDetector:
+        """获取群组使用的检测器"""
+        return self._detectors.get(chat_id, self.default_detector)
+
+    def get_profile(self, chat_id: int) -> Optional[DetectorProfile]:
+        """获取群组的检测配置，没有单独配置时返回None"""
+        return self._profiles.get(chat_id)
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def _load_file_profiles(self) -> Dict[int, DetectorProfile]:
+        """读取配置文件中的群组配置"""
+        profiles = {}
+        if not self.profiles_file or not self._file_mtime:
+            return profiles
+
+        try:
+            with open(self.profiles_file, 'r', encoding='utf-8') as profiles_file:
+                data = json.load(profiles_file)
+        except Exception as e:
+            logger.error(f"读取群组检测配置文件失败: {e}")
+            return profiles
+
+        for chat_id, profile_data in data.items():
+            try:
+                profiles[int(chat_id)] = DetectorProfile.from_dict(profile_data)
+            except (TypeError, ValueError) as e:
+                logger.error(f"忽略无效的群组检测配置 {chat_id}: {e}")
+        return profiles
+
+    def _load_db_profiles(self) -> Dict[int, DetectorProfile]:
+        """读取 bot_config 表中的群组配置"""
+        profiles = {}
+        if not self.db_manager:
+            return profiles
+
+        for key, value in self.db_manager.get_config_values(PROFILE_KEY_PREFIX).items():
+            try:
+                chat_id = int(key[len(PROFILE_KEY_PREFIX):])
+                profiles[chat_id] = DetectorProfile.from_dict(json.loads(value))
+            except (TypeError, ValueError) as e:
+                logger.error(f"忽略无效的群组检测配置 {key}: {e}")
+        return profiles
+
+    def reload(self) -> int:
+        """
+        重新读取全部配置，只重建新增或变化的群组检测器
+        返回: 重建的检测器数量
+        """
+        self._next_reload_check = time.monotonic() + Config.DETECTOR_PROFILES_RELOAD_INTERVAL
+        if self.profiles_file:
+            file_mtime = get_file_mtime(self.profiles_file)
+            if file_mtime != self._file_mtime:
+                self._file_mtime = file_mtime
+                self._file_profiles = self._load_file_profiles()
+
+        profiles = dict(self._file_profiles)
+        profiles.update(self._load_db_profiles())
+        return self._apply(profiles)
+
+    async def reload_if_changed(self) -> int:
+        """按 DETECTOR_PROFILES_RELOAD_INTERVAL 节流地重新加载配置（在线程中读取文件和数据库，不阻塞事件循环）"""
+        if time.monotonic() < self._next_reload_check:
+            return 0
+        # 先推迟下次检查，加载期间到达的消息不会重复发起加载
+        self._next_reload_check = time.monotonic() + Config.DETECTOR_PROFILES_RELOAD_INTERVAL
+        return await asyncio.to_thread(self.reload)
+
+    def _apply(self, profiles: Dict[int, DetectorProfile]) -> int:
+        """应用新的配置集合，未变化的群组沿用已编译的检测器"""
+        detectors = {}
+        rebuilt = 0
+        for chat_id, profile in profiles.items():
+            detector = self._detectors.get(chat_id)
+            if detector is None or self._profiles.get(chat_id) != profile:
+                try:
+                    detector = profile.create_detector()
+                except Exception as e:
+                    logger.error(f"编译群组 {chat_id} 的检测器失败，使用默认检测器: {e}")
+                    continue
+                rebuilt += 1
+            detectors[chat_id] = detector
+
+        removed = len(set(self._detectors) - set(detectors))
+        self._profiles = {chat_id: profiles[chat_id] for chat_id in detectors}
+        self._detectors = detectors
+
+        if rebuilt or removed:
+            logger.info(f"群组检测配置已更新: 共 {len(detectors)} 个群组, 重建 {rebuilt} 个, 移除 {removed} 个")
+        return rebuilt
+
+    def set_profile(self, chat_id: int, profile: DetectorProfile):
+        """保存群组配置到 bot_config 并只重建该群组的检测器"""
+        if self.db_manager:
+            self.db_manager.set_config_value(
+                f'{PROFILE_KEY_PREFIX}{chat_id}',
+                json.dumps(profile.to_dict(), ensure_ascii=False)
+            )
+
+        profiles = dict(self._profiles)
+        profiles[chat_id] = profile
+        self._apply(profiles)
+
+    def remove_profile(self, chat_id: int):
+        """删除群组配置（来自配置文件的配置在下次重新加载时恢复）"""
+        if self.db_manager:
+            self.db_manager.delete_config_value(f'{PROFILE_KEY_PREFIX}{chat_id}')
+
+        profiles = dict(self._profiles)
+        profiles.pop(chat_id, None)
+        self._apply(profiles)
+
+    def get_stats(self) -> dict:
+        """获取注册表统计信息"""
+        return {'profiles': len(self._profiles)}
@@ -0,0 +1,32 @@
+"""
+近似号码模块
+识别只差一位（单个数字输错或相邻两位颠倒）的号码
+"""
+
+from typing import Set
+
+def deletion_variants(number: str) -> Set[str]:
+    """
+    生成号码删除任意一位后的所有变体（SymSpell 删除邻域，编辑距离1）
+    两个等长号码只差一位数字时，删除该位后的变体相同；
+    相邻两位颠倒时，一个删除前一位、另一个删除后一位得到的变体相同。
+    因此只需比较删除变体，就能找到所有近似号码的候选。
+    """
+    return {number[:position] + number[position + 1:] for position in range(len(number))}
+
+def is_near_duplicate(number: str, other: str) -> bool:
+    """判断两个号码是否只差一位数字，或只有相邻两位颠倒"""
+    if len(number) != len(other) or number == other:
+        return False
+
+    diffs = [position for position, (a, b) in enumerate(zip(number, other)) if a != b]
+    if len(diffs) == 1:
+        return True
+
+    if len(diffs) == 2:
+        first, second = diffs
+        return (second == first + 1
+                and number[first] == other[second]
+                and number[second] == other[first])
+
+    return False
@@ -4,31 +4,39 @@
 """
 
 import logging
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Optional, Tuple
-import pytz
-from .配置管理 import Config
-from .数据库管理 import DatabaseManager
+from typing import Dict, List, Optional, Tuple
+from .数据库管理 import DatabaseManager, PhoneRecord
+from .时间格式化 import TimeFormatter
+from .汇总模式 import DigestWindow
 
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True)
+class DuplicateNotice:
+    """重复提醒的内容，合并窗口内的后续重复提交只在内存中更新"""
+    phone_number: str
+    current_submitter: PhoneRecord
+    first_submitter: PhoneRecord
+    last_submitter: Optional[PhoneRecord]
+    submission_count: int
+    scope_label: str = ''
+
 class NotificationSystem:
     """通知系统"""
+
+    # 号码详情每页显示的提交记录数
+    DETAIL_PAGE_SIZE = 10
     
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
-        self.timezone = pytz.timezone(Config.TIMEZONE)
+        self.time_formatter = TimeFormatter()
     
     def format_success_message(self, phone_number: str, first_name: str,
                              username: str, timestamp: datetime) -> str:
         """格式化成功记录消息"""
-        # 确保时间戳是本地时区
-        if timestamp.tzinfo is None:
-            timestamp = self.timezone.localize(timestamp)
-        elif timestamp.tzinfo != self.timezone:
-            timestamp = timestamp.astimezone(self.timezone)
-
-        formatted_time = timestamp.strftime('%m-%d %H:%M:%S')
+        formatted_time = self.time_formatter.format(timestamp, '%m-%d %H:%M:%S')
         username_display = f"@{username}" if username else "👤"
 
         # 美化的成功消息
@@ -42,17 +50,16 @@ class NotificationSystem:
 
         return message
     
-    def format_duplicate_message(self, phone_number: str, current_submitter: Dict,
-                               first_submitter: Dict, last_submitter: Optional[Dict],
-                               submission_count: int) -> str:
-        """格式化重复号码提醒消息"""
+    def format_duplicate_message(self, phone_number: str, current_submitter: PhoneRecord,
+                               first_submitter: PhoneRecord, last_submitter: Optional[PhoneRecord],
+                               submission_count: int, scope_label: str = '') -> str:
+        """格式化重复号码提醒消息（scope_label 为重复判定范围的说明，如"本群近7天"）"""
 
         # 格式化当前提交者信息
-        current_username = f"@{current_submitter['username']}" if current_submitter['username'] else "👤"
+        current_username = f"@{current_submitter.username}" if current_submitter.username else "👤"
 
         # 格式化首次提交者信息
-        first_username = f"@{first_submitter['username']}" if first_submitter['username'] else "👤"
-        first_time = self._format_timestamp(first_submitter['timestamp'])
+        first_username = f"@{first_submitter.username}" if first_submitter.username else "👤"
 
         # 选择合适的警告图标
         warning_icon = "🔄" if submission_count <= 3 else "⚠️" if submission_count <= 5 else "🚨"
@@ -60,71 +67,53 @@ class NotificationSystem:
         message = f"""{warning_icon} **检测到重复号码！**
 
 📱 **号码：** `{phone_number}`
-👤 **本次提交：** {current_submitter['first_name']} {current_username}
-🕐 **首次记录：** {self._format_timestamp_short(first_submitter['timestamp'])} 由 {first_submitter['first_name']} {first_username}"""
+👤 **本次提交：** {current_submitter.first_name} {current_username}
+🕐 **首次记录：** {self.time_formatter.format_short(first_submitter.timestamp)} 由 {first_submitter.first_name} {first_username}"""
 
         # 如果有上次提交记录且不是首次提交者
         if last_submitter and submission_count > 2:
-            last_username = f"@{last_submitter['username']}" if last_submitter['username'] else "👤"
-            message += f"\n🔄 **上次提交：** {self._format_timestamp_short(last_submitter['timestamp'])} 由 {last_submitter['first_name']} {last_username}"
+            last_username = f"@{last_submitter.username}" if last_submitter.username else "👤"
+            message += f"\n🔄 **上次提交：** {self.time_formatter.format_short(last_submitter.timestamp)} 由 {last_submitter.first_name} {last_username}"
 
         # 添加统计信息
-        message += f"\n\n📊 **统计：** 共提交 {submission_count} 次"
+        message += f"\n\n📊 **统计：** {scope_label}共提交 {submission_count} 次"
 
         # 添加友好提示
         if submission_count >= 5:
             message += "\n💡 *提示：此号码提交较为频繁，请注意核实*"
 
         return message
-    
-    def _format_timestamp(self, timestamp) -> str:
-        """格式化时间戳（完整格式）"""
-        if isinstance(timestamp, str):
-            # 如果是字符串，尝试解析
-            try:
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            except ValueError:
-                return timestamp
-
-        # 确保时间戳是本地时区
-        if timestamp.tzinfo is None:
-            timestamp = self.timezone.localize(timestamp)
-        elif timestamp.tzinfo != self.timezone:
-            timestamp = timestamp.astimezone(self.timezone)
-
-        return timestamp.strftime('%Y-%m-%d %H:%M:%S')
-
-    def _format_timestamp_short(self, timestamp) -> str:
-        """格式化时间戳（简短格式）"""
-        if isinstance(timestamp, str):
-            try:
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            except ValueError:
-                return timestamp
-
-        # 确保时间戳是本地时区
-        if timestamp.tzinfo is None:
-            timestamp = self.timezone.localize(timestamp)
-        elif timestamp.tzinfo != self.timezone:
-            timestamp = timestamp.astimezone(self.timezone)
-
-        # 判断是否是今天
-        now = datetime.now(self.timezone)
-        if timestamp.date() == now.date():
-            return timestamp.strftime('今天 %H:%M')
-        elif (now - timestamp).days == 1:
-            return timestamp.strftime('昨天 %H:%M')
-        elif (now - timestamp).days < 7:
-            weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
-            return f"{weekdays[timestamp.weekday()]} {timestamp.strftime('%H:%M')}"
-        else:
-            return timestamp.strftime('%m-%d %H:%M')
+
+    def format_near_duplicate_message(self, phone_number: str, current_submitter: PhoneRecord,
+                                      original: PhoneRecord, original_count: int,
+                                      other_candidates: int = 0) -> str:
+        """格式化近似重复提醒消息（新号码与已记录号码只差一位或相邻两位颠倒）"""
+        current_username = f"@{current_submitter.username}" if current_submitter.username else "👤"
+        original_username = f"@{original.username}" if original.username else "👤"
+
+        message = f"""🔍 **疑似重复号码！**
+
+📱 **本次号码：** `{phone_number}`
+👤 **本次提交：** {current_submitter.first_name} {current_username}
+🎯 **疑似原号码：** `{original.phone_number}`
+🕐 **原号码首次记录：** {self.time_formatter.format_short(original.timestamp)} 由 {original.first_name} {original_username}
+
+📊 **原号码共提交 {original_count} 次**"""
+
+        if other_candidates:
+            message += f"\n🔢 另有 {other_candidates} 个相近号码"
+
+        message += "\n\n💡 *两个号码只差一位或相邻两位颠倒，请核实是否输错（本次号码已作为新号码记录）*"
+        return message
     
     def process_phone_submission(self, phone_number: str, telegram_username: str,
                                telegram_user_id: int, first_name: str,
-                               group_id: int, original_message: str) -> Tuple[str, bool]:
+                               group_id: int, original_message: str,
+                               burst=None) -> Tuple[str, bool]:
         """
         处理号码提交并生成相应的通知消息
+        burst 为重复通知合并窗口（DuplicateBurst）：窗口已有提醒内容时，重复提交只在内存中
+        累加次数并生成新内容，不再查询数据库；否则把查询到的提醒内容保存到窗口
         返回: (notification_message, is_duplicate)
         """
         try:
@@ -134,9 +123,18 @@ class NotificationSystem:
                 first_name, group_id, original_message
             )
             
-            current_time = datetime.now(self.timezone)
+            current_time = self.time_formatter.now()
             
             if not is_duplicate:
+                # 与已记录号码只差一位时提示疑似输错
+                near_duplicates = self.db_manager.find_near_duplicates(phone_number)
+                if near_duplicates:
+                    message = self._generate_near_duplicate_notification(
+                        phone_number, near_duplicates, telegram_username, telegram_user_id, first_name
+                    )
+                    if message:
+                        return message, False
+
                 # 首次提交，返回成功消息
                 message = self.format_success_message(
                     phone_number, first_name, telegram_username, current_time
@@ -144,47 +142,165 @@ class NotificationSystem:
                 return message, False
             else:
                 # 重复提交，生成重复提醒
-                return self._generate_duplicate_notification(
-                    phone_number, telegram_username, telegram_user_id, first_name
-                ), True
+                current_submitter = PhoneRecord(
+                    username=telegram_username,
+                    user_id=telegram_user_id,
+                    first_name=first_name,
+                    timestamp=current_time
+                )
+                if burst is not None and burst.notice is not None:
+                    return self._update_duplicate_notice(burst.notice, current_submitter), True
+
+                notice = self._load_duplicate_notice(phone_number, current_submitter, group_id)
+                if not notice:
+                    return "⚠️ 号码重复，但无法获取详细信息。", True
+                if burst is not None:
+                    burst.notice = notice
+                return self.format_duplicate_notice(notice), True
                 
         except Exception as e:
             logger.error(f"处理号码提交失败: {e}")
             return "❌ 处理号码时发生错误，请稍后重试。", False
-    
-    def _generate_duplicate_notification(self, phone_number: str, telegram_username: str,
-                                       telegram_user_id: int, first_name: str) -> str:
-        """生成重复号码通知"""
+
+    def process_phone_submissions(self, phone_numbers: List[str], telegram_username: str,
+                                  telegram_user_id: int, first_name: str,
+                                  group_id: int, original_message: str) -> Tuple[str, List[Tuple[str, bool]]]:
+        """
+        批量处理同一条消息中的多个号码，生成一条合并通知
+        返回: (notification_message, [(phone_number, is_duplicate), ...])
+        """
+        try:
+            results = self.db_manager.add_phone_records(
+                phone_numbers, telegram_username, telegram_user_id,
+                first_name, group_id, original_message
+            )
+
+            duplicates = [phone for phone, is_duplicate in results if is_duplicate]
+            submission_counts = self.db_manager.get_submission_counts(duplicates, group_id)
+
+            # 新号码的疑似原号码
+            near_duplicates = {}
+            for phone, is_duplicate in results:
+                if not is_duplicate:
+                    candidates = self.db_manager.find_near_duplicates(phone)
+                    if candidates:
+                        near_duplicates[phone] = candidates[0]
+
+            message = self.format_batch_message(
+                results, submission_counts, first_name, telegram_username,
+                self.time_formatter.now(), near_duplicates
+            )
+            return message, results
+
+        except Exception as e:
+            logger.error(f"批量处理号码提交失败: {e}")
+            return "❌ 处理号码时发生错误，请稍后重试。", []
+
+    def format_batch_message(self, results: List[Tuple[str, bool]], submission_counts: Dict[str, int],
+                             first_name: str, username: str, timestamp: datetime,
+                             near_duplicates: Optional[Dict[str, str]] = None) -> str:
+        """格式化批量提交的合并通知消息"""
+        formatted_time = self.time_formatter.format(timestamp, '%m-%d %H:%M:%S')
+        username_display = f"@{username}" if username else "👤"
+
+        new_numbers = [phone for phone, is_duplicate in results if not is_duplicate]
+        duplicate_numbers = [phone for phone, is_duplicate in results if is_duplicate]
+
+        message = f"""📥 **批量记录完成！** 共 {len(results)} 个号码
+
+👤 **提交人：** {first_name} {username_display}
+⏰ **时间：** {formatted_time}"""
+
+        if new_numbers:
+            message += f"\n\n🎉 **新增 {len(new_numbers)} 个：**"
+            near_duplicates = near_duplicates or {}
+            for phone in new_numbers:
+                original = near_duplicates.get(phone)
+                near_display = f" 🔍 疑似 `{original}`" if original else ""
+                message += f"\n• `{phone}`{near_display}"
+
+        if duplicate_numbers:
+            message += f"\n\n🔄 **重复 {len(duplicate_numbers)} 个：**"
+            for phone in duplicate_numbers:
+                count = submission_counts.get(phone)
+                count_display = f" ({self.duplicate_scope_label()}共提交 {count} 次)" if count else ""
+                message += f"\n• `{phone}`{count_display}"
+            message += "\n\n💡 *使用 `/详情 [号码]` 查看重复号码的提交历史*"
+
+        return message
+
+    def duplicate_scope_label(self) -> str:
+        """重复判定范围的简短说明（全局且不限时间时为空）"""
+        label = '本群' if self.db_manager.duplicate_scope == 'group' else ''
+        if self.db_manager.duplicate_window_days:
+            label += f'近{self.db_manager.duplicate_window_days}天'
+        return label
+
+    def _load_duplicate_notice(self, phone_number: str, current_submitter: PhoneRecord,
+                               group_id: Optional[int] = None) -> Optional[DuplicateNotice]:
+        """查询重复提醒的内容（首次/上次提交和提交次数都按重复判定范围查询）"""
         try:
-            # 获取当前提交者信息
-            current_submitter = {
-                'username': telegram_username,
-                'user_id': telegram_user_id,
-                'first_name': first_name
-            }
-            
             # 获取首次提交记录
-            first_submitter = self.db_manager.get_first_submission(phone_number)
+            first_submitter = self.db_manager.get_first_submission(phone_number, group_id)
             if not first_submitter:
                 logger.error(f"无法获取号码 {phone_number} 的首次提交记录")
-                return "⚠️ 号码重复，但无法获取详细信息。"
+                return None
             
             # 获取上次提交记录
-            last_submitter = self.db_manager.get_last_submission(phone_number)
+            last_submitter = self.db_manager.get_last_submission(phone_number, group_id)
             
             # 获取提交次数
-            submission_count = self.db_manager.get_submission_count(phone_number)
+            submission_count = self.db_manager.get_submission_count(phone_number, group_id)
             
-            # 生成重复消息
-            return self.format_duplicate_message(
+            return DuplicateNotice(
                 phone_number, current_submitter, first_submitter,
-                last_submitter, submission_count
+                last_submitter, submission_count, self.duplicate_scope_label()
             )
             
         except Exception as e:
             logger.error(f"生成重复通知失败: {e}")
-            return "⚠️ 号码重复，但无法获取详细信息。"
+            return None
+
+    def _update_duplicate_notice(self, notice: DuplicateNotice, current_submitter: PhoneRecord) -> str:
+        """合并窗口内的又一次重复提交：在内存中更新提醒内容"""
+        notice.last_submitter = notice.current_submitter
+        notice.current_submitter = current_submitter
+        notice.submission_count += 1
+        return self.format_duplicate_notice(notice)
+
+    def format_duplicate_notice(self, notice: DuplicateNotice) -> str:
+        """格式化重复提醒内容"""
+        return self.format_duplicate_message(
+            notice.phone_number, notice.current_submitter, notice.first_submitter,
+            notice.last_submitter, notice.submission_count, notice.scope_label
+        )
     
+    def _generate_near_duplicate_notification(self, phone_number: str, near_duplicates: List[str],
+                                              telegram_username: str, telegram_user_id: int,
+                                              first_name: str) -> Optional[str]:
+        """生成近似重复通知，取提交次数最多的近似号码作为疑似原号码"""
+        try:
+            counts = self.db_manager.get_submission_counts(near_duplicates)
+            original_number = max(near_duplicates, key=lambda phone: counts.get(phone, 0))
+
+            original = self.db_manager.get_first_submission(original_number)
+            if not original:
+                return None
+
+            current_submitter = PhoneRecord(
+                username=telegram_username,
+                user_id=telegram_user_id,
+                first_name=first_name
+            )
+            return self.format_near_duplicate_message(
+                phone_number, current_submitter, original,
+                counts.get(original_number, 1), len(near_duplicates) - 1
+            )
+
+        except Exception as e:
+            logger.error(f"生成近似重复通知失败: {e}")
+            return None
+
     def format_statistics_message(self, stats: Dict) -> str:
         """格式化统计报告消息"""
         # 计算重复率
@@ -213,6 +329,11 @@ class NotificationSystem:
 📊 **数据质量**
 重复率：{duplicate_rate:.1f}%"""
 
+        # 重复数据按重复判定范围统计
+        scope_label = self.duplicate_scope_label()
+        if scope_label:
+            message = message.replace("重复率：", f"重复率（{scope_label}）：", 1)
+
         # 添加数据质量评估
         if duplicate_rate == 0:
             message += " 🎉 *数据质量优秀*"
@@ -232,9 +353,132 @@ class NotificationSystem:
 
         return message
     
-    def format_phone_detail_message(self, phone_number: str, history: list) -> str:
-        """格式化号码详情消息"""
-        if not history:
+    def format_digest_message(self, window: DigestWindow, interval_minutes: int) -> str:
+        """格式化汇总模式的定期汇总消息"""
+        updated_at = self.time_formatter.format(self.time_formatter.now(), '%m-%d %H:%M')
+
+        message = f"""📋 **号码汇总**（近{interval_minutes}分钟）
+
+🆕 **新号码：** {len(window.new_numbers)} 个
+🔄 **重复提交：** {window.duplicates} 次"""
+
+        if window.new_numbers:
+            shown = window.new_numbers[:10]
+            message += "\n" + "\n".join(f"• `{phone}`" for phone in shown)
+            if len(window.new_numbers) > len(shown):
+                message += f"\n... *还有 {len(window.new_numbers) - len(shown)} 个*"
+
+        if window.submitters:
+            message += "\n\n👥 **提交人：**"
+            ranked = sorted(window.submitters.items(), key=lambda item: -(item[1][0] + item[1][1]))
+            for submitter, (new_count, duplicate_count) in ranked[:15]:
+                message += f"\n• {submitter}：新 {new_count}，重复 {duplicate_count}"
+            if len(ranked) > 15:
+                message += f"\n... *还有 {len(ranked) - 15} 人*"
+        else:
+            message += "\n\n💤 本周期暂无提交"
+
+        message += f"\n\n🕐 *更新于 {updated_at}，每{interval_minutes}分钟更新*"
+        return message
+
+    def format_status_message(self, status: Dict) -> str:
+        """格式化运行状态消息"""
+        uptime = int(status.get('uptime_seconds', 0))
+        hours, remainder = divmod(uptime, 3600)
+        minutes = remainder // 60
+
+        message = f"""🤖 **运行状态**
+
+⏱ **运行时长：** {hours}小时{minutes}分钟"""
+
+        detector = status.get('detector')
+        if detector:
+            message += f"""
+
+🔍 **号码检测**
+├ 📨 检测消息：{detector['checked']}
+├ ⚡ 预过滤跳过：{detector['prefiltered']} ({detector['prefilter_rate']:.1f}%)
+├ 🔤 关键词数：{detector['keyword_count']}"""
+
+            profiles = status.get('detector_profiles')
+            if profiles:
+                message += f"""
+├ 🗂 群组独立配置：{profiles['profiles']} 个"""
+
+            cache = detector.get('cache')
+            if cache:
+                message += f"""
+└ 💾 缓存命中：{cache['hits']}/{cache['hits'] + cache['misses']} ({cache['hit_rate']:.1f}%)，已用 {cache['size']}/{cache['max_size']}"""
+
+        coalescer = status.get('duplicate_coalescer')
+        if coalescer:
+            message += f"""
+
+🔄 **重复通知合并**
+├ 📌 合并中的提醒：{coalescer['active']}
+├ ✏️ 合并提交/编辑：{coalescer['absorbed']}/{coalescer['edits']}
+└ 💰 节省API调用：{coalescer['saved_calls']}"""
+
+        digest = status.get('digest')
+        if digest:
+            message += f"""
+
+📋 **汇总模式**
+├ 👥 汇总群组：{digest['groups']}
+├ 📝 静默记录/待汇总：{digest['recorded']}/{digest['pending']}
+├ 📢 汇总发布/立即提醒：{digest['published']}/{digest['alerts']}
+└ 💰 节省API调用：{digest['saved_calls']}"""
+
+        rate_limiter = status.get('rate_limiter')
+        if rate_limiter:
+            message += f"""
+
+🚥 **速率限制**
+└ 👤 跟踪用户：{rate_limiter['tracked']}，拒绝 {rate_limiter['rejected']} 次，淘汰空闲 {rate_limiter['evicted']}"""
+
+        update_processor = status.get('update_processor')
+        if update_processor:
+            message += f"""
+
+⚙️ **并发处理**
+├ 🔀 处理中：{update_processor['active']}/{update_processor['concurrency']}（峰值 {update_processor['peak_active']}），活跃群组 {update_processor['active_chats']}
+└ ✅ 已处理更新：{update_processor['processed']}"""
+
+        export_jobs = status.get('export_jobs')
+        if export_jobs:
+            message += f"""
+
+📁 **导出任务**
+├ 🏭 运行中：{export_jobs['running']}/{export_jobs['max_jobs']}
+└ 📦 已启动 {export_jobs['started']}，共享 {export_jobs['shared']}，失败 {export_jobs['failed']}"""
+
+        processed = status.get('processed_updates')
+        if processed:
+            message += f"""
+
+🔁 **消息去重**
+└ 🧾 已记录消息：{processed['size']}/{processed['max_size']}，跳过重复投递 {processed['duplicates']} 次{'（已持久化）' if processed['persistent'] else ''}"""
+
+        sender = status.get('sender')
+        if sender:
+            message += f"""
+
+📤 **发送队列**
+├ 📥 排队中：{sender['queue_depth']}（提交确认 {sender['queue_by_priority']['submission']}，查询 {sender['queue_by_priority']['query']}），发送中 {sender['in_flight']}
+├ ✅ 已发送：{sender['sent']}，失败 {sender['failed']}，重试 {sender['retries']}
+├ 🚦 洪水限制：{sender['flood_waits']} 次
+└ ⏱ 发送延迟：p50 {sender['latency_p50_ms']:.0f}ms，p99 {sender['latency_p99_ms']:.0f}ms"""
+
+        return message
+
+    def format_phone_detail_message(self, phone_number: str, summary: Optional[Dict],
+                                    page_records: List[Tuple[PhoneRecord, bool]], page: int = 0) -> str:
+        """
+        格式化号码详情消息（一页）
+        summary 为 DatabaseManager.get_phone_summary 的结果，
+        page_records 为 get_phone_history_page 返回的本页记录及重复提交者标记
+        """
+        if not summary:
             return f"""📋 **号码查询结果**
 
 🔍 **查询号码：** `{phone_number}`
@@ -242,15 +486,12 @@ class NotificationSystem:
 
 💡 *请检查号码是否正确或尝试其他号码*"""
 
-        count = len(history)
+        count = summary['count']
+        submitter_count = summary['submitter_count']
 
         # 分析提交模式
-        first_time = self._format_timestamp_short(history[0]['timestamp'])
-        last_time = self._format_timestamp_short(history[-1]['timestamp']) if count > 1 else first_time
-
-        # 统计提交者
-        submitters = set(record['first_name'] for record in history)
-        submitter_count = len(submitters)
+        first_time = self.time_formatter.format_short(summary['first_timestamp'])
+        last_time = self.time_formatter.format_short(summary['last_timestamp'])
 
         message = f"""📋 **号码详细记录**
 
@@ -263,27 +504,31 @@ class NotificationSystem:
 
         message += f"\n\n📝 **提交历史：**"
 
-        # 限制显示数量，避免消息过长
-        display_count = min(count, 10)
-        for i, record in enumerate(history[:display_count], 1):
-            username_display = f"@{record['username']}" if record['username'] else "👤"
-            formatted_time = self._format_timestamp_short(record['timestamp'])
+        # 每页只显示一部分记录，避免消息过长
+        start = page * self.DETAIL_PAGE_SIZE
+        for i, (record, is_repeat) in enumerate(page_records, start + 1):
+            username_display = f"@{record.username}" if record.username else "👤"
+            formatted_time = self.time_formatter.format_short(record.timestamp)
 
             # 标记重复提交者
-            is_repeat = sum(1 for r in history[:i] if r['first_name'] == record['first_name']) > 1
             repeat_mark = " 🔄" if is_repeat else ""
 
-            message += f"\n{i}. {formatted_time} - {record['first_name']} {username_display}{repeat_mark}"
+            message += f"\n{i}. {formatted_time} - {record.first_name} {username_display}{repeat_mark}"
 
-        # 如果记录太多，显示省略提示
-        if count > display_count:
-            message += f"\n... *还有 {count - display_count} 条记录*"
+        # 记录较多时显示页码
+        total_pages = self.detail_page_count(count)
+        if total_pages > 1:
+            message += f"\n📄 *第 {page + 1}/{total_pages} 页，共 {count} 条记录*"
 
         # 添加操作提示
-        message += f"\n\n💡 *使用 `/搜索 {history[0]['first_name']}` 查看该用户的所有提交*"
+        message += f"\n\n💡 *使用 `/搜索 {summary['first_submitter']}` 查看该用户的所有提交*"
 
         return message
 
+    def detail_page_count(self, count: int) -> int:
+        """号码详情的总页数"""
+        return max(1, -(-count // self.DETAIL_PAGE_SIZE))
+
     def format_search_results(self, keyword: str, results: list) -> str:
         """格式化搜索结果消息"""
         if not results:
@@ -305,11 +550,11 @@ class NotificationSystem:
         # 限制显示数量
         display_count = min(count, 10)
         for i, record in enumerate(results[:display_count], 1):
-            username_display = f"@{record['username']}" if record['username'] else "👤"
-            formatted_time = self._format_timestamp_short(record['timestamp'])
-            duplicate_mark = " 🔄" if record['is_duplicate'] else ""
+            username_display = f"@{record.username}" if record.username else "👤"
+            formatted_time = self.time_formatter.format_short(record.timestamp)
+            duplicate_mark = " 🔄" if record.is_duplicate else ""
 
-            message += f"\n{i}. `{record['phone_number']}` - {record['first_name']} {username_display}"
+            message += f"\n{i}. `{record.phone_number}` - {record.first_name} {username_display}"
             message += f"\n   ⏰ {formatted_time}{duplicate_mark}"
 
         if count > display_count:
@@ -333,12 +578,12 @@ class NotificationSystem:
         first_record = records[0]
 
         # 统计用户信息
-        unique_phones = set(record['phone_number'] for record in records)
-        duplicate_count = sum(1 for record in records if record['is_duplicate'])
+        unique_phones = set(record.phone_number for record in records)
+        duplicate_count = sum(1 for record in records if record.is_duplicate)
 
         message = f"""👤 **用户记录详情**
 
-🔎 **用户：** {first_record['first_name']} (@{first_record['username'] or '无'})
+🔎 **用户：** {first_record.first_name} (@{first_record.username or '无'})
 📊 **统计：** 提交 {count} 次，{len(unique_phones)} 个不同号码
 🔄 **重复：** {duplicate_count} 次重复提交
 
@@ -347,7 +592,7 @@ class NotificationSystem:
         # 按号码分组显示
         phone_groups = {}
         for record in records:
-            phone = record['phone_number']
+            phone = record.phone_number
             if phone not in phone_groups:
                 phone_groups[phone] = []
             phone_groups[phone].append(record)
@@ -358,7 +603,7 @@ class NotificationSystem:
                 break
 
             phone_count = len(phone_records)
-            latest_time = self._format_timestamp_short(phone_records[0]['timestamp'])
+            latest_time = self.time_formatter.format_short(phone_records[0].timestamp)
 
             if phone_count == 1:
                 message += f"\n• `{phone}` - {latest_time}"
@@ -387,11 +632,11 @@ class NotificationSystem:
 📝 **记录列表：**"""
 
         for i, record in enumerate(records, 1):
-            username_display = f"@{record['username']}" if record['username'] else "👤"
-            formatted_time = self._format_timestamp_short(record['timestamp'])
-            duplicate_mark = " 🔄" if record['is_duplicate'] else ""
+            username_display = f"@{record.username}" if record.username else "👤"
+            formatted_time = self.time_formatter.format_short(record.timestamp)
+            duplicate_mark = " 🔄" if record.is_duplicate else ""
 
-            message += f"\n{i}. `{record['phone_number']}` - {record['first_name']} {username_display}"
+            message += f"\n{i}. `{record.phone_number}` - {record.first_name} {username_display}"
             message += f"\n   ⏰ {formatted_time}{duplicate_mark}"
 
         message += f"\n\n💡 *使用 `/搜索 [关键词]` 搜索特定记录*"
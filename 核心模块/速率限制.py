@@ -0,0 +1,120 @@
+"""
+速率限制模块
+按（群组, 用户）限制消息频率，使用两桶滑动窗口计数，每个用户只保存三个数值，
+空闲用户自动淘汰，内存不随历史用户数增长
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+from .配置管理 import Config
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class WindowCounter:
+    """两桶滑动窗口计数：当前窗口的起点、上一窗口和当前窗口的消息数"""
+    window_start: float
+    previous: int = 0
+    current: int = 0
+
+def parse_group_limits(spec: str) -> Dict[int, Tuple[int, float]]:
+    """
+    解析按群组的限制配置
+    格式："群组ID:消息数/秒数"，逗号分隔，如 "-1001234567890:30/60,-1009876543210:5/60"
+    返回: {群组ID: (消息数, 窗口秒数)}，非法条目记录日志后忽略
+    """
+    limits = {}
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            chat_id, rate = item.rsplit(':', 1)
+            messages, seconds = rate.split('/')
+            limits[int(chat_id)] = (int(messages), float(seconds))
+        except ValueError:
+            logger.error(f"忽略无效的群组速率限制配置: {item}")
+    return limits
+
+class SlidingWindowRateLimiter:
+    """滑动窗口速率限制器
+
+    估算值 = 上一窗口计数 × 上一窗口仍在滑动窗口内的比例 + 当前窗口计数，
+    达到上限时拒绝（被拒绝的消息不计数）。计数器按窗口长度分组，每组按最近访问顺序
+    保存在一个 OrderedDict 中，每次检查时从各组最久未访问的一端淘汰空闲超过两个窗口的
+    用户（此时两个桶都已归零）。同一组内窗口长度相同，窗口较长的群组不会挡住其他群组
+    已经空闲的计数器，检查和淘汰均摊 O(1)（窗口长度的种类数很少）。
+    """
+
+    def __init__(self, messages: Optional[int] = None, window: Optional[float] = None,
+                 group_limits: Optional[Dict[int, Tuple[int, float]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.default_limit = (
+            Config.RATE_LIMIT_MESSAGES if messages is None else messages,
+            float(Config.RATE_LIMIT_WINDOW if window is None else window)
+        )
+        self.group_limits = parse_group_limits(Config.RATE_LIMIT_GROUPS) if group_limits is None else group_limits
+        self.clock = clock
+
+        self._counters: Dict[float, 'OrderedDict[Tuple[int, int], WindowCounter]'] = {}
+        self.rejected = 0
+        self.evicted = 0
+
+    def limit_for(self, chat_id: int) -> Tuple[int, float]:
+        """群组的限制（消息数, 窗口秒数）"""
+        return self.group_limits.get(chat_id, self.default_limit)
+
+    def check(self, chat_id: int, user_id: int) -> bool:
+        """检查并记录一条消息，超过限制时返回False"""
+        now = self.clock()
+        self._evict_idle(now)
+
+        limit, window = self.limit_for(chat_id)
+        key = (chat_id, user_id)
+        counters = self._counters.get(window)
+        if counters is None:
+            counters = self._counters[window] = OrderedDict()
+        counter = counters.get(key)
+        if counter is None:
+            counter = counters[key] = WindowCounter(now)
+        else:
+            counters.move_to_end(key)
+            elapsed = now - counter.window_start
+            if elapsed >= window:
+                # 滚动窗口：只跳过一个窗口时当前计数成为上一窗口计数，否则两者都已过期
+                passed = int(elapsed // window)
+                counter.previous = counter.current if passed == 1 else 0
+                counter.current = 0
+                counter.window_start += passed * window
+
+        elapsed_ratio = (now - counter.window_start) / window
+        if counter.previous * (1.0 - elapsed_ratio) + counter.current >= limit:
+            self.rejected += 1
+            return False
+
+        counter.current += 1
+        return True
+
+    def _evict_idle(self, now: float):
+        """淘汰各窗口长度分组中最久未访问一端空闲超过两个窗口的计数器"""
+        for window, counters in self._counters.items():
+            while counters:
+                counter = next(iter(counters.values()))
+                if now - counter.window_start < 2 * window:
+                    break
+                counters.popitem(last=False)
+                self.evicted += 1
+
+    def __len__(self) -> int:
+        return sum(len(counters) for counters in self._counters.values())
+
+    def get_stats(self) -> dict:
+        """获取速率限制统计"""
+        return {
+            'tracked': len(self),
+            'rejected': self.rejected,
+            'evicted': self.evicted,
+        }
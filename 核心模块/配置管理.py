@@ -4,6 +4,7 @@
 """
 
 import os
+import re
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
@@ -27,6 +28,21 @@ class Config:
     # Telegram Bot配置
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     
+    # Bot API 地址（可指向自建的 Bot API 服务器或本地模拟服务）
+    TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+    TELEGRAM_API_FILE_URL = os.getenv('TELEGRAM_API_FILE_URL', 'https://api.telegram.org/file/bot')
+
+    # 运行模式：polling（长轮询）或 webhook（内置 HTTP 服务器接收 Telegram 推送的更新）
+    BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+    # Webhook 公网地址（Telegram 推送的完整 URL，留空时由监听地址、端口和路径生成）
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+    # Webhook 监听地址、端口和路径
+    WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+    # Webhook 校验密钥：请求头 X-Telegram-Bot-Api-Secret-Token 不匹配的请求被拒绝（1-256位字母、数字、_、-）
+    WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN', '')
+
     # 数据库配置
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'phone_records.db')
     
@@ -44,7 +60,18 @@ class Config:
     # 速率限制配置
     RATE_LIMIT_MESSAGES = int(os.getenv('RATE_LIMIT_MESSAGES', 10))
     RATE_LIMIT_WINDOW = int(os.getenv('RATE_LIMIT_WINDOW', 60))
+    # 按群组覆盖的限制："群组ID:消息数/秒数"，逗号分隔
+    RATE_LIMIT_GROUPS = os.getenv('RATE_LIMIT_GROUPS', '')
     
+    # 出站消息速率：全部群组合计每秒条数、同一群组两次发送的最小间隔（秒）、同一私聊两次发送的最小间隔（秒）、
+    # 失败重试次数、同时进行的请求数（不同群组并行发送）
+    # Telegram 限制机器人在一个群组内每分钟约 20 条消息，即每 3 秒一条；私聊约每秒一条
+    SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', 25))
+    SEND_CHAT_INTERVAL = float(os.getenv('SEND_CHAT_INTERVAL', 3.0))
+    SEND_PRIVATE_INTERVAL = float(os.getenv('SEND_PRIVATE_INTERVAL', 1.0))
+    SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', 5))
+    SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 8))
+
     # 授权群组配置
     AUTHORIZED_GROUPS = os.getenv('AUTHORIZED_GROUPS', '').split(',') if os.getenv('AUTHORIZED_GROUPS') else []
     
@@ -54,6 +81,68 @@ class Config:
         '电话：', '电话:', '手机：', '手机:',
         '联系方式：', '联系方式:', '联系电话：', '联系电话:'
     ]
+
+    # 关键词文件（存在时优先于 PHONE_KEYWORDS，修改后自动热加载）
+    KEYWORDS_FILE = os.getenv(
+        'KEYWORDS_FILE',
+        str(Path(__file__).parent.parent / "配置文件" / "号码关键词.txt")
+    )
+    KEYWORDS_RELOAD_INTERVAL = int(os.getenv('KEYWORDS_RELOAD_INTERVAL', 30))
+
+    # 号码前缀规范化规则："前缀:去掉前缀后的号码长度"，逗号分隔，留空表示不规范化（默认）
+    # 如 "0086:11,86:11"；启用或修改后首次启动会改写数据库中已存储的号码，请先备份
+    CANONICAL_PREFIXES = os.getenv('CANONICAL_PREFIXES', '')
+
+    # 是否把中文数字（〇一二三…、幺）当作数字识别（全角数字等 Unicode 数字始终规范化）
+    NORMALIZE_CHINESE_NUMERALS = os.getenv('NORMALIZE_CHINESE_NUMERALS', 'false').lower() in ('1', 'true', 'yes')
+
+    # 群组检测配置文件（JSON，{"群组ID": {"keywords": [...], "min_length": 7, "max_length": 12}}），
+    # bot_config 表中 detector_profile:<群组ID> 的配置优先；两者均按间隔（秒）检查变更
+    DETECTOR_PROFILES_FILE = os.getenv(
+        'DETECTOR_PROFILES_FILE',
+        str(Path(__file__).parent.parent / "配置文件" / "群组检测配置.json")
+    )
+    DETECTOR_PROFILES_RELOAD_INTERVAL = int(os.getenv('DETECTOR_PROFILES_RELOAD_INTERVAL', 60))
+
+    # 重复判定范围：global（任意群组提交过即重复）或 group（仅同一群组内重复）
+    DUPLICATE_SCOPE = os.getenv('DUPLICATE_SCOPE', 'global').lower()
+    # 重复判定时间窗口（天），只有窗口内提交过才算重复；0表示不限时间
+    DUPLICATE_WINDOW_DAYS = int(os.getenv('DUPLICATE_WINDOW_DAYS', 0))
+
+    # 近似重复检测：新号码与已记录号码只差一位或相邻两位颠倒时提示（需要额外的索引表）
+    NEAR_DUPLICATE_CHECK = os.getenv('NEAR_DUPLICATE_CHECK', 'false').lower() in ('1', 'true', 'yes')
+
+    # 重复通知合并：首条重复提醒发出后的窗口（秒）内，同一群组同一号码的重复提交只编辑该提醒；0表示禁用
+    DUPLICATE_COALESCE_WINDOW = float(os.getenv('DUPLICATE_COALESCE_WINDOW', 60))
+    # 合并编辑的防抖间隔（秒），间隔内的多次重复只编辑一次
+    DUPLICATE_COALESCE_EDIT_DELAY = float(os.getenv('DUPLICATE_COALESCE_EDIT_DELAY', 2))
+
+    # 汇总模式群组（逗号分隔）：只静默记录，每 DIGEST_INTERVAL 分钟发布（编辑）一条置顶汇总，
+    # 提交次数达到 DIGEST_ALERT_THRESHOLD 的重复号码仍立即提醒
+    DIGEST_GROUPS = [int(group) for group in os.getenv('DIGEST_GROUPS', '').split(',') if group.strip()]
+    DIGEST_INTERVAL = int(os.getenv('DIGEST_INTERVAL', 10))
+    DIGEST_ALERT_THRESHOLD = int(os.getenv('DIGEST_ALERT_THRESHOLD', 3))
+
+    # 导出任务：同时运行的导出工作进程数（超出的请求排队）、进度更新间隔（秒）
+    EXPORT_MAX_JOBS = int(os.getenv('EXPORT_MAX_JOBS', 1))
+    EXPORT_PROGRESS_INTERVAL = float(os.getenv('EXPORT_PROGRESS_INTERVAL', 3))
+
+    # 导出文件默认压缩方式（none/gzip/zip）；单个文件超过 EXPORT_PART_SIZE_MB 时分卷
+    # （Bot API 上传上限为 50MB，使用本地 Bot API 服务器时可调大到 2000）
+    EXPORT_COMPRESSION = os.getenv('EXPORT_COMPRESSION', 'none').lower()
+    EXPORT_PART_SIZE_MB = float(os.getenv('EXPORT_PART_SIZE_MB', 45))
+
+    # 同时处理的更新数（不同群组并行处理，同一群组按顺序处理）
+    UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', 8))
+
+    # 已处理消息缓存：同一 (群组, 消息ID) 在 IDEMPOTENCY_TTL 秒内只处理一次，最多保存 IDEMPOTENCY_CACHE_SIZE 条；
+    # IDEMPOTENCY_PERSIST 开启时写入数据库，重启后仍能跳过重复投递的消息
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 3600))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 100000))
+    IDEMPOTENCY_PERSIST = os.getenv('IDEMPOTENCY_PERSIST', 'false').lower() in ('1', 'true', 'yes')
+
+    # 检测结果缓存容量（条，0表示禁用）
+    DETECTION_CACHE_SIZE = int(os.getenv('DETECTION_CACHE_SIZE', 4096))
     
     @classmethod
     def validate_config(cls):
@@ -63,6 +152,36 @@ class Config:
         
         if cls.MIN_PHONE_LENGTH >= cls.MAX_PHONE_LENGTH:
             raise ValueError("MIN_PHONE_LENGTH 必须小于 MAX_PHONE_LENGTH")
+
+        if cls.DUPLICATE_SCOPE not in ('global', 'group'):
+            raise ValueError("DUPLICATE_SCOPE 必须是 global 或 group")
+
+        if cls.DUPLICATE_WINDOW_DAYS < 0:
+            raise ValueError("DUPLICATE_WINDOW_DAYS 不能为负数")
+
+        if cls.DIGEST_GROUPS and cls.DIGEST_INTERVAL <= 0:
+            raise ValueError("DIGEST_INTERVAL 必须大于0")
+
+        if cls.IDEMPOTENCY_TTL <= 0 or cls.IDEMPOTENCY_CACHE_SIZE <= 0:
+            raise ValueError("IDEMPOTENCY_TTL 和 IDEMPOTENCY_CACHE_SIZE 必须大于0")
+
+        if cls.EXPORT_MAX_JOBS <= 0:
+            raise ValueError("EXPORT_MAX_JOBS 必须大于0")
+
+        if cls.EXPORT_COMPRESSION not in ('none', 'gzip', 'zip'):
+            raise ValueError("EXPORT_COMPRESSION 必须是 none、gzip 或 zip")
+
+        if cls.EXPORT_PART_SIZE_MB <= 0:
+            raise ValueError("EXPORT_PART_SIZE_MB 必须大于0")
+
+        if cls.UPDATE_CONCURRENCY <= 0:
+            raise ValueError("UPDATE_CONCURRENCY 必须大于0")
+
+        if cls.BOT_MODE not in ('polling', 'webhook'):
+            raise ValueError("BOT_MODE 必须是 polling 或 webhook")
+
+        if cls.BOT_MODE == 'webhook' and not re.fullmatch(r'[A-Za-z0-9_-]{1,256}', cls.WEBHOOK_SECRET_TOKEN):
+            raise ValueError("webhook 模式需要设置 WEBHOOK_SECRET_TOKEN（1-256位字母、数字、_、-）")
         
         return True
 
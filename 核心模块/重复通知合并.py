@@ -0,0 +1,141 @@
+"""
+重复通知合并模块
+同一群组内短时间重复提交同一号码时，不再逐条回复，而是编辑第一条重复提醒
+"""
+
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from .配置管理 import Config
+from .发送调度 import PRIORITY_SUBMISSION, SendScheduler
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class DuplicateBurst:
+    """一个号码在一个群组内的重复提交窗口
+
+    notice 为首条重复提醒的内容（首次/上次提交者、提交次数），窗口内的重复提交
+    只在内存中累加，不再查询数据库；message 为已发送的提醒消息，附加后窗口才生效。
+    """
+    chat_id: int
+    phone_number: str
+    expires_at: float
+    notice: object = None
+    message: object = None
+    pending_text: Optional[str] = None
+    edit_task: Optional[asyncio.Task] = None
+
+class DuplicateCoalescer:
+    """重复通知合并器
+
+    窗口从首条重复提醒发出时开始，固定 DUPLICATE_COALESCE_WINDOW 秒（不随后续提交延长，
+    过期后的重复会重新发出一条提醒，避免一直编辑已被刷到上方的旧消息）。
+    窗口内的编辑经过 DUPLICATE_COALESCE_EDIT_DELAY 秒防抖，连续多次重复只编辑一次。
+    """
+
+    def __init__(self, window: Optional[float] = None, edit_delay: Optional[float] = None,
+                 sender: Optional[SendScheduler] = None):
+        self.sender = sender
+        self.window = Config.DUPLICATE_COALESCE_WINDOW if window is None else window
+        self.edit_delay = Config.DUPLICATE_COALESCE_EDIT_DELAY if edit_delay is None else edit_delay
+
+        self._bursts: Dict[Tuple[int, str], DuplicateBurst] = {}
+        self._next_sweep = 0.0
+
+        # 统计：合并的重复提交数、实际编辑次数
+        self.absorbed = 0
+        self.edits = 0
+        self.edit_failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def acquire(self, chat_id: int, phone_number: str) -> Optional[DuplicateBurst]:
+        """
+        获取号码在群组内的重复窗口，没有有效窗口时创建一个空窗口
+        返回的窗口已附加提醒消息时，重复提交应合并到该消息；
+        禁用时返回不保存的临时窗口（只用于携带本次的提醒内容）
+        """
+        if not self.enabled:
+            return DuplicateBurst(chat_id, phone_number, 0.0)
+
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._evict_expired(now)
+
+        key = (chat_id, phone_number)
+        burst = self._bursts.get(key)
+        if burst is None or (burst.message is not None and now >= burst.expires_at):
+            burst = DuplicateBurst(chat_id, phone_number, now + self.window)
+            self._bursts[key] = burst
+        return burst
+
+    def attach(self, burst: DuplicateBurst, message):
+        """首条重复提醒发出后附加消息，窗口从此刻开始计时"""
+        if not self.enabled:
+            return
+        burst.message = message
+        burst.expires_at = time.monotonic() + self.window
+        self._bursts[(burst.chat_id, burst.phone_number)] = burst
+
+    def release(self, burst: DuplicateBurst):
+        """放弃未使用的窗口（号码不是重复提交）"""
+        key = (burst.chat_id, burst.phone_number)
+        if self._bursts.get(key) is burst and burst.edit_task is None:
+            del self._bursts[key]
+
+    def is_active(self, burst: Optional[DuplicateBurst]) -> bool:
+        """窗口是否已附加提醒消息（重复提交可以合并）"""
+        return burst is not None and burst.message is not None and burst.notice is not None
+
+    def schedule_edit(self, burst: DuplicateBurst, text: str):
+        """合并一次重复提交：记录最新内容，防抖后编辑提醒消息"""
+        self.absorbed += 1
+        burst.pending_text = text
+        if burst.edit_task is None:
+            burst.edit_task = asyncio.create_task(self._flush_later(burst))
+
+    async def _flush_later(self, burst: DuplicateBurst):
+        """等待防抖间隔后，用最新内容编辑提醒消息"""
+        try:
+            await asyncio.sleep(self.edit_delay)
+        finally:
+            burst.edit_task = None
+
+        text, burst.pending_text = burst.pending_text, None
+        if not text:
+            return
+
+        try:
+            if self.sender:
+                await self.sender.edit(burst.message, text, PRIORITY_SUBMISSION, parse_mode='Markdown')
+            else:
+                await burst.message.edit_text(text, parse_mode='Markdown')
+            self.edits += 1
+        except Exception as e:
+            self.edit_failures += 1
+            logger.error(f"编辑重复提醒失败 {burst.chat_id}/{burst.phone_number}: {e}")
+
+    def _evict_expired(self, now: float):
+        """清理已过期且没有待编辑内容的窗口"""
+        expired = [
+            key for key, burst in self._bursts.items()
+            if now >= burst.expires_at and burst.edit_task is None
+        ]
+        for key in expired:
+            del self._bursts[key]
+        self._next_sweep = now + max(self.window, 1)
+
+    def get_stats(self) -> dict:
+        """获取合并统计（saved_calls 为少发送的 Telegram API 请求数）"""
+        return {
+            'active': sum(1 for burst in self._bursts.values() if burst.message is not None),
+            'absorbed': self.absorbed,
+            'edits': self.edits,
+            'edit_failures': self.edit_failures,
+            'saved_calls': self.absorbed - self.edits - self.edit_failures,
+        }